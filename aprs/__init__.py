@@ -16,6 +16,7 @@ APRS Python Module.
 """
 
 import logging
+from aprs.frame import Frame
 from aprs.aprs_kiss import AprsKiss
 from aprs.aprs_internet_service import AprsInternetService
 
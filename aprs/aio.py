@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""asyncio APRS Internet Service Class Definitions"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+import asyncio
+import logging
+import threading
+
+import aprs.constants
+import aprs.uplink
+import aprs.util
+import kiss.util
+
+
+class AsyncAprsInternetService(object):
+
+    """
+    APRS-IS client running on an asyncio event loop.
+
+    `send` never blocks, so digipeater code can call it inline from the
+    loop or from a worker thread. Frames are queued and written by a task
+    on the loop, everything queued during a write going out in the next
+    one. `run` keeps the connection up, logging back in with exponential
+    backoff after the server drops us, and lines queued meanwhile are sent
+    once it is back. Once `queue_size` lines are waiting new ones are
+    dropped and counted.
+    """
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(aprs.constants.LOG_LEVEL)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(aprs.constants.LOG_LEVEL)
+    console_handler.setFormatter(aprs.constants.LOG_FORMAT)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+    def __init__(self, user, password='-1', loop=None,
+                 queue_size=aprs.constants.UPLINK_QUEUE_SIZE,
+                 min_delay=aprs.constants.UPLINK_RECONNECT_MIN_DELAY,
+                 max_delay=aprs.constants.UPLINK_RECONNECT_MAX_DELAY):
+        self.user = user
+        self._auth = ' '.join(
+            ['user', user, 'pass', password, 'vers', 'APRS Python Module'])
+        self.loop = loop or asyncio.get_event_loop()
+        self.full_auth = None
+        self.server = None
+        self.port = None
+        self.reader = None
+        self.writer = None
+        self.connected = asyncio.Event()
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.reconnects = 0
+        # Lines are queued without their line ending, it is added as they
+        # are written. The queue is shared with sending threads, everything
+        # else belongs to the loop.
+        self.queue = aprs.uplink.UplinkQueue(queue_size, line_overhead=2)
+        self._lock = threading.Lock()
+        self._queued = asyncio.Event()
+        self._idle = asyncio.Condition()
+        self._closed = False
+        self._attempt = 0
+        self._sender = None
+        self._loop_thread = None
+
+    async def connect(self, server=None, port=None, aprs_filter=None):
+        """
+        Connects & logs in to APRS-IS, and starts the task that sends
+        queued frames.
+
+        :param server: Optional alternative APRS-IS server.
+        :param port: Optional APRS-IS port.
+        :param filter: Optional filter to use.
+        :type server: str
+        :type port: int
+        :type filte: str
+        """
+        self.server = server or aprs.constants.APRSIS_SERVER
+        self.port = port or aprs.constants.APRSIS_FILTER_PORT
+        aprs_filter = aprs_filter or '/'.join(['p', self.user])
+        self.full_auth = ' '.join([self._auth, 'filter', aprs_filter])
+        self._loop_thread = threading.get_ident()
+        await self.__open()
+        if self._sender is None:
+            self._closed = False
+            self._sender = asyncio.ensure_future(self.__send_queued(), loop=self.loop)
+
+    async def __open(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port),
+            aprs.constants.UPLINK_TIMEOUT)
+        self.logger.info('Connected to server=%s port=%s', self.server, self.port)
+        self.logger.debug('Sending full_auth=%s', self.full_auth)
+        self.writer.write((self.full_auth + '\n\r').encode('ascii'))
+        self._attempt = 0
+        self.connected.set()
+
+    def __disconnect(self):
+        self.connected.clear()
+        if self.writer is not None:
+            self.writer.close()
+
+    @property
+    def sent(self):
+        """Lines written to the server."""
+        return self.queue.sent
+
+    @property
+    def dropped(self):
+        """Lines dropped, with the queue full or on close."""
+        return self.queue.dropped
+
+    @property
+    def high_water(self):
+        """Most lines ever queued at once."""
+        return self.queue.high_water
+
+    def backoff(self):
+        """
+        :returns: Seconds to wait before the next connection attempt.
+        :rtype: float
+        """
+        self._attempt += 1
+        return kiss.util.backoff_delay(self._attempt - 1, self.min_delay, self.max_delay)
+
+    async def __send_queued(self):
+        while True:
+            await self._queued.wait()
+            await self.connected.wait()
+            with self._lock:
+                if not len(self.queue):
+                    # send() sets the event again after its next append.
+                    self._queued.clear()
+                    batch = None
+                else:
+                    batch = self.queue.take_batch()
+            if batch is None:
+                async with self._idle:
+                    self._idle.notify_all()
+                continue
+
+            try:
+                # Each frame's cached rendering goes out as it is, the
+                # transport joins the whole batch into one write.
+                self.writer.writelines(
+                    part for line in batch for part in (line, b'\r\n'))
+                await asyncio.wait_for(self.writer.drain(),
+                                       aprs.constants.UPLINK_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as ex:
+                self.logger.warning('Sending to server=%s port=%s failed: %s',
+                                    self.server, self.port, ex)
+                with self._lock:
+                    self.queue.requeue(batch)
+                # run() sees the connection close and reconnects.
+                self.__disconnect()
+                continue
+
+            with self._lock:
+                self.queue.done(batch)
+
+    def __wake_sender(self):
+        self._queued.set()
+
+    def send(self, frame):
+        """
+        Queues a frame for APRS-IS without waiting for it to go out.
+
+        :param frame: APRS frame to send.
+        :type frame: aprs.Frame or dict
+
+        :return: True if the frame was queued, False if the queue was full
+            or the service is closed.
+        :rtype: bool
+        """
+        line = aprs.util.format_aprs_frame_bytes(frame)
+        with self._lock:
+            if self._closed or not self.queue.put(line):
+                return False
+            queued = len(self.queue)
+        if queued == 1:
+            # Anything more was queued behind a line the sender already
+            # knows about.
+            if threading.get_ident() == self._loop_thread:
+                self.__wake_sender()
+            else:
+                self.loop.call_soon_threadsafe(self.__wake_sender)
+        return True
+
+    def __drained(self):
+        with self._lock:
+            return self.queue.idle
+
+    async def flush(self, timeout=None):
+        """
+        Waits for every queued frame to be written to the server.
+
+        :param timeout: Seconds to wait at most, None to wait indefinitely.
+        :type timeout: float
+        :returns: True if the queue drained, False on timeout.
+        :rtype: bool
+        """
+        async def drained():
+            async with self._idle:
+                await self._idle.wait_for(self.__drained)
+        try:
+            await asyncio.wait_for(drained(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def receive(self, callback=None):
+        """
+        Receives from APRS-IS until the server closes the connection.
+
+        :param callback: Optional callback to deliver data to.
+        :type callback: func
+        """
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            line = line.decode('latin-1').strip()
+            if line.startswith('#'):
+                if 'logresp' in line:
+                    self.logger.debug('logresp=%s', line)
+            else:
+                self.logger.debug('line=%s', line)
+                if callback:
+                    callback(line)
+
+    async def run(self, callback=None):
+        """
+        Receives from APRS-IS forever, reconnecting with backoff whenever
+        the connection is lost. `connect` must have been awaited first.
+
+        :param callback: Optional callback to deliver data to.
+        :type callback: func
+        """
+        while True:
+            try:
+                await self.receive(callback)
+            except OSError as sock_err:
+                self.logger.error(sock_err)
+            self.__disconnect()
+
+            while not self.connected.is_set():
+                await asyncio.sleep(self.backoff())
+                try:
+                    await self.__open()
+                except (OSError, asyncio.TimeoutError) as sock_err:
+                    self.logger.error('Connecting to server=%s port=%s failed: %s',
+                                      self.server, self.port, sock_err)
+                else:
+                    self.reconnects += 1
+
+    async def close(self, timeout=aprs.constants.UPLINK_CLOSE_TIMEOUT):
+        """
+        Sends what is queued, then stops the sender and disconnects. Lines
+        still queued once the timeout passes are dropped.
+
+        :param timeout: Seconds to wait for queued frames at most.
+        :type timeout: float
+        """
+        if self.connected.is_set():
+            await self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self.queue.clear()
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        self.__disconnect()
@@ -9,14 +9,26 @@ __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
 import logging
 import socket
+import threading
 import requests
 import aprs.constants
-import time
+import aprs.uplink
+import aprs.util
+import kiss.util
 
 
 class AprsInternetService(object):
 
-    """APRS Object."""
+    """
+    APRS Object.
+
+    Frames sent over TCP are queued and written by a background thread, so
+    `send` never blocks on the server. Lines queued while a write is in
+    progress go out together in the next one. If the connection drops the
+    thread reconnects with exponential backoff and resends what it was
+    writing, while senders keep queueing. Once `queue_size` lines are
+    waiting new ones are dropped and counted.
+    """
 
     logger = logging.getLogger(__name__)
     logger.setLevel(aprs.constants.LOG_LEVEL)
@@ -26,16 +38,28 @@ class AprsInternetService(object):
     logger.addHandler(console_handler)
     logger.propagate = False
 
-    def __init__(self, user, password='-1', input_url=None):
+    def __init__(self, user, password='-1', input_url=None,
+                 queue_size=aprs.constants.UPLINK_QUEUE_SIZE,
+                 min_delay=aprs.constants.UPLINK_RECONNECT_MIN_DELAY,
+                 max_delay=aprs.constants.UPLINK_RECONNECT_MAX_DELAY):
         self.user = user
         self._url = input_url or aprs.constants.APRSIS_URL
         self._auth = ' '.join(
             ['user', user, 'pass', password, 'vers', 'APRS Python Module'])
         self.aprsis_sock = None
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.reconnects = 0
+        self.queue = aprs.uplink.UplinkQueue(queue_size)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._attempt = 0
+        self._sender = None
 
     def connect(self, server=None, port=None, aprs_filter=None):
         """
-        Connects & logs in to APRS-IS.
+        Connects & logs in to APRS-IS, and starts the thread that sends
+        queued frames.
 
         :param server: Optional alternative APRS-IS server.
         :param port: Optional APRS-IS port.
@@ -52,54 +76,153 @@ class AprsInternetService(object):
 
         self.server = server
         self.port = port
-        self.aprsis_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.aprsis_sock.connect((server, port))
-        self.logger.info('Connected to server=%s port=%s', server, port)
+        self.__open()
+        if self._sender is None:
+            self._closed = False
+            self._sender = threading.Thread(target=self.__sender_loop, daemon=True)
+            self._sender.start()
+
+    def __open(self):
+        aprsis_sock = socket.create_connection((self.server, self.port),
+                                               aprs.constants.UPLINK_TIMEOUT)
+        self.logger.info('Connected to server=%s port=%s', self.server, self.port)
         self.logger.debug('Sending full_auth=%s', self.full_auth)
-        self.aprsis_sock.sendall((self.full_auth + '\n\r').encode('ascii'))
+        aprsis_sock.sendall((self.full_auth + '\n\r').encode('ascii'))
+        self.aprsis_sock = aprsis_sock
+
+    def __disconnect(self):
+        if self.aprsis_sock is not None:
+            try:
+                self.aprsis_sock.close()
+            except OSError:
+                pass
+            self.aprsis_sock = None
+
+    @property
+    def sent(self):
+        """Lines written to the server."""
+        return self.queue.sent
+
+    @property
+    def dropped(self):
+        """Lines dropped, with the queue full or on close."""
+        return self.queue.dropped
+
+    @property
+    def high_water(self):
+        """Most lines ever queued at once."""
+        return self.queue.high_water
+
+    def backoff(self):
+        """
+        :returns: Seconds to wait before the next connection attempt.
+        :rtype: float
+        """
+        self._attempt += 1
+        return kiss.util.backoff_delay(self._attempt - 1, self.min_delay, self.max_delay)
+
+    def __sender_loop(self):
+        condition = self._condition
+        queue = self.queue
+        while True:
+            with condition:
+                while not len(queue) and not self._closed:
+                    condition.wait()
+                if not len(queue):
+                    return
+                if self.aprsis_sock is None and self._closed:
+                    # Closed while the server is unreachable, give up.
+                    queue.clear()
+                    condition.notify_all()
+                    return
+                batch = queue.take_batch()
+
+            try:
+                if self.aprsis_sock is None:
+                    self.__open()
+                    self.reconnects += 1
+                self.aprsis_sock.sendall(b''.join(batch))
+            except OSError as ex:
+                self.logger.warning('Sending to server=%s port=%s failed: %s',
+                                    self.server, self.port, ex)
+                self.__disconnect()
+                with condition:
+                    queue.requeue(batch)
+                    condition.notify_all()
+                    # Waiting on the condition lets close() cut this short.
+                    if not self._closed:
+                        condition.wait(self.backoff())
+                continue
+
+            self._attempt = 0
+            with condition:
+                queue.done(batch)
+                condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Waits for every queued frame to be written to the server.
+
+        :param timeout: Seconds to wait at most, None to wait indefinitely.
+        :type timeout: float
+        :returns: True if the queue drained, False on timeout.
+        :rtype: bool
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.queue.idle, timeout)
+
+    def close(self, timeout=aprs.constants.UPLINK_CLOSE_TIMEOUT):
+        """
+        Sends what is queued, then stops the sender and disconnects. Lines
+        still queued once the timeout passes, or once the server turns out
+        to be unreachable, are dropped.
+
+        :param timeout: Seconds to wait for queued frames at most, None to
+            wait as long as the connection is up.
+        :type timeout: float
+        """
+        with self._condition:
+            # The sender drops the socket when a write fails and notifies.
+            self._condition.wait_for(
+                lambda: self.queue.idle or self.aprsis_sock is None, timeout)
+            self._closed = True
+            self._condition.notify_all()
+        if self._sender is not None:
+            self._sender.join()
+            self._sender = None
+        self.__disconnect()
 
     def send(self, frame, headers=None, protocol='TCP'):
         """
         Sends message to APRS-IS.
 
-        :param message: Message to send to APRS-IS.
+        :param frame: APRS frame to send to APRS-IS.
         :param headers: Optional HTTP headers to post.
         :param protocol: Protocol to use: One of TCP, HTTP or UDP.
-        :type message: str
+        :type frame: aprs.Frame or dict
         :type headers: dict
 
-        :return: True on success, False otherwise.
+        :return: True on success, False otherwise. Over TCP, True once the
+            frame is queued and False if the queue was full.
         :rtype: bool
         """
         self.logger.debug(
             'message=%s headers=%s protocol=%s', str(frame), headers, protocol)
 
         if 'TCP' in protocol:
-            self.logger.debug('sending message=%s', str(frame))
-            # message = frame['source'].encode('ascii') + b">" + frame['destination'].encode('ascii') + aprs.util.format_path(frame['path']).encode('ascii') + b":" + frame['text'] + b'\n\r'
-            # TODO: simplify this
-            message = bytearray()
-            for frame_chr in aprs.util.format_aprs_frame(frame):
-                message.append(ord(frame_chr))
-            message_sent = False
-            while not message_sent:
-                try:
-                    self.aprsis_sock.sendall(message)
-                    message_sent = True
-                except (ConnectionResetError, BrokenPipeError) as ex:
-                    #connection reset wait a second then try again
-                    time.sleep(1)
-                    self.aprsis_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    self.aprsis_sock.connect((self.server, self.port))
-                    self.aprsis_sock.sendall((self.full_auth + '\n\r').encode('ascii'))
+            line = aprs.util.format_aprs_frame_bytes(frame) + b'\r\n'
+            with self._condition:
+                if self._closed or not self.queue.put(line):
+                    return False
+                self._condition.notify()
             return True
         elif 'HTTP' in protocol:
-            content = "\n".join([self._auth, aprs.util.format_aprs_frame(frame)])
+            content = b'\n'.join([self._auth.encode('ascii'), aprs.util.format_aprs_frame_bytes(frame)])
             headers = headers or aprs.constants.APRSIS_HTTP_HEADERS
             result = requests.post(self._url, data=content, headers=headers)
             return 204 in result.status_code
         elif 'UDP' in protocol:
-            content = "\n".join([self._auth, aprs.util.format_aprs_frame(frame)])
+            content = b'\n'.join([self._auth.encode('ascii'), aprs.util.format_aprs_frame_bytes(frame)])
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             sock.sendto(
                 content,
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vectorised decoding of many AX.25 frames at once.
+
+Needs NumPy, which the digipeater itself does not, so this module is only
+imported when a batch operation is asked for.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import numpy
+
+import aprs.frame
+
+
+ADDRESS_LENGTH = aprs.frame.ADDRESS_LENGTH
+MAX_ADDRESSES = aprs.frame.MAX_ADDRESSES
+MAX_PATH = MAX_ADDRESSES - 2
+# Longest header that can matter: every address, control and PID.
+HEADER_LENGTH = ADDRESS_LENGTH * MAX_ADDRESSES + 2
+
+FRAME_DTYPE = numpy.dtype([
+    ('valid', numpy.bool_),
+    ('destination', 'S6'),
+    ('destination_ssid', numpy.uint8),
+    ('source', 'S6'),
+    ('source_ssid', numpy.uint8),
+    ('path_length', numpy.uint8),
+    ('path', 'S6', (MAX_PATH,)),
+    ('path_ssid', numpy.uint8, (MAX_PATH,)),
+    ('path_repeated', numpy.bool_, (MAX_PATH,)),
+    ('payload_offset', numpy.uint64),
+    ('payload_length', numpy.uint32),
+])
+
+
+class FrameBatch(object):
+
+    """
+    Decoded address fields of many frames over one shared buffer.
+
+    `records` is a structured array of `FRAME_DTYPE`, one entry per input
+    frame in order. Callsigns are bytes with their padding removed and the
+    SSID kept apart; `valid` is False for frames that are not APRS UI
+    frames, the rest of their record is then meaningless. Payloads are
+    located by `payload_offset` and `payload_length` in `buffer`.
+    """
+
+    def __init__(self, records, buffer):
+        self.records = records
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.records)
+
+    def payload(self, index):
+        """
+        :returns: Information field of a frame, a view of `buffer`.
+        :rtype: memoryview
+        """
+        record = self.records[index]
+        start = int(record['payload_offset'])
+        return memoryview(self.buffer)[start:start + int(record['payload_length'])]
+
+    def frame(self, index):
+        """
+        Converts a single record, for picking out the odd frame. Use
+        `frames` to convert many, per record this is slower than decoding
+        the raw frame with `aprs.Frame.from_ax25`.
+
+        :returns: A frame, or None if the frame at `index` is invalid.
+        :rtype: aprs.Frame
+        """
+        record = self.records[index]
+        if not record['valid']:
+            return None
+        path = []
+        for hop in range(record['path_length']):
+            identity = format_identity(record['path'][hop], record['path_ssid'][hop])
+            path.append(identity + '*' if record['path_repeated'][hop] else identity)
+        return aprs.frame.Frame(
+            format_identity(record['source'], record['source_ssid']),
+            format_identity(record['destination'], record['destination_ssid']),
+            path, self.payload(index))
+
+    def frames(self):
+        """
+        Converts every record at once. Columns are turned into Python
+        objects in bulk and each distinct address is formatted once.
+
+        :returns: Frames in input order, None for invalid ones.
+        :rtype: list
+        """
+        records = self.records
+        identities = {}
+
+        def identity(callsign, ssid):
+            formatted = identities.get((callsign, ssid))
+            if formatted is None:
+                formatted = identities[(callsign, ssid)] = format_identity(callsign, ssid)
+            return formatted
+
+        buffer = memoryview(self.buffer)
+        frames = []
+        columns = [records[name].tolist() for name in FRAME_DTYPE.names]
+        for (valid, destination, destination_ssid, source, source_ssid, path_length,
+             path, path_ssid, path_repeated, payload_offset, payload_length) in zip(*columns):
+            if not valid:
+                frames.append(None)
+                continue
+            hops = []
+            for hop in range(path_length):
+                formatted = identity(path[hop], path_ssid[hop])
+                hops.append(formatted + '*' if path_repeated[hop] else formatted)
+            frames.append(aprs.frame.Frame(
+                identity(source, source_ssid), identity(destination, destination_ssid),
+                hops, buffer[payload_offset:payload_offset + payload_length]))
+        return frames
+
+
+def format_identity(callsign, ssid):
+    """
+    :param callsign: Callsign as found in a batch record.
+    :type callsign: bytes
+    :param ssid: SSID as found in a batch record.
+    :type ssid: int
+    :returns: Callsign[-SSID].
+    :rtype: str
+    """
+    callsign = callsign.decode('latin-1')
+    if ssid > 0:
+        return '-'.join([callsign, str(ssid)])
+    return callsign
+
+
+def _strip_padding(callsigns):
+    # Strips spaces from both ends of each callsign like decode_address
+    # does: leading ones are shifted out, trailing ones become NUL, which
+    # numpy drops from 'S6'. Spaces inside a callsign are kept.
+    width = callsigns.shape[-1]
+    filled = callsigns != 0x20
+    leading = numpy.where(filled.any(axis=-1), filled.argmax(axis=-1), width)
+    source = numpy.arange(width) + leading[..., numpy.newaxis]
+    shifted = numpy.take_along_axis(callsigns, numpy.minimum(source, width - 1), axis=-1)
+    filled = numpy.take_along_axis(filled, numpy.minimum(source, width - 1), axis=-1)
+    filled &= source < width
+    # Keep everything up to the last character that isn't padding.
+    keep = numpy.logical_or.accumulate(filled[..., ::-1], axis=-1)[..., ::-1]
+    return numpy.where(keep, shifted, 0).astype(numpy.uint8)
+
+
+def decode_batch(raw_frames):
+    """
+    Decodes the address fields of many raw AX.25 frames at once.
+
+    Frames are accepted by the same rules as `aprs.frame.validate_header`.
+
+    :param raw_frames: Raw AX.25 frames, without KISS framing.
+    :type raw_frames: list
+    :rtype: FrameBatch
+    """
+    count = len(raw_frames)
+    buffer = b''.join(raw_frames)
+    data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+    lengths = numpy.fromiter((len(frame) for frame in raw_frames),
+                             dtype=numpy.int64, count=count)
+    offsets = numpy.zeros(count, dtype=numpy.int64)
+    numpy.cumsum(lengths[:-1], out=offsets[1:])
+
+    # Gather every frame's header into a zero padded matrix.
+    columns = numpy.arange(HEADER_LENGTH)
+    in_frame = columns[numpy.newaxis, :] < lengths[:, numpy.newaxis]
+    index = numpy.where(in_frame, offsets[:, numpy.newaxis] + columns, 0)
+    headers = numpy.where(in_frame, data[index] if len(data) else 0, 0).astype(numpy.uint8)
+
+    addresses = headers[:, :ADDRESS_LENGTH * MAX_ADDRESSES].reshape(
+        count, MAX_ADDRESSES, ADDRESS_LENGTH)
+    ssid_bytes = addresses[:, :, 6]
+
+    # The address field ends at the first extension bit.
+    extension = (ssid_bytes & 0x01).astype(numpy.bool_)
+    address_count = extension.argmax(axis=1) + 1
+    address_end = address_count * ADDRESS_LENGTH
+    rows = numpy.arange(count)
+    address_characters = numpy.zeros(256, dtype=numpy.bool_)
+    address_characters[numpy.frombuffer(aprs.frame.ADDRESS_CHARACTERS, dtype=numpy.uint8)] = True
+    in_address = numpy.arange(MAX_ADDRESSES)[numpy.newaxis, :] < address_count[:, numpy.newaxis]
+    valid = (
+        (lengths > 16) & extension.any(axis=1) & (address_count >= 2) &
+        (address_end + 2 <= lengths) &
+        (address_characters[addresses[:, :, :6]].all(axis=2) | ~in_address).all(axis=1) &
+        (headers[rows, address_end] & aprs.frame.CONTROL_PF_MASK == aprs.frame.CONTROL_UI) &
+        numpy.isin(headers[rows, address_end + 1], aprs.frame.APRS_PIDS))
+
+    callsigns = _strip_padding(addresses[:, :, :6] >> 1)
+    callsigns = numpy.ascontiguousarray(callsigns).view('S6')[:, :, 0]
+    ssids = (ssid_bytes >> 1) & 0x0f
+
+    records = numpy.zeros(count, dtype=FRAME_DTYPE)
+    records['valid'] = valid
+    records['destination'] = callsigns[:, 0]
+    records['destination_ssid'] = ssids[:, 0]
+    records['source'] = callsigns[:, 1]
+    records['source_ssid'] = ssids[:, 1]
+    path_length = numpy.where(valid, address_count - 2, 0)
+    records['path_length'] = path_length
+    in_path = numpy.arange(MAX_PATH)[numpy.newaxis, :] < path_length[:, numpy.newaxis]
+    records['path'] = numpy.where(in_path, callsigns[:, 2:], b'')
+    records['path_ssid'] = numpy.where(in_path, ssids[:, 2:], 0)
+    records['path_repeated'] = in_path & (ssid_bytes[:, 2:] & 0x80).astype(numpy.bool_)
+    records['payload_offset'] = numpy.where(valid, offsets + address_end + 2, 0)
+    records['payload_length'] = numpy.where(valid, lengths - address_end - 2, 0)
+    return FrameBatch(records, buffer)
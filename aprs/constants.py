@@ -31,3 +31,29 @@ LOG_FORMAT = logging.Formatter(
      '%(message)s'))
 
 GPS_WARM_UP = 5
+
+# Distinct AX.25 addresses to keep decoded and encoded, busy channels
+# only see a few hundred callsigns and aliases.
+ADDRESS_CACHE_SIZE = 1024
+
+# Seconds a frame is remembered to drop duplicates of it, the default per
+# port window and the longest window a port may be configured with.
+DEDUP_WINDOW = 5
+DEDUP_MAX_WINDOW = 60
+# Expiry resolution in seconds, and independently locked partitions of
+# the dedup store.
+DEDUP_RESOLUTION = 1
+DEDUP_STRIPES = 16
+
+# Lines waiting for the APRS-IS uplink, beyond this new lines are dropped
+# so a stalled server never holds up digipeating.
+UPLINK_QUEUE_SIZE = 1024
+# Most bytes of queued lines written to the server in one go.
+UPLINK_BATCH_BYTES = 16384
+# Seconds a write to the server may stall before the connection is
+# considered dead, and the reconnect backoff bounds.
+UPLINK_TIMEOUT = 30
+UPLINK_RECONNECT_MIN_DELAY = 0.5
+UPLINK_RECONNECT_MAX_DELAY = 60
+# Longest close waits for queued lines to go out.
+UPLINK_CLOSE_TIMEOUT = 5
@@ -107,6 +107,68 @@ def decimal2dm(decimal_degrees):
     return (degrees, minutes)
 
 
+# repr() writes at most 17 significant digits and switches to an exponent
+# below 1e-4, so fractions are at most 21 digits long.
+_POWERS_OF_TEN = [10 ** digits for digits in range(22)]
+
+
+def _split_float(decimal_degrees):
+    """ Splits a float into its whole degrees and the fraction of a degree
+    written out in its shortest repr, as `fraction / scale`. This is the
+    same value `Decimal(str(decimal_degrees))` holds, so integer math on it
+    gives results identical to the Decimal functions. Returns None for
+    floats repr() writes with an exponent.
+    """
+    whole, point, fraction = repr(float(decimal_degrees)).partition('.')
+    if not point or 'e' in fraction:
+        return None
+    return int(whole), int(fraction), _POWERS_OF_TEN[len(fraction)]
+
+
+def float2dms(decimal_degrees):
+    """ Float and integer math version of `decimal2dms`. Degrees and
+    minutes are returned as ints and seconds as the float nearest to the
+    seconds `decimal2dms` returns.
+
+    Example:
+
+        >>> float2dms(121.135)
+        (121, 8, 6.0)
+        >>> float2dms(-121.135)
+        (-121, 8, 6.0)
+
+    """
+    split = _split_float(decimal_degrees)
+    if split is None:
+        degrees, minutes, seconds = decimal2dms(decimal_degrees)
+        return int(degrees), int(minutes), float(seconds)
+    degrees, fraction, scale = split
+    minutes, remainder = divmod(fraction * 60, scale)
+    # int / int is correctly rounded, as float(Decimal) is.
+    return degrees, minutes, remainder * 60 / scale
+
+
+def float2dm(decimal_degrees):
+    """ Float and integer math version of `decimal2dm`. Degrees are
+    returned as an int and minutes as the float nearest to the minutes
+    `decimal2dm` returns.
+
+    Example:
+
+        >>> float2dm(121.135)
+        (121, 8.1)
+        >>> float2dm(-121.135)
+        (-121, 8.1)
+
+    """
+    split = _split_float(decimal_degrees)
+    if split is None:
+        degrees, minutes = decimal2dm(decimal_degrees)
+        return int(degrees), float(minutes)
+    degrees, fraction, scale = split
+    return degrees, fraction * 60 / scale
+
+
 def dms2decimal(degrees, minutes, seconds):
     """ Converts degrees, minutes, and seconds to the equivalent
     number of decimal degrees. If parameter 'degrees' is negative,
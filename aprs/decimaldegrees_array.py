@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vectorised versions of the `aprs.decimaldegrees` conversions, for
+generating many position reports at once.
+
+Needs NumPy, which the digipeater itself does not, so this module is only
+imported when an array conversion is asked for.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import numpy
+
+
+# Coordinates written with up to this many decimals are converted exactly,
+# the scaled fraction times 60 stays an integer float64 holds exactly.
+EXACT_DECIMALS = 13
+
+
+def decimal2dm_array(decimal_degrees):
+    """
+    Array version of `aprs.decimaldegrees.float2dm`.
+
+    Minutes are identical for coordinates whose shortest repr has at most
+    `EXACT_DECIMALS` decimals. Beyond that they are computed in float64
+    and can be a few ulps away, which only shows once formatted for
+    minutes within about 1e-13 of a rounding tie.
+
+    :param decimal_degrees: Coordinates in decimal degrees.
+    :type decimal_degrees: array_like
+    :returns: Whole degrees, negative for negative coordinates, and the
+        minutes, always positive, both shaped like `decimal_degrees`.
+    :rtype: tuple
+    """
+    shape = numpy.shape(decimal_degrees)
+    # Boolean indexing below needs at least one dimension.
+    values = numpy.atleast_1d(numpy.asarray(decimal_degrees, dtype=numpy.float64))
+    degrees = numpy.trunc(values)
+    fractions = numpy.abs(values - degrees)
+    minutes = fractions * 60
+    # Find how many decimals each coordinate is written with, then redo
+    # float2dm's integer math: minutes are fraction * 60 / 10**decimals,
+    # with both sides exact in float64 the division is correctly rounded.
+    pending = numpy.ones(values.shape, dtype=numpy.bool_)
+    for decimals in range(EXACT_DECIMALS + 1):
+        exact = pending & (numpy.round(values, decimals) == values)
+        if exact.any():
+            scale = 10.0 ** decimals
+            minutes[exact] = numpy.rint(fractions[exact] * scale) * 60 / scale
+            pending &= ~exact
+    return degrees.astype(numpy.int64).reshape(shape), minutes.reshape(shape)
+
+
+def _format_dm(decimal_degrees, negative, positive):
+    degrees, minutes = decimal2dm_array(decimal_degrees)
+    formatted = numpy.char.add(numpy.abs(degrees).astype(str),
+                               numpy.char.mod('%.2f', minutes))
+    return numpy.char.add(formatted, numpy.where(degrees < 0, negative, positive))
+
+
+def dec2dm_lat_array(decimal_degrees):
+    """
+    Array version of `aprs.util.dec2dm_lat`, with the same output within
+    the precision described for `decimal2dm_array`.
+
+    :param decimal_degrees: Latitudes in decimal degrees.
+    :type decimal_degrees: array_like
+    :returns: Latitudes in APRS format.
+    :rtype: numpy.ndarray
+    """
+    return _format_dm(decimal_degrees, 'S', 'N')
+
+
+def dec2dm_lng_array(decimal_degrees):
+    """
+    Array version of `aprs.util.dec2dm_lng`, see `dec2dm_lat_array`.
+
+    :param decimal_degrees: Longitudes in decimal degrees.
+    :type decimal_degrees: array_like
+    :returns: Longitudes in APRS format.
+    :rtype: numpy.ndarray
+    """
+    return _format_dm(decimal_degrees, 'W', 'E')
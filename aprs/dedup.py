@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Duplicate frame suppression.
+
+Keys, see `aprs.util.dedup_key`, are remembered for a per-call window.
+Expiry runs on a hashed timer wheel: a key is filed in the slot of the
+tick it expires at and each tick only visits its own slot, so expiry
+costs the same however many keys are held.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import math
+import threading
+import time
+
+import aprs.constants
+
+
+class _Stripe(object):
+
+    """One independently locked partition of a `DedupStore`."""
+
+    __slots__ = ('lock', 'expiries', 'wheel', 'tick')
+
+    def __init__(self, slots, tick):
+        self.lock = threading.Lock()
+        # Key to the tick it expires at.
+        self.expiries = {}
+        self.wheel = [[] for _ in range(slots)]
+        self.tick = tick
+
+
+class DedupStore(object):
+
+    """
+    Set of recently seen frame keys, safe to share between threads.
+
+    Keys are spread over `stripes` partitions each with its own lock and
+    timer wheel, so threads checking different frames rarely wait on each
+    other, while `add` on one key is atomic.
+    """
+
+    def __init__(self, max_window=aprs.constants.DEDUP_MAX_WINDOW,
+                 resolution=aprs.constants.DEDUP_RESOLUTION,
+                 stripes=aprs.constants.DEDUP_STRIPES, clock=time.monotonic):
+        """
+        :param max_window: Longest window in seconds `add` will be asked for.
+        :type max_window: float
+        :param resolution: Seconds per tick of the timer wheel.
+        :type resolution: float
+        :param stripes: Number of independently locked partitions.
+        :type stripes: int
+        :param clock: Monotonic clock returning seconds.
+        """
+        self.max_window = max_window
+        self.resolution = resolution
+        self.clock = clock
+        self.__slots = int(math.ceil(max_window / resolution)) + 1
+        tick = self.__now()
+        self.__stripes = [_Stripe(self.__slots, tick) for _ in range(stripes)]
+
+    def __now(self):
+        return int(self.clock() / self.resolution)
+
+    def __advance(self, stripe, now):
+        """Expires every key of a stripe due by tick `now`, with its lock
+        held."""
+        if now - stripe.tick >= self.__slots:
+            # Idle for a whole turn of the wheel, everything has expired.
+            stripe.expiries.clear()
+            for slot in stripe.wheel:
+                del slot[:]
+            stripe.tick = now
+            return
+        expiries = stripe.expiries
+        while stripe.tick < now:
+            stripe.tick += 1
+            slot = stripe.wheel[stripe.tick % self.__slots]
+            for key in slot:
+                # A key is only filed once, but may have expired and been
+                # added again since.
+                if expiries.get(key) == stripe.tick:
+                    del expiries[key]
+            del slot[:]
+
+    def add(self, key, window=None):
+        """
+        Remembers a key unless it is already remembered, as one atomic step.
+
+        :param key: Frame key.
+        :type key: int
+        :param window: Seconds to remember the key for, defaults to
+            `aprs.constants.DEDUP_WINDOW`.
+        :type window: float
+        :returns: True if the key was new, False for a duplicate.
+        :rtype: bool
+        """
+        if window is None:
+            window = aprs.constants.DEDUP_WINDOW
+        if window > self.max_window:
+            raise Exception('dedup window of %ss is longer than the %ss maximum' % (window, self.max_window))
+        stripe = self.__stripes[hash(key) % len(self.__stripes)]
+        now = self.__now()
+        with stripe.lock:
+            self.__advance(stripe, now)
+            if key in stripe.expiries:
+                return False
+            expiry = stripe.tick + max(1, int(math.ceil(window / self.resolution)))
+            stripe.expiries[key] = expiry
+            stripe.wheel[expiry % self.__slots].append(key)
+            return True
+
+    def __contains__(self, key):
+        stripe = self.__stripes[hash(key) % len(self.__stripes)]
+        now = self.__now()
+        with stripe.lock:
+            self.__advance(stripe, now)
+            return key in stripe.expiries
+
+    def __len__(self):
+        now = self.__now()
+        count = 0
+        for stripe in self.__stripes:
+            with stripe.lock:
+                self.__advance(stripe, now)
+                count += len(stripe.expiries)
+        return count
@@ -0,0 +1,614 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""APRS Frame Class Definitions"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+import enum
+import functools
+import sys
+
+import aprs.constants
+import kiss.constants
+
+
+FRAME_FIELDS = ('source', 'destination', 'path', 'text')
+
+# AX.25 addresses are 7 bytes, destination and source then up to 8 digis.
+ADDRESS_LENGTH = 7
+MAX_ADDRESSES = 10
+# UI frame control field, ignoring the poll/final bit, and the PIDs APRS
+# is carried on.
+CONTROL_UI = 0x03
+CONTROL_PF_MASK = 0xef
+APRS_PIDS = (0xf0, 0xcf)
+# Encoded bytes allowed in the callsign part of an address: upper case
+# letters, digits and space padding.
+ADDRESS_CHARACTERS = bytes(
+    [ord(x) << 1 for x in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 '])
+
+
+class Rejection(enum.Enum):
+
+    """Why `validate_header` turned a frame away."""
+
+    TOO_SHORT = 'frame too short'
+    BAD_ADDRESS = 'invalid address'
+    UNTERMINATED_ADDRESS = 'address field not terminated'
+    NOT_UI = 'not a UI frame'
+    BAD_PID = 'not an APRS protocol id'
+
+
+def validate_header(raw_frame):
+    """
+    Checks the header of a raw AX.25 frame before any decoding is done.
+
+    Only the 7 byte address blocks up to the one with the extension bit
+    set, then the control and PID bytes, are looked at, so garbage is
+    turned away after a handful of comparisons.
+
+    :param raw_frame: Raw AX.25 frame.
+    :type raw_frame: bytes
+    :returns: `(address_end, None)` with the offset of the control field
+        for an APRS UI frame, otherwise `(None, rejection)`.
+    :rtype: tuple
+    """
+    frame_len = len(raw_frame)
+    if frame_len <= 16:
+        return None, Rejection.TOO_SHORT
+    last = min(frame_len, ADDRESS_LENGTH * MAX_ADDRESSES)
+    for address_end in range(ADDRESS_LENGTH, last + 1, ADDRESS_LENGTH):
+        if raw_frame[address_end - ADDRESS_LENGTH:address_end - 1].translate(
+                None, ADDRESS_CHARACTERS):
+            return None, Rejection.BAD_ADDRESS
+        # Is the address extension bit set on the last byte of an address?
+        if raw_frame[address_end - 1] & 0x01:
+            if address_end < 2 * ADDRESS_LENGTH:
+                # No source address.
+                return None, Rejection.BAD_ADDRESS
+            elif address_end + 2 > frame_len:
+                return None, Rejection.TOO_SHORT
+            elif raw_frame[address_end] & CONTROL_PF_MASK != CONTROL_UI:
+                return None, Rejection.NOT_UI
+            elif raw_frame[address_end + 1] not in APRS_PIDS:
+                return None, Rejection.BAD_PID
+            return address_end, None
+    return None, Rejection.UNTERMINATED_ADDRESS
+
+
+def find_address_end(raw_frame):
+    """
+    Finds the end of the address field of a raw AX.25 UI frame.
+
+    :param raw_frame: Raw AX.25 frame.
+    :type raw_frame: bytes
+    :returns: Offset of the control field, or None if this isn't a UI frame
+        we can decode.
+    :rtype: int
+    """
+    return validate_header(raw_frame)[0]
+
+
+# Shift tables between ASCII and the AX.25 address encoding, which holds
+# each character in the upper seven bits of a byte.
+DECODE_TABLE = bytes([x >> 1 for x in range(256)])
+ENCODE_TABLE = bytes([(x << 1) & 0xff for x in range(256)])
+
+
+@functools.lru_cache(maxsize=aprs.constants.ADDRESS_CACHE_SIZE)
+def decode_address(address):
+    """
+    :param address: A 7 byte AX.25 address.
+    :type address: bytes
+    :returns: Callsign[-SSID], without a has-been-repeated marker.
+    :rtype: str
+    """
+    callsign = address[:6].translate(DECODE_TABLE).decode('latin-1').strip()
+    ssid = (address[6] >> 1) & 0x0f
+    if ssid > 0:
+        return sys.intern('-'.join([callsign, str(ssid)]))
+    return sys.intern(callsign)
+
+
+def decode_callsign(raw_frame, offset):
+    """
+    :param raw_frame: Raw AX.25 frame.
+    :type raw_frame: bytes
+    :param offset: Offset of the address to decode.
+    :type offset: int
+    :returns: Callsign[-SSID], without a has-been-repeated marker.
+    :rtype: str
+    """
+    return decode_address(bytes(raw_frame[offset:offset + ADDRESS_LENGTH]))
+
+
+@functools.lru_cache(maxsize=aprs.constants.ADDRESS_CACHE_SIZE)
+def encode_address(identity):
+    """
+    :param identity: Callsign[-SSID], a trailing '*' sets the
+        has-been-repeated bit.
+    :type identity: str
+    :returns: The 7 byte AX.25 address, without the extension bit.
+    :rtype: bytes
+    """
+    repeated = identity.endswith('*')
+    if repeated:
+        identity = identity[:-1]
+    if '-' in identity:
+        callsign, ssid = identity.split('-')
+    else:
+        callsign, ssid = identity, 0
+    ssid_byte = 0x60 | ((int(ssid) & 0x0f) << 1)
+    if repeated:
+        ssid_byte |= 0x80
+    return callsign.ljust(6).encode('latin-1').translate(ENCODE_TABLE) + bytes([ssid_byte])
+
+
+def encode_callsign(identity):
+    """
+    :param identity: Callsign[-SSID], a trailing '*' is ignored.
+    :type identity: str
+    :returns: The 7 byte AX.25 address with only the SSID bits set in the
+        last byte.
+    :rtype: bytes
+    """
+    address = encode_address(identity.rstrip('*'))
+    return address[:6] + bytes([address[6] & 0x1e])
+
+
+def decode_path(raw_frame, address_end):
+    """
+    :param raw_frame: Raw AX.25 frame.
+    :type raw_frame: bytes
+    :param address_end: Offset of the control field.
+    :type address_end: int
+    :returns: Digipeater path, with spent hops marked by a trailing '*'.
+    :rtype: tuple
+    """
+    path = []
+    for offset in range(2 * ADDRESS_LENGTH, address_end, ADDRESS_LENGTH):
+        hop = decode_callsign(raw_frame, offset)
+        if hop:
+            if raw_frame[offset + 6] & 0x80:
+                path.append(''.join([hop, '*']))
+            else:
+                path.append(hop)
+    return tuple(path)
+
+
+@functools.lru_cache(maxsize=aprs.constants.ADDRESS_CACHE_SIZE)
+def decode_tnc2_address(address):
+    """
+    :param address: Callsign as it appears in a TNC2 line.
+    :type address: bytes
+    :rtype: str
+    """
+    return sys.intern(address.decode('latin-1'))
+
+
+@functools.lru_cache(maxsize=aprs.constants.ADDRESS_CACHE_SIZE)
+def decode_tnc2_path(path):
+    """
+    :param path: Comma separated path as it appears in a TNC2 line.
+    :type path: bytes
+    :rtype: tuple
+    """
+    if not path:
+        return ()
+    return tuple(decode_tnc2_address(hop) for hop in path.split(b','))
+
+
+def format_tnc2(source, destination, path, text):
+    """
+    :param source: Source callsign.
+    :type source: str
+    :param destination: Destination callsign.
+    :type destination: str
+    :param path: Digipeater path.
+    :type path: tuple
+    :param text: Information field.
+    :type text: bytes
+    :returns: `source>destination,path:text`, without a line ending.
+    :rtype: bytes
+    """
+    header = '>'.join([source, destination])
+    if path:
+        header = ','.join((header,) + tuple(path))
+    return b''.join([header.encode('latin-1'), b':', text])
+
+
+def rewrite_path(raw_frame, address_end, start, stop, hops):
+    """
+    Replaces hops `start` up to `stop` of a raw frame's path, copying the
+    rest of the frame across untouched. The new frame is built in a buffer
+    allocated once at its final size.
+
+    :param raw_frame: Raw AX.25 frame.
+    :type raw_frame: bytes
+    :param address_end: Offset of the control field.
+    :type address_end: int
+    :param start: Index of the first hop to replace.
+    :type start: int
+    :param stop: Index after the last hop to replace, `start` inserts.
+    :type stop: int
+    :param hops: Hops to put in their place, spent hops ending in '*'.
+    :type hops: tuple
+    :returns: The new raw frame, a bytearray nothing else refers to, and
+        the offset of its control field.
+    :rtype: tuple
+    """
+    if not 0 <= start <= stop <= address_end // ADDRESS_LENGTH - 2:
+        raise IndexError('hops %d to %d are not in the path' % (start, stop))
+    head = (2 + start) * ADDRESS_LENGTH
+    tail = (2 + stop) * ADDRESS_LENGTH
+    new_address_end = address_end + (len(hops) - stop + start) * ADDRESS_LENGTH
+    if new_address_end > MAX_ADDRESSES * ADDRESS_LENGTH:
+        raise ValueError('a path holds at most %d hops' % (MAX_ADDRESSES - 2))
+    rewritten = bytearray(len(raw_frame) + new_address_end - address_end)
+    raw_view = memoryview(raw_frame)
+    rewritten[:head] = raw_view[:head]
+    # Inserting after the last address moves the end of the address field.
+    for ssid_byte in range(ADDRESS_LENGTH - 1, head, ADDRESS_LENGTH):
+        rewritten[ssid_byte] &= 0xfe
+    offset = head
+    for hop in hops:
+        address = encode_address(hop)
+        # A longer address would shift the rest of the frame.
+        if len(address) != ADDRESS_LENGTH:
+            raise ValueError('%s is not a valid AX.25 address' % hop)
+        rewritten[offset:offset + ADDRESS_LENGTH] = address
+        offset += ADDRESS_LENGTH
+    rewritten[offset:] = raw_view[tail:]
+    # The hop that ended the address field may have been replaced.
+    rewritten[new_address_end - 1] |= 0x01
+    return rewritten, new_address_end
+
+
+def encode_frame(frame):
+    """
+    :param frame: APRS frame to encode, a frame that still has its raw
+        encoding is not encoded again.
+    :type frame: aprs.Frame or dict
+    :returns: Raw AX.25 UI frame, without KISS framing.
+    :rtype: bytes
+    """
+    if isinstance(frame, Frame) and frame.raw is not None:
+        return frame.raw
+    enc_frame = bytearray(encode_address(frame['destination']))
+    enc_frame += encode_address(frame['source'])
+    for hop in frame['path']:
+        enc_frame += encode_address(hop)
+    # Mark the last address.
+    enc_frame[-1] |= 0x01
+    enc_frame.append(kiss.constants.SLOT_TIME)
+    enc_frame.append(0xf0)
+    enc_frame.extend(frame['text'])
+    return bytes(enc_frame)
+
+
+class Frame(object):
+
+    """
+    A single APRS frame.
+
+    `source` and `destination` are callsign strings, `path` is a tuple of
+    callsign strings (spent hops end in '*') and `text` is the information
+    field as bytes or a memoryview. Every field is immutable, so copies
+    share them and a digipeater rewriting the path only builds a new tuple.
+
+    Frames read off the air are made with `from_ax25`, which only locates
+    the address field. Each field is decoded from the raw frame the first
+    time it is used and then kept, and `text` is a view of the raw frame,
+    so a frame that is dropped after a look at its source costs next to
+    nothing.
+
+    Until one of its fields is set the raw frame stays the frame's
+    encoding, and `with_path` and `replace_hop` rewrite its address field
+    directly, so digipeating a frame never decodes or re-encodes more than
+    the hops it changes.
+
+    Frames can also be used like the dicts they replace, `frame['path']`
+    and `frame['path'] = [...]` work, but plugins that rewrite a frame
+    should use `with_path` or `replace_hop` so the frame they were handed
+    is left alone for the next plugin.
+    """
+
+    __slots__ = ('_raw', '_address_end', '_source', '_destination', '_path', '_text', '_tnc2')
+
+    def __init__(self, source, destination, path=(), text=b''):
+        self._raw = None
+        self._address_end = None
+        self._source = source
+        self._destination = destination
+        self._path = tuple(path)
+        self._text = Frame.__to_bytes(text)
+        self._tnc2 = None
+
+    @staticmethod
+    def __to_bytes(text):
+        if isinstance(text, (bytes, memoryview)):
+            return text
+        elif isinstance(text, str):
+            return text.encode('latin-1')
+        return bytes(text)
+
+    @classmethod
+    def from_ax25(cls, raw_frame, address_end=None):
+        """
+        Wraps a raw AX.25 UI frame without decoding it.
+
+        :param raw_frame: Raw AX.25 frame, without KISS framing.
+        :type raw_frame: bytes
+        :param address_end: Offset of the control field if the header has
+            already been through `validate_header`.
+        :type address_end: int
+        :returns: Lazily decoded frame, or None if it isn't an APRS UI frame.
+        :rtype: Frame
+        """
+        if address_end is None:
+            address_end = find_address_end(raw_frame)
+            if address_end is None:
+                return None
+        frame = cls.__new__(cls)
+        frame._raw = raw_frame
+        frame._address_end = address_end
+        frame._source = None
+        frame._destination = None
+        frame._path = None
+        frame._text = None
+        frame._tnc2 = None
+        return frame
+
+    @classmethod
+    def from_tnc2(cls, line):
+        """
+        Parses a frame in TNC2 monitor format, as received from APRS-IS.
+
+        The line is kept as the frame's TNC2 rendering and `text` is a view
+        of it, so passing the frame on to APRS-IS again costs nothing.
+
+        :param line: `source>destination,path:text`, a line ending is
+            ignored.
+        :type line: bytes or str
+        :returns: The frame, or None if the line isn't a frame.
+        :rtype: Frame
+        """
+        if isinstance(line, str):
+            line = line.encode('latin-1')
+        line = bytes(line).rstrip(b'\r\n')
+        header, separator, _ = line.partition(b':')
+        if not separator:
+            return None
+        source, separator, addresses = header.partition(b'>')
+        if not separator or not source:
+            return None
+        destination, _, path = addresses.partition(b',')
+        if not destination:
+            return None
+        frame = cls.__new__(cls)
+        frame._raw = None
+        frame._address_end = None
+        frame._source = decode_tnc2_address(source)
+        frame._destination = decode_tnc2_address(destination)
+        frame._path = decode_tnc2_path(path)
+        frame._text = memoryview(line)[len(header) + 1:]
+        frame._tnc2 = line
+        return frame
+
+    @classmethod
+    def from_dict(cls, frame):
+        """
+        Creates a frame from an APRS frame-as-dict.
+
+        :param frame: Dict with source, destination, path and text keys.
+        :type frame: dict
+        :rtype: Frame
+        """
+        return cls(frame['source'], frame['destination'], frame['path'], frame['text'])
+
+    @property
+    def raw(self):
+        """
+        Raw AX.25 encoding of this frame, or None once it was changed. Not
+        to be modified, even where it is a bytearray.
+        """
+        return self._raw
+
+    def __detach(self):
+        """Decodes every field so they can be changed without the raw frame,
+        and forgets the TNC2 rendering."""
+        self._tnc2 = None
+        raw_frame = self._raw
+        if raw_frame is not None:
+            if self._source is None:
+                self._source = decode_callsign(raw_frame, ADDRESS_LENGTH)
+            if self._destination is None:
+                self._destination = decode_callsign(raw_frame, 0)
+            if self._path is None:
+                self._path = decode_path(raw_frame, self._address_end)
+            if self._text is None:
+                self._text = memoryview(raw_frame)[self._address_end + 2:]
+            self._raw = None
+            self._address_end = None
+
+    def source_is(self, identity):
+        """
+        Checks the source without decoding it, for rejecting frames cheaply.
+
+        :param identity: Callsign[-SSID] to compare with.
+        :type identity: str
+        :rtype: bool
+        """
+        if self._source is not None or self._raw is None:
+            return self.source == identity
+        address = encode_callsign(identity)
+        raw_frame = self._raw
+        return (raw_frame[ADDRESS_LENGTH:ADDRESS_LENGTH + 6] == address[:6] and
+                raw_frame[ADDRESS_LENGTH + 6] & 0x1e == address[6])
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = decode_callsign(self._raw, ADDRESS_LENGTH)
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self.__detach()
+        self._source = value
+
+    @property
+    def destination(self):
+        if self._destination is None:
+            self._destination = decode_callsign(self._raw, 0)
+        return self._destination
+
+    @destination.setter
+    def destination(self, value):
+        self.__detach()
+        self._destination = value
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = decode_path(self._raw, self._address_end)
+        return self._path
+
+    @path.setter
+    def path(self, value):
+        self.__detach()
+        self._path = tuple(value)
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = memoryview(self._raw)[self._address_end + 2:]
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self.__detach()
+        self._text = Frame.__to_bytes(value)
+
+    @property
+    def tnc2(self):
+        """The frame in TNC2 monitor format, formatted on first use."""
+        if self._tnc2 is None:
+            self._tnc2 = format_tnc2(self.source, self.destination, self.path, self.text)
+        return self._tnc2
+
+    def to_dict(self):
+        """
+        :returns: APRS frame-as-dict, with `path` and `text` as lists.
+        :rtype: dict
+        """
+        return {'source': self.source, 'destination': self.destination,
+                'path': list(self.path), 'text': list(self.text)}
+
+    def with_path(self, path):
+        """
+        :param path: New path.
+        :type path: list or tuple
+        :returns: A copy of this frame with the path replaced.
+        :rtype: Frame
+        """
+        return self.__with_hops(0, len(self.path), tuple(path))
+
+    def replace_hop(self, index, *hops):
+        """
+        :param index: Position in the path of the hop to replace.
+        :type index: int
+        :param hops: Hops to put in its place, none removes it.
+        :type hops: str
+        :returns: A copy of this frame with one hop of the path replaced.
+        :rtype: Frame
+        """
+        return self.__with_hops(index, index + 1, hops)
+
+    def __with_hops(self, start, stop, hops):
+        path = self.path
+        if not 0 <= start <= stop <= len(path):
+            raise IndexError('hops %d to %d are not in the path' % (start, stop))
+        if len(path) - stop + start + len(hops) > MAX_ADDRESSES - 2:
+            raise ValueError('a path holds at most %d hops' % (MAX_ADDRESSES - 2))
+        frame = Frame.__new__(Frame)
+        frame._source = self._source
+        frame._destination = self._destination
+        frame._path = path[:start] + hops + path[stop:]
+        frame._text = self._text
+        frame._tnc2 = None
+        # Empty hops are left out of the decoded path, then path indexes no
+        # longer line up with the raw address field.
+        raw_frame = self._raw
+        if raw_frame is not None and len(path) * ADDRESS_LENGTH == self._address_end - 2 * ADDRESS_LENGTH:
+            frame._raw, frame._address_end = rewrite_path(
+                raw_frame, self._address_end, start, stop, hops)
+        else:
+            frame._source = self.source
+            frame._destination = self.destination
+            frame._text = self.text
+            frame._raw = None
+            frame._address_end = None
+        return frame
+
+    def __copy__(self):
+        frame = Frame.__new__(Frame)
+        for slot in Frame.__slots__:
+            setattr(frame, slot, getattr(self, slot))
+        return frame
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def __eq__(self, other):
+        if not isinstance(other, Frame):
+            return NotImplemented
+        return (self.source == other.source and
+                self.destination == other.destination and
+                self.path == other.path and self.text == other.text)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Frame(%r, %r, %r, %r)' % (
+            self.source, self.destination, self.path, bytes(self.text))
+
+    # Read/write dict view for code written against frame dicts.
+
+    def __getitem__(self, key):
+        if key not in FRAME_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FRAME_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FRAME_FIELDS
+
+    def __iter__(self):
+        return iter(FRAME_FIELDS)
+
+    def __len__(self):
+        return len(FRAME_FIELDS)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in FRAME_FIELDS else default
+
+    def keys(self):
+        return list(FRAME_FIELDS)
+
+    def values(self):
+        return [getattr(self, key) for key in FRAME_FIELDS]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in FRAME_FIELDS]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pre-encoded frames for periodic transmissions.
+
+Beacons, IDs and statuses only change when the configuration does, so
+they are built, encoded, hashed and formatted once when it is loaded and
+sent as-is every cycle after that.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import collections
+import threading
+
+import aprs.frame
+import aprs.util
+
+
+class PreparedFrame(collections.namedtuple('PreparedFrame', ['raw', 'key', 'formatted'])):
+
+    """
+    A frame's raw AX.25 encoding, `aprs.util.dedup_key` and TNC2 rendering.
+    `aprs.AprsKiss.write` sends `raw` untouched.
+
+    Only immutable values are kept, so the prepared frame can be shared by
+    every transmit cycle without one of them changing it for the others.
+    """
+
+    __slots__ = ()
+
+    @property
+    def frame(self):
+        """
+        :returns: A new frame decoded from `raw`, changing it does not
+            change the prepared frame.
+        :rtype: aprs.Frame
+        """
+        return aprs.frame.Frame.from_ax25(self.raw)
+
+
+def prepare_frame(frame):
+    """
+    :param frame: APRS frame to prepare.
+    :type frame: aprs.Frame
+    :rtype: PreparedFrame
+    """
+    return PreparedFrame(bytes(aprs.frame.encode_frame(frame)),
+                         aprs.util.dedup_key(frame),
+                         aprs.util.format_aprs_frame(frame))
+
+
+class PeriodicFrameCache(object):
+
+    """
+    Prepared periodic frames keyed by `(port_name, kind)`.
+
+    Entries are replaced as a whole, never modified, so a transmit cycle
+    that is running while the configuration is reloaded sends either the
+    old frame or the new one.
+    """
+
+    def __init__(self):
+        self.__frames = {}
+        self.__lock = threading.Lock()
+
+    def load(self, config, port_map, kind, destination):
+        """
+        (Re)builds the frames of one kind for every configured port, from
+        the `<kind>_text` and `<kind>_path` options of its port section.
+        Frames of that kind for ports no longer configured are dropped.
+
+        :param config: Loaded configuration.
+        :type config: configparser.ConfigParser
+        :param port_map: Ports by name, giving each port's identifier.
+        :type port_map: dict
+        :param kind: Frame kind, e.g. 'beacon'.
+        :type kind: str
+        :param destination: Destination of the frames, e.g. 'APRS'.
+        :type destination: str
+        """
+        frames = {}
+        for port_name, port in port_map.items():
+            port_section = 'PORT ' + port_name
+            if not config.has_section(port_section):
+                continue
+            text = config.get(port_section, kind + '_text')
+            path = config.get(port_section, kind + '_path')
+            frame = aprs.Frame(port['identifier'], destination, path.split(','), text.encode('ascii'))
+            frames[(port_name, kind)] = prepare_frame(frame)
+        with self.__lock:
+            self.__invalidate(kind)
+            self.__frames.update(frames)
+
+    def invalidate(self, kind=None):
+        """
+        :param kind: Frame kind to drop, or None to drop everything.
+        :type kind: str
+        """
+        with self.__lock:
+            self.__invalidate(kind)
+
+    def __invalidate(self, kind):
+        if kind is None:
+            self.__frames.clear()
+        else:
+            for key in [key for key in self.__frames if key[1] == kind]:
+                del self.__frames[key]
+
+    def get(self, port_name, kind):
+        """
+        :returns: The prepared frame, or None if there isn't one.
+        :rtype: PreparedFrame
+        """
+        return self.__frames.get((port_name, kind))
+
+    def items(self, kind):
+        """
+        :param kind: Frame kind.
+        :type kind: str
+        :returns: `(port_name, prepared_frame)` for every port with a frame
+            of that kind.
+        :rtype: list
+        """
+        with self.__lock:
+            return [(key[0], frame) for key, frame in self.__frames.items() if key[1] == kind]
+
+    def __len__(self):
+        return len(self.__frames)
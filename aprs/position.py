@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Position report decoding.
+
+Decodes the `!`, `=`, `/` and `@` data types, uncompressed (DDMM.mm) and
+base91 compressed alike, from a frame's text. Decoding is table driven
+slicing, there are no regular expressions.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import collections
+
+
+Position = collections.namedtuple('Position', [
+    'latitude', 'longitude', 'symbol_table', 'symbol', 'course', 'speed', 'altitude'])
+"""A decoded position: latitude and longitude in decimal degrees, north
+and east positive, the symbol table and code characters, course in
+degrees and speed in knots, altitude in feet. Course, speed and altitude
+are None when not reported."""
+
+# Data type identifiers and the offset of the position that follows them,
+# `/` and `@` reports carry a 7 character timestamp first.
+POSITION_OFFSETS = {ord('!'): 1, ord('='): 1, ord('/'): 8, ord('@'): 8}
+
+UNCOMPRESSED_LENGTH = 19
+COMPRESSED_LENGTH = 13
+EXTENSION_LENGTH = 7
+
+# Value of every byte as a base91 digit in each place of a 4 digit number.
+# Bytes that are not base91 digits are so negative that any sum including
+# one is too. BASE91 is the plain digit value, -1 for those bytes.
+BASE91_PLACES = tuple(
+    tuple((x - 33) * 91 ** place if 33 <= x <= 123 else -(1 << 40) for x in range(256))
+    for place in range(4))
+BASE91 = tuple(x - 33 if 33 <= x <= 123 else -1 for x in range(256))
+
+COMPRESSED_TABLES = frozenset(b'/\\ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghij')
+ALTITUDE_MARKER = b'/A='
+
+
+def decode_base91(digits):
+    """
+    :param digits: 4 base91 digits.
+    :type digits: bytes
+    :returns: Their value, negative if any isn't a base91 digit.
+    :rtype: int
+    """
+    return (BASE91_PLACES[3][digits[0]] + BASE91_PLACES[2][digits[1]] +
+            BASE91_PLACES[1][digits[2]] + BASE91_PLACES[0][digits[3]])
+
+
+def _decode_altitude(text, offset):
+    """Finds a /A=nnnnnn altitude in the comment starting at `offset`."""
+    marker = text.find(ALTITUDE_MARKER, offset)
+    if marker < 0:
+        return None
+    try:
+        return int(text[marker + 3:marker + 9])
+    except ValueError:
+        return None
+
+
+def _decode_uncompressed(text, offset):
+    position = text[offset:offset + UNCOMPRESSED_LENGTH]
+    if len(position) < UNCOMPRESSED_LENGTH:
+        return None
+    # Position ambiguity blanks out trailing digits.
+    latitude = position[0:7].replace(b' ', b'0')
+    longitude = position[9:17].replace(b' ', b'0')
+    if (latitude[4] != 0x2e or longitude[5] != 0x2e or
+            not (latitude[:4] + latitude[5:]).isdigit() or
+            not (longitude[:5] + longitude[6:]).isdigit()):
+        return None
+    north = position[7]
+    east = position[17]
+    if north not in b'NSns' or east not in b'EWew':
+        return None
+    latitude_minutes = float(latitude[2:])
+    longitude_minutes = float(longitude[3:])
+    if latitude_minutes >= 60 or longitude_minutes >= 60:
+        return None
+    latitude = int(latitude[0:2]) + latitude_minutes / 60.0
+    longitude = int(longitude[0:3]) + longitude_minutes / 60.0
+    if latitude > 90 or longitude > 180:
+        return None
+    if north in b'Ss':
+        latitude = -latitude
+    if east in b'Ww':
+        longitude = -longitude
+
+    course = speed = None
+    comment = offset + UNCOMPRESSED_LENGTH
+    extension = text[comment:comment + EXTENSION_LENGTH]
+    if (len(extension) == EXTENSION_LENGTH and extension[3] == 0x2f and
+            (extension[:3] + extension[4:]).isdigit()):
+        course = int(extension[:3])
+        speed = int(extension[4:])
+        comment += EXTENSION_LENGTH
+    return Position(latitude, longitude, chr(position[8]), chr(position[18]),
+                    course, speed, _decode_altitude(text, comment))
+
+
+def _decode_compressed(text, offset):
+    position = text[offset:offset + COMPRESSED_LENGTH]
+    if len(position) < COMPRESSED_LENGTH:
+        return None
+    y = decode_base91(position[1:5])
+    x = decode_base91(position[5:9])
+    if y < 0 or x < 0:
+        return None
+    course = speed = altitude = None
+    c = BASE91[position[10]]
+    s = BASE91[position[11]]
+    compression_type = BASE91[position[12]]
+    if position[10] != 0x20 and c >= 0 and s >= 0 and compression_type >= 0:
+        if compression_type & 0x18 == 0x10:
+            altitude = 1.002 ** (c * 91 + s)
+        elif c <= 89:
+            course = c * 4
+            speed = 1.08 ** s - 1
+    if altitude is None:
+        altitude = _decode_altitude(text, offset + COMPRESSED_LENGTH)
+    return Position(90 - y / 380926.0, -180 + x / 190463.0, chr(position[0]),
+                    chr(position[9]), course, speed, altitude)
+
+
+def decode_position(text):
+    """
+    Decodes a position report.
+
+    :param text: A frame's text.
+    :type text: bytes, memoryview or str
+    :returns: The position, or None if the text isn't a position report.
+    :rtype: Position
+    """
+    if isinstance(text, str):
+        text = text.encode('latin-1')
+    else:
+        text = bytes(text)
+    if not text:
+        return None
+    offset = POSITION_OFFSETS.get(text[0])
+    if offset is None or len(text) <= offset:
+        return None
+    if text[offset] in COMPRESSED_TABLES:
+        return _decode_compressed(text, offset)
+    return _decode_uncompressed(text, offset)
+
+
+def decode_positions(texts):
+    """
+    Decodes the position reports in many frames, such as a whole capture.
+
+    :param texts: Frame texts, or the frames themselves.
+    :type texts: iterable
+    :returns: A position or None for each entry, in order.
+    :rtype: list
+    """
+    positions = []
+    append = positions.append
+    for text in texts:
+        if not isinstance(text, (bytes, bytearray, memoryview, str)):
+            text = text.text
+        append(decode_position(text))
+    return positions
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Queue of lines waiting for an APRS-IS uplink.
+
+Both `aprs.AprsInternetService` and `aprs.aio.AsyncAprsInternetService`
+queue, batch and requeue through it, and only differ in how a batch is
+written to the server.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import collections
+
+import aprs.constants
+
+
+class UplinkQueue(object):
+
+    """
+    Bounded FIFO of TNC2 lines for APRS-IS.
+
+    Once `capacity` lines are waiting new ones are dropped and counted, so
+    a stalled server never holds up digipeating. Lines are handed out in
+    batches of up to `UPLINK_BATCH_BYTES`, a batch that failed to send is
+    put back at the head.
+
+    The queue does no locking of its own, every method must be called with
+    the owning service's lock held.
+    """
+
+    def __init__(self, capacity=aprs.constants.UPLINK_QUEUE_SIZE,
+                 line_overhead=0, batch_bytes=aprs.constants.UPLINK_BATCH_BYTES):
+        """
+        :param capacity: Most lines waiting at once.
+        :type capacity: int
+        :param line_overhead: Bytes the writer adds to every line, such as a
+            line ending, counted against `batch_bytes`.
+        :type line_overhead: int
+        :param batch_bytes: Most bytes handed out in one batch.
+        :type batch_bytes: int
+        """
+        self.capacity = capacity
+        self.line_overhead = line_overhead
+        self.batch_bytes = batch_bytes
+        # Lines sent, dropped with the queue full and the most ever queued.
+        self.sent = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.in_flight = 0
+        self._lines = collections.deque()
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def idle(self):
+        """True once nothing is queued or being written."""
+        return not self._lines and not self.in_flight
+
+    def put(self, line):
+        """
+        :param line: Line to queue.
+        :type line: bytes
+        :returns: True if queued, False if dropped because the queue is full.
+        :rtype: bool
+        """
+        if len(self._lines) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._lines.append(line)
+        if len(self._lines) > self.high_water:
+            self.high_water = len(self._lines)
+        return True
+
+    def take_batch(self):
+        """
+        Takes the lines to write next, the queue must not be empty.
+
+        :returns: Lines in the order to send them.
+        :rtype: list
+        """
+        lines = self._lines
+        overhead = self.line_overhead
+        batch = [lines.popleft()]
+        size = len(batch[0]) + overhead
+        while lines and size + len(lines[0]) + overhead <= self.batch_bytes:
+            size += len(lines[0]) + overhead
+            batch.append(lines.popleft())
+        self.in_flight = len(batch)
+        return batch
+
+    def done(self, batch):
+        """Counts a batch taken with `take_batch` as sent."""
+        self.sent += len(batch)
+        self.in_flight = 0
+
+    def requeue(self, batch):
+        """
+        Puts back a batch that failed to send, ahead of everything queued
+        since. Lines that no longer fit are dropped.
+        """
+        self.in_flight = 0
+        room = max(0, self.capacity - len(self._lines))
+        if room < len(batch):
+            self.dropped += len(batch) - room
+            batch = batch[:room]
+        self._lines.extendleft(reversed(batch))
+
+    def clear(self):
+        """Drops everything queued, counting it as dropped."""
+        self.dropped += len(self._lines)
+        self._lines.clear()
@@ -9,9 +9,11 @@ __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
 
 import logging
+import zlib
 
 import aprs.constants
 import aprs.decimaldegrees
+import aprs.frame
 import kiss.constants
 import math
 
@@ -28,17 +30,11 @@ def dec2dm_lat(dec):
         >>> aprs_lat
         '3744.51N'
     """
-    dec_min = aprs.decimaldegrees.decimal2dm(dec)
+    deg, minutes = aprs.decimaldegrees.float2dm(dec)
 
-    deg = dec_min[0]
-    abs_deg = abs(deg)
-
-    if not deg == abs_deg:
-        suffix = 'S'
-    else:
-        suffix = 'N'
-
-    return ''.join([str(abs_deg), "%.2f" % dec_min[1], suffix])
+    if deg < 0:
+        return ''.join([str(-deg), "%.2f" % minutes, 'S'])
+    return ''.join([str(deg), "%.2f" % minutes, 'N'])
 
 
 def dec2dm_lng(dec):
@@ -51,23 +47,46 @@ def dec2dm_lng(dec):
         >>> aprs_lng
         '12223.30W'
     """
-    dec_min = aprs.decimaldegrees.decimal2dm(dec)
+    deg, minutes = aprs.decimaldegrees.float2dm(dec)
 
-    deg = dec_min[0]
-    abs_deg = abs(deg)
+    if deg < 0:
+        return ''.join([str(-deg), "%.2f" % minutes, 'W'])
+    return ''.join([str(deg), "%.2f" % minutes, 'E'])
+
+
+def dec2dm_lat_array(decs):
+    """Converts many DecDeg latitudes to APRS Coord format at once.
+    Requires NumPy.
+
+    :param decs: Latitudes in decimal degrees.
+    :type decs: array_like
+    :returns: Latitudes in APRS format, shaped like `decs`.
+    :rtype: numpy.ndarray
+    """
+    import aprs.decimaldegrees_array
+    return aprs.decimaldegrees_array.dec2dm_lat_array(decs)
 
-    if not deg == abs_deg:
-        suffix = 'W'
-    else:
-        suffix = 'E'
 
-    return ''.join([str(abs_deg), "%.2f" % dec_min[1], suffix])
+def dec2dm_lng_array(decs):
+    """Converts many DecDeg longitudes to APRS Coord format at once.
+    Requires NumPy.
+
+    :param decs: Longitudes in decimal degrees.
+    :type decs: array_like
+    :returns: Longitudes in APRS format, shaped like `decs`.
+    :rtype: numpy.ndarray
+    """
+    import aprs.decimaldegrees_array
+    return aprs.decimaldegrees_array.dec2dm_lng_array(decs)
 
 
 def decode_aprs_ascii_frame(ascii_frame):
     """
     Breaks an ASCII APRS Frame down to it's constituent parts.
 
+    The path keeps the destination as its first element, use
+    `aprs.Frame.from_tnc2` for a frame like the KISS decoder produces.
+
     :param frame: ASCII APRS Frame.
     :type frame: str
 
@@ -75,23 +94,33 @@ def decode_aprs_ascii_frame(ascii_frame):
     :rtype: dict
     """
     logging.debug('frame=%s', ascii_frame)
-    decoded_frame = {}
-    frame_so_far = ''
-
-    for char in ascii_frame:
-        if '>' in char and 'source' not in decoded_frame:
-            decoded_frame['source'] = frame_so_far
-            frame_so_far = ''
-        elif ':' in char and 'path' not in decoded_frame:
-            decoded_frame['path'] = frame_so_far
-            frame_so_far = ''
-        else:
-            frame_so_far = ''.join([frame_so_far, char])
+    source, _, addresses = ascii_frame.partition('>')
+    path, _, text = addresses.partition(':')
+    return {'source': source, 'destination': path.partition(',')[0],
+            'path': path, 'text': text}
+
+
+def decode_aprs_ascii_frames(lines):
+    """
+    Parses many frames in TNC2 monitor format, such as an APRS-IS feed.
+
+    Server comments (lines starting with '#'), blank lines and lines that
+    aren't frames are skipped.
 
-    decoded_frame['text'] = frame_so_far
-    decoded_frame['destination'] = decoded_frame['path'].split(',')[0]
+    :param lines: Lines, or a buffer holding many lines.
+    :type lines: iterable or bytes
+    :returns: Generator of frames.
+    :rtype: generator
+    """
+    if isinstance(lines, (bytes, bytearray, memoryview)):
+        lines = bytes(lines).splitlines()
+    from_tnc2 = aprs.frame.Frame.from_tnc2
+    for line in lines:
+        if line and line[:1] not in (b'#', '#'):
+            frame = from_tnc2(line)
+            if frame is not None:
+                yield frame
 
-    return decoded_frame
 
 def format_path(path_list):
     """
@@ -106,23 +135,39 @@ def format_path(path_list):
     return ','.join(path_list)
 
 
+def format_aprs_frame_bytes(frame):
+    """
+    Formats APRS frame into TNC2 monitor format, as sent to APRS-IS.
+
+    A frame keeps its rendering, so formatting it again for the console
+    and for APRS-IS costs nothing.
+
+    :param frame: APRS frame
+    :type frame: aprs.Frame or dict
+
+    :return: APRS frame-as-bytes, without a line ending.
+    :rtype: bytes
+    """
+    if isinstance(frame, aprs.frame.Frame):
+        return frame.tnc2
+    text = frame['text']
+    if not isinstance(text, (bytes, bytearray, memoryview)):
+        text = bytes(text)
+    return aprs.frame.format_tnc2(frame['source'], frame['destination'], frame['path'], text)
+
+
 def format_aprs_frame(frame):
     """
-    Formats APRS frame-as-dict into APRS frame-as-string.
+    Formats APRS frame into APRS frame-as-string.
 
-    :param frame: APRS frame-as-dict
-    :type frame: dict
+    :param frame: APRS frame
+    :type frame: aprs.Frame or dict
 
     :return: APRS frame-as-string.
     :rtype: str
     """
-    formatted_frame = '>'.join([frame['source'], frame['destination']])
-    if frame['path']:
-        formatted_frame = ','.join([formatted_frame, format_path(frame['path'])])
-    formatted_frame += ':'
-    for frame_byte in frame['text']:
-        formatted_frame += chr(frame_byte)
-    return formatted_frame
+    return format_aprs_frame_bytes(frame).decode('latin-1')
+
 
 def valid_callsign(callsign):
     """
@@ -170,23 +215,34 @@ def run_doctest():  # pragma: no cover
     return doctest.testmod(aprs.util)
 
 
+def dedup_key(frame):
+    """
+    Produces the key duplicate frames are recognised by: a CRC-32 of the
+    source, destination and text, combined with their length. The path is
+    left out, so digipeated copies of a frame share its key.
+
+    :param frame: A frame packet
+    :type frame: aprs.Frame or dict
+    :return: A 64 bit key.
+    :rtype: int
+    """
+    header = ''.join([frame['source'], '>', frame['destination'], ':']).encode('latin-1')
+    text = frame['text']
+    if not isinstance(text, (bytes, bytearray, memoryview)):
+        text = bytes(text)
+    return (len(header) + len(text)) << 32 | zlib.crc32(text, zlib.crc32(header))
+
+
 def hash_frame(frame):
     """
-    Produces an integr value that acts as a hash for the frame
+    Produces an integer value that acts as a hash for the frame, see
+    `dedup_key`.
+
     :param frame: A frame packet
-    :type frame: dict
+    :type frame: aprs.Frame or dict
     :return: an integer representing the hash
     """
-    hash = 0
-    index = 0
-    frame_string_prefix = frame['source'] + ">" + frame['destination'] + ":"
-    for frame_chr in frame_string_prefix:
-        hash = ord(frame_chr)<<(8*(index%4)) ^ hash
-        index += 1
-    for byte in frame['text']:
-        hash = byte<<(8*(index%4)) ^ hash
-        index += 1
-    return hash
+    return dedup_key(frame)
 
 
 if __name__ == '__main__':
@@ -0,0 +1 @@
+"""Benchmarks for APEX Python Module."""
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Batch versus per-frame AX.25 decoding.
+
+Decodes the address fields of a large burst of frames, once frame by frame
+through `aprs.Frame` and once in a single `aprs.AprsKiss.decode_batch`
+call, then converts the batch to frames. Needs NumPy.
+
+Every frame comes from a different station, as on a busy channel, so the
+per-frame decoder's address cache does not flatter it.
+
+Run from the top of the source tree:
+
+$ python -m benchmarks.aprs_batch
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import timeit
+
+import aprs
+import aprs.frame
+
+
+FRAMES = 100000
+REPEAT = 3
+
+
+def callsign(number):
+    """A distinct made up callsign for every number below 36 ** 4."""
+    letters = []
+    for _ in range(4):
+        number, digit = divmod(number, 36)
+        letters.append('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'[digit])
+    return 'K' + ''.join(letters)
+
+
+def make_frames():
+    """Frames from distinct stations through distinct digipeaters."""
+    return [aprs.frame.encode_frame(aprs.Frame(
+        '%s-%d' % (callsign(i), i % 16), 'APRS',
+        [callsign(FRAMES + i) + '*', 'WIDE2-1'], b'>benchmark'))
+            for i in range(FRAMES)]
+
+
+def decode_each(raw_frames):
+    """Decodes every address field one frame at a time."""
+    decoded = []
+    for raw_frame in raw_frames:
+        frame = aprs.Frame.from_ax25(raw_frame)
+        decoded.append((frame.source, frame.destination, frame.path))
+    return decoded
+
+
+def main():
+    """Runs the benchmark and prints per-frame timings."""
+    raw_frames = make_frames()
+    batch = aprs.AprsKiss.decode_batch(raw_frames)
+    for name, func in [
+            ('per frame', lambda: decode_each(raw_frames)),
+            ('batch', lambda: aprs.AprsKiss.decode_batch(raw_frames)),
+            ('to frames', batch.frames)]:
+        # Start every run with a cold address cache.
+        best = min(timeit.repeat(func, setup=aprs.frame.decode_address.cache_clear,
+                                 number=1, repeat=REPEAT))
+        print('%-10s %8.2f us/frame %10.0f frames/s' % (
+            name, best / FRAMES * 1e6, FRAMES / best))
+
+
+if __name__ == '__main__':
+    main()
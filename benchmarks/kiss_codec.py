@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Round-trip benchmark for the KISS codec.
+
+Encodes a burst of AX.25 frames with `kiss.codec.Encoder`, then feeds the
+resulting stream back through `kiss.codec.Deframer` in serial sized reads.
+
+Run from the top of the source tree:
+
+$ python -m benchmarks.kiss_codec
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import timeit
+
+import kiss.codec
+import kiss.constants
+
+
+FRAMES = 1000
+REPEAT = 5
+
+
+def load_frames(path='tests/test_frames.log'):
+    """Loads the recorded test frames, padded out to a burst."""
+    with open(path, 'rb') as test_frames:
+        recorded = [line.strip() for line in test_frames if line.strip()]
+    # One frame with special codes so the escaping path is exercised too.
+    recorded.append(recorded[0] + bytes([kiss.constants.FEND, kiss.constants.FESC]))
+    return [recorded[i % len(recorded)] for i in range(FRAMES)]
+
+
+def encode(frames, encoder):
+    """Encodes every frame into the reusable buffer."""
+    written = []
+    for frame in frames:
+        encoder.append(frame)
+    encoder.flush(lambda data: written.append(bytes(data)))
+    return written[0]
+
+
+def decode(stream, deframer):
+    """Feeds the stream to the deframer in READ_BYTES sized chunks."""
+    frames = []
+    view = memoryview(stream)
+    for start in range(0, len(stream), kiss.constants.READ_BYTES):
+        frames += deframer.feed(view[start:start + kiss.constants.READ_BYTES])
+    return frames
+
+
+def main():
+    """Runs the benchmark and prints per-frame timings."""
+    frames = load_frames()
+    encoder = kiss.codec.Encoder()
+    deframer = kiss.codec.Deframer()
+    stream = encode(frames, encoder)
+
+    decoded = decode(stream, deframer)
+    assert decoded == [b'\x00' + frame for frame in frames], 'round trip failed'
+
+    for name, func in [
+            ('encode', lambda: encode(frames, encoder)),
+            ('decode', lambda: decode(stream, deframer)),
+            ('round trip', lambda: decode(encode(frames, encoder), deframer))]:
+        best = min(timeit.repeat(func, number=10, repeat=REPEAT)) / 10
+        print('%-10s %8.2f us/frame %10.0f frames/s' % (
+            name, best / FRAMES * 1e6, FRAMES / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,84 +8,149 @@ __author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
 __license__ = 'Apache License, Version 2.0'
 __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
-import time
+import asyncio
 import signal
 import sys
+import kiss
+import kiss.aio
+import kiss.airtime
 import kiss.constants
 import aprs
+import aprs.aio
+import aprs.dedup
+import aprs.constants
 import aprs.util
-import threading
 import configparser
-import cachetools
 import traceback
 import pluginloader
 
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
 port_map = {}
+tnc_ports = {}
 config = configparser.ConfigParser()
 config.read('apex.cfg')
 for section in config.sections():
     if section.startswith("TNC "):
         tnc_name = section.split(" ")[1]
-        kiss_tnc = aprs.AprsKiss(com_port=config.get(section, 'com_port'), baud=config.get(section, 'baud'))
-        kiss_init_string = config.get(section,'kiss_init')
-        if kiss_init_string == 'MODE_INIT_W8DED':
-            kiss_tnc.start(kiss.constants.MODE_INIT_W8DED)
-        elif kiss_init_string == 'MODE_INIT_KENWOOD_D710':
-            kiss_tnc.start(kiss.constants.MODE_INIT_KENWOOD_D710)
-        elif kiss_init_string == 'NONE':
-            kiss_tnc.start()
+        queue_settings = {
+            'rx_queue_size': config.getint(section, 'rx_queue_size', fallback=kiss.constants.RX_QUEUE_SIZE),
+            'rx_overflow': config.get(section, 'rx_overflow', fallback=kiss.constants.OVERFLOW_DROP_OLDEST),
+            'tx_queue_size': config.getint(section, 'tx_queue_size', fallback=kiss.constants.TX_QUEUE_SIZE)}
+        if config.has_option(section, 'host'):
+            # KISS over TCP is connected, and kept connected, by a supervisor
+            # once the event loop is running.
+            kiss_tnc = aprs.AprsKiss(host=config.get(section, 'host'), tcp_port=config.getint(section, 'tcp_port'), **queue_settings)
         else:
-            raise Exception("KISS init mode not specified")
+            kiss_tnc = aprs.AprsKiss(com_port=config.get(section, 'com_port'), baud=config.get(section, 'baud'), **queue_settings)
+            kiss_init_string = config.get(section,'kiss_init')
+            if kiss_init_string == 'MODE_INIT_W8DED':
+                kiss_tnc.start(kiss.constants.MODE_INIT_W8DED)
+            elif kiss_init_string == 'MODE_INIT_KENWOOD_D710':
+                kiss_tnc.start(kiss.constants.MODE_INIT_KENWOOD_D710)
+            elif kiss_init_string == 'NONE':
+                kiss_tnc.start()
+            else:
+                raise Exception("KISS init mode not specified")
+        if config.has_option(section, 'capture_file'):
+            kiss_tnc.start_capture(config.get(section, 'capture_file'))
         for port in range(1, 1+int(config.get(section, 'port_count'))):
             port_name = tnc_name + '-' + str(port)
             port_section = 'PORT ' + port_name
             port_identifier = config.get(port_section, 'identifier')
             port_net = config.get(port_section, 'net')
             tnc_port = int(config.get(port_section, 'tnc_port'))
-            port_map[port_name] = {'identifier':port_identifier, 'net':port_net, 'tnc':kiss_tnc, 'tnc_port':tnc_port}
+            dupe_window = config.getfloat(port_section, 'dupe_window', fallback=aprs.constants.DEDUP_WINDOW)
+            if dupe_window > aprs.constants.DEDUP_MAX_WINDOW:
+                raise Exception('dupe_window of ' + port_name + ' is longer than the ' + str(aprs.constants.DEDUP_MAX_WINDOW) + ' second maximum')
+            port_map[port_name] = {'identifier':port_identifier, 'net':port_net, 'tnc':kiss_tnc, 'tnc_port':tnc_port, 'dupe_window':dupe_window}
+            if config.has_option(port_section, 'duty_cycle'):
+                # TX delay and tail are in milliseconds. Unless configured
+                # they are assumed to be the KISS defaults, which is only a
+                # guess: no TNC is ever sent DEFAULT_KISS_CONFIG_VALUES, so
+                # set them to match the TNC's own settings.
+                airtime = kiss.airtime.AirtimeLimiter(
+                    config.getint(port_section, 'baud'),
+                    tx_delay=config.getint(port_section, 'tx_delay', fallback=10*kiss.constants.DEFAULT_KISS_CONFIG_VALUES['TX_DELAY']) / 1000.0,
+                    tx_tail=config.getint(port_section, 'tx_tail', fallback=10*kiss.constants.DEFAULT_KISS_CONFIG_VALUES['TX_TAIL']) / 1000.0,
+                    duty_cycle=config.getfloat(port_section, 'duty_cycle') / 100.0)
+                kiss_tnc.set_airtime_limit(tnc_port, airtime)
+                port_map[port_name]['airtime'] = airtime
+            tnc_ports.setdefault(kiss_tnc, {})[tnc_port] = port_name
     elif section == "APRS-IS":
         aprsis_callsign = config.get('APRS-IS', 'callsign')
         aprsis_password = config.get('APRS-IS', 'password')
         aprsis_server = config.get('APRS-IS', 'server')
         aprsis_server_port = config.get('APRS-IS', 'server_port')
-        aprsis = aprs.AprsInternetService(aprsis_callsign, aprsis_password)
-        aprsis.connect(aprsis_server, int(aprsis_server_port))
+        aprsis = aprs.aio.AsyncAprsInternetService(aprsis_callsign, aprsis_password, loop)
 
-packet_cache = cachetools.TTLCache(10000, 5)
+packet_cache = aprs.dedup.DedupStore()
 
-def sigint_handler(signal, frame):
-    for port in port_map.values():
-        port['tnc'].close()
-    sys.exit(0)
+def handle_frame(tnc, tnc_port, frame):
+    port_name = tnc_ports[tnc].get(tnc_port)
+    if port_name is None:
+        # Traffic on a radio port that isn't configured is not ours to handle.
+        return
+    port = port_map[port_name]
+    formatted_aprs = aprs.util.format_aprs_frame(frame)
+    print(port_name + " << " + formatted_aprs)
+    for plugin in plugins:
+        try:
+            plugin.handle_packet(frame, port, port_name)
+        except Exception as ex:
+            # We want to keep the loop alive so long as the application runs.
+            traceback.print_exc(file=sys.stdout)
+            print("caught exception while reading packet: " + str(ex))
 
-signal.signal(signal.SIGINT, sigint_handler)
+async def main():
+    await aprsis.connect(aprsis_server, int(aprsis_server_port))
+    tasks = [asyncio.ensure_future(aprsis.run())]
 
-print("Press ctrl + c at any time to exit")
+    for tnc in tnc_ports.keys():
+        if 'tcp' in tnc.interface_mode:
+            supervisor = kiss.aio.TcpSupervisor(tnc, handle_frame, loop)
+            supervisor.start()
+            supervisors.append(supervisor)
+        else:
+            await kiss.aio.connect(tnc, handle_frame, loop)
+
+    #start the plugins
+    plugin_loaders=pluginloader.getPlugins()
+    for plugin_loader in plugin_loaders:
+        loaded_plugin=pluginloader.loadPlugin(plugin_loader)
+        plugins.append(loaded_plugin)
+        tasks.append(pluginloader.runPlugin(loaded_plugin, loop, config, port_map, packet_cache, aprsis))
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def shutdown():
+    for supervisor in supervisors:
+        supervisor.stop()
+    for tnc in tnc_ports.keys():
+        tnc.close()
+    # Let what is queued for APRS-IS go out before the loop stops.
+    closing = asyncio.ensure_future(aprsis.close(), loop=loop)
+    closing.add_done_callback(lambda _: loop.stop())
+
+def reload_config():
+    # Only what plugins build from the configuration is reloaded, TNCs and
+    # ports stay as they were started.
+    config.read('apex.cfg')
+    for plugin in plugins:
+        if hasattr(plugin, 'reload'):
+            plugin.reload(config)
+    print("Configuration reloaded")
 
-#start the plugins
 plugins = []
-plugin_loaders=pluginloader.getPlugins()
-for plugin_loader in plugin_loaders:
-    loaded_plugin=pluginloader.loadPlugin(plugin_loader)
-    plugins.append(loaded_plugin)
-    threading.Thread(target=loaded_plugin.start, args=(config, port_map, packet_cache, aprsis)).start()
-
-while 1:
-    something_read = False
-    try:
-        for port_name in port_map.keys():
-            port = port_map[port_name]
-            frame = port['tnc'].read()
-            if frame:
-                formatted_aprs = aprs.util.format_aprs_frame(frame)
-                print(port_name + " << " + formatted_aprs)
-                for plugin in plugins:
-                    something_read = True
-                    plugin.handle_packet(frame, port, port_name)
-    except Exception as ex:
-        # We want to keep this thread alive so long as the application runs.
-        traceback.print_exc(file=sys.stdout)
-        print("caught exception while reading packet: " + str(ex))
-
-    if something_read is False:
-        time.sleep(1)
+supervisors = []
+loop.add_signal_handler(signal.SIGINT, shutdown)
+loop.add_signal_handler(signal.SIGHUP, reload_config)
+
+print("Press ctrl + c at any time to exit")
+
+try:
+    loop.run_until_complete(main())
+except RuntimeError:
+    # Stopped by shutdown() before main() completed.
+    pass
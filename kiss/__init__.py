@@ -22,6 +22,8 @@ __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
 import logging
 from .kiss import Kiss
+from .codec import Deframer
+from .reactor import Reactor
 
 
 # Set default logging handler to avoid "No handler found" warnings.
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""asyncio transports for KISS interfaces."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import asyncio
+import logging
+import os
+import threading
+
+import kiss.constants
+import kiss.util
+
+
+class KissProtocol(asyncio.Protocol):
+
+    """
+    asyncio protocol driving a `kiss.Kiss` interface.
+
+    Received bytes are pushed into the interface's deframer and the frames
+    it produces, decoded by the interface's own `read_many_tagged` (so an
+    `aprs.AprsKiss` yields APRS frames), are handed to a callback along
+    with the TNC port they arrived on. While connected the interface writes
+    through this protocol, so `Kiss.write` never blocks and may be called
+    from any thread.
+    """
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(kiss.constants.LOG_LEVEL)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(kiss.constants.LOG_LEVEL)
+    formatter = logging.Formatter(kiss.constants.LOG_FORMAT)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+    def __init__(self, interface, callback, loop=None):
+        self.interface = interface
+        self.callback = callback
+        self.loop = loop or asyncio.get_event_loop()
+        self.transport = None
+        self.write_transport = None
+        self.closed = self.loop.create_future()
+        self._loop_thread = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.write_transport is None:
+            self.write_transport = transport
+        self._loop_thread = threading.get_ident()
+        # Whatever was half received before a reconnect is garbage now.
+        self.interface.deframer.reset()
+        self.interface.transport = self
+        self.interface.tx_queue.resume()
+
+    def data_received(self, data):
+        self.interface.feed(data)
+        for tnc_port, frame in self.interface.read_many_tagged():
+            try:
+                self.callback(self.interface, tnc_port, frame)
+            except Exception:  # pylint: disable=W0703
+                # One bad frame or handler must not stop the other ports.
+                self.logger.exception('Error handling frame %s', frame)
+
+    def connection_lost(self, exc):
+        if self.interface.transport is self:
+            self.interface.tx_queue.pause()
+            self.interface.transport = None
+        if self.write_transport is not self.transport:
+            self.write_transport.close()
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+    def write(self, data):
+        """
+        Queues encoded bytes on the transport.
+
+        :param data: Encoded KISS frames.
+        :type data: bytes or bytearray
+        """
+        if threading.get_ident() == self._loop_thread:
+            self.write_transport.write(data)
+        else:
+            # The encoder reuses its buffer as soon as we return.
+            self.loop.call_soon_threadsafe(self.write_transport.write, bytes(data))
+
+    def close(self):
+        """Closes the underlying transport."""
+        self.transport.close()
+
+
+async def connect(interface, callback, loop=None):
+    """
+    Hands a started KISS interface over to the event loop.
+
+    TCP interfaces are wrapped as a socket transport, serial interfaces as
+    a pair of pipe transports over the serial port's file descriptor.
+    `Kiss.start` must have been called first so the port is open and any
+    KISS mode init string has been sent.
+
+    :param interface: Started interface to drive from the loop.
+    :type interface: kiss.Kiss
+    :param callback: Called as `callback(interface, tnc_port, frame)` on the
+        loop for every frame received.
+    :type callback: func
+    :returns: The connected protocol.
+    :rtype: KissProtocol
+    """
+    loop = loop or asyncio.get_event_loop()
+    protocol = KissProtocol(interface, callback, loop)
+
+    if 'tcp' in interface.interface_mode:
+        await loop.create_connection(lambda: protocol, sock=interface.interface)
+    elif 'serial' in interface.interface_mode:
+        write_pipe = os.fdopen(os.dup(interface.fileno()), 'wb', buffering=0)
+        protocol.write_transport, _ = await loop.connect_write_pipe(
+            asyncio.BaseProtocol, write_pipe)
+        await loop.connect_read_pipe(lambda: protocol, interface.interface)
+
+    return protocol
+
+
+class TcpSupervisor(object):
+
+    """
+    Keeps a KISS-over-TCP interface connected.
+
+    Connection attempts run as a task on the event loop, so a TNC that is
+    down never holds up the other ports. After a failed attempt or a
+    dropped connection the supervisor waits with exponential backoff plus
+    jitter before trying again. While the link is down the interface's
+    transmit queue is paused: frames are buffered up to its capacity and
+    shed beyond that.
+    """
+
+    logger = KissProtocol.logger
+
+    def __init__(self, interface, callback, loop=None,
+                 min_delay=kiss.constants.RECONNECT_MIN_DELAY,
+                 max_delay=kiss.constants.RECONNECT_MAX_DELAY):
+        self.interface = interface
+        self.callback = callback
+        self.loop = loop or asyncio.get_event_loop()
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.protocol = None
+        self.connects = 0
+        self.failures = 0
+        self._attempt = 0
+        self._task = None
+
+    @property
+    def connected(self):
+        """True while a connection to the TNC is up."""
+        return self.protocol is not None and not self.protocol.closed.done()
+
+    def start(self):
+        """
+        Starts supervising in the background.
+
+        :returns: The supervising task.
+        :rtype: asyncio.Task
+        """
+        self.interface.tx_queue.pause()
+        self.interface.start_writer()
+        self._task = asyncio.ensure_future(self.run(), loop=self.loop)
+        return self._task
+
+    def stop(self):
+        """Stops reconnecting and closes the connection."""
+        if self._task is not None:
+            self._task.cancel()
+        if self.connected:
+            self.protocol.close()
+
+    def backoff(self):
+        """
+        :returns: Seconds to wait before the next connection attempt.
+        :rtype: float
+        """
+        self._attempt += 1
+        return kiss.util.backoff_delay(self._attempt - 1, self.min_delay, self.max_delay)
+
+    async def run(self):
+        """Connects, waits for the connection to drop and reconnects, forever."""
+        while True:
+            try:
+                _, self.protocol = await self.loop.create_connection(
+                    lambda: KissProtocol(self.interface, self.callback, self.loop),
+                    self.interface.host, self.interface.tcp_port)
+            except OSError as ex:
+                self.failures += 1
+                self.logger.warning('Connecting to %s:%s failed: %s',
+                                    self.interface.host, self.interface.tcp_port, ex)
+            else:
+                self.connects += 1
+                self._attempt = 0
+                self.logger.info('Connected to %s:%s',
+                                 self.interface.host, self.interface.tcp_port)
+                exc = await self.protocol.closed
+                self.logger.warning('Lost connection to %s:%s: %s',
+                                    self.interface.host, self.interface.tcp_port, exc)
+            await asyncio.sleep(self.backoff())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Airtime budgeting for radio ports."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import collections
+import threading
+import time
+
+import kiss.constants
+
+
+# HDLC opening and closing flags plus the 16 bit FCS, added by the TNC.
+AX25_OVERHEAD_BYTES = 4
+
+
+class AirtimeLimiter(object):
+
+    """
+    Token bucket of transmit time for a single radio port.
+
+    The bucket holds seconds of airtime, refills at `duty_cycle` seconds
+    per second and holds at most `duty_cycle * window` seconds, which is the
+    longest burst the port may key up for. Digipeats are always sent, even
+    if that overdraws the bucket, since dropping them breaks other
+    stations' paths; the debt then holds back everything else. Frames below
+    digipeat priority wait for the bucket to refill, and frames at or below
+    `drop_priority` are dropped rather than left to go out stale. A frame
+    longer than the burst itself only waits for a full bucket, then
+    overdraws it.
+    """
+
+    def __init__(self, baud, tx_delay=0.0, tx_tail=0.0, duty_cycle=1.0,
+                 window=kiss.constants.AIRTIME_WINDOW,
+                 drop_priority=kiss.constants.TX_PRIORITY_STATUS):
+        """
+        :param baud: Over the air bit rate.
+        :type baud: int
+        :param tx_delay: Seconds the transmitter is keyed before data starts.
+        :type tx_delay: float
+        :param tx_tail: Seconds the transmitter stays keyed after the data.
+        :type tx_tail: float
+        :param duty_cycle: Fraction of the time the port may transmit.
+        :type duty_cycle: float
+        :param window: Seconds over which the duty cycle is measured.
+        :type window: float
+        :param drop_priority: Frames of this priority class or lower are
+            dropped instead of deferred when over budget.
+        :type drop_priority: int
+        """
+        if baud <= 0:
+            raise Exception('baud must be positive')
+        if not 0 < duty_cycle <= 1:
+            raise Exception('duty_cycle must be in (0, 1]')
+        self.baud = baud
+        self.tx_delay = tx_delay
+        self.tx_tail = tx_tail
+        self.duty_cycle = duty_cycle
+        self.window = window
+        self.drop_priority = drop_priority
+        self.capacity = duty_cycle * window
+        self.tokens = self.capacity
+        self.sent = 0
+        self.deferred = 0
+        self.dropped = 0
+        self._updated = time.monotonic()
+        self._history = collections.deque()
+        self._history_total = 0.0
+        self._lock = threading.Lock()
+
+    def airtime(self, length):
+        """
+        :param length: Bytes in the AX.25 frame, as handed to the TNC.
+        :type length: int
+        :returns: Seconds the transmitter is keyed to send the frame.
+        :rtype: float
+        """
+        return (self.tx_delay + self.tx_tail +
+                (length + AX25_OVERHEAD_BYTES) * 8.0 / self.baud)
+
+    def __refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.duty_cycle)
+        self._updated = now
+        history = self._history
+        while history and now - history[0][0] >= self.window:
+            self._history_total -= history.popleft()[1]
+
+    def admit(self, length, priority=kiss.constants.TX_PRIORITY_DIGIPEAT):
+        """
+        Decides whether a frame may be sent now, and charges the bucket if so.
+
+        :param length: Bytes in the AX.25 frame.
+        :type length: int
+        :param priority: One of the `TX_PRIORITY_*` classes.
+        :type priority: int
+        :returns: `AIRTIME_SEND`, `AIRTIME_DEFER` or `AIRTIME_DROP`.
+        :rtype: int
+        """
+        airtime = self.airtime(length)
+        now = time.monotonic()
+        with self._lock:
+            self.__refill(now)
+            if (priority > kiss.constants.TX_PRIORITY_DIGIPEAT and
+                    self.tokens < min(airtime, self.capacity)):
+                if priority >= self.drop_priority:
+                    self.dropped += 1
+                    return kiss.constants.AIRTIME_DROP
+                self.deferred += 1
+                return kiss.constants.AIRTIME_DEFER
+            self.tokens -= airtime
+            self.sent += 1
+            self._history.append((now, airtime))
+            self._history_total += airtime
+        return kiss.constants.AIRTIME_SEND
+
+    def wait_time(self, length):
+        """
+        :param length: Bytes in the AX.25 frame.
+        :type length: int
+        :returns: Seconds until the bucket holds enough airtime for the frame.
+        :rtype: float
+        """
+        airtime = min(self.airtime(length), self.capacity)
+        with self._lock:
+            self.__refill(time.monotonic())
+            return max(0.0, (airtime - self.tokens) / self.duty_cycle)
+
+    def utilization(self):
+        """
+        :returns: Fraction of the last `window` seconds spent transmitting.
+        :rtype: float
+        """
+        with self._lock:
+            self.__refill(time.monotonic())
+            return self._history_total / self.window
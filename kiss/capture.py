@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Binary capture files of KISS traffic.
+
+A capture file is `CAPTURE_MAGIC` followed by records, each a fixed header
+and the raw, unescaped frame as it went over the KISS link minus its
+command byte::
+
+    <d  timestamp   time.monotonic() when the frame was seen
+    B   port        TNC port
+    B   direction   CAPTURE_RX, CAPTURE_TX or CAPTURE_CLOCK
+    H   length      bytes of frame that follow
+
+Monotonic time can't go backwards under a running digipeater, but it
+means nothing across restarts, so every time a file is opened for writing
+a `CAPTURE_CLOCK` record carrying the wall clock time is written first.
+The reader uses it to put every following record on the wall clock.
+"""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import array
+import bisect
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+
+import kiss.constants
+
+
+RECORD_HEADER = struct.Struct('<dBBH')
+CLOCK_PAYLOAD = struct.Struct('<d')
+
+Record = collections.namedtuple('Record', 'timestamp port direction frame')
+
+
+class CaptureWriter(object):
+
+    """
+    Appends frames to a capture file.
+
+    Safe to share between the thread reading an interface and its writer
+    thread. By default every record is written to the file as it is
+    recorded, so a crash or SIGKILL, when a capture matters most, loses
+    nothing that was recorded. That is a system call per frame, nothing at
+    radio rates; with `flush_records` above one records are buffered and
+    written that many at a time, and the ones still buffered are lost if
+    the process dies.
+    """
+
+    def __init__(self, path, flush_records=kiss.constants.CAPTURE_FLUSH_RECORDS):
+        """
+        :param path: File to append to, created if it does not exist.
+        :type path: str
+        :param flush_records: Records to buffer before writing them out.
+        :type flush_records: int
+        """
+        self.path = path
+        self.records = 0
+        self.flush_records = flush_records
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(kiss.constants.CAPTURE_MAGIC)
+        self._file.write(RECORD_HEADER.pack(
+            time.monotonic(), 0, kiss.constants.CAPTURE_CLOCK, CLOCK_PAYLOAD.size))
+        self._file.write(CLOCK_PAYLOAD.pack(time.time()))
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, direction, port, frame):
+        """
+        Appends one frame.
+
+        :param direction: `CAPTURE_RX` or `CAPTURE_TX`.
+        :type direction: int
+        :param port: TNC port the frame was received or sent on.
+        :type port: int
+        :param frame: Raw frame, without KISS framing or command byte.
+        :type frame: bytes or list
+        """
+        if not isinstance(frame, (bytes, bytearray, memoryview)):
+            frame = bytes(frame)
+        header = RECORD_HEADER.pack(time.monotonic(), port, direction, len(frame))
+        with self._lock:
+            if self._file.closed:
+                # Capture stopped while the frame was in flight.
+                return
+            self._file.write(header)
+            self._file.write(frame)
+            self.records += 1
+            if self.records % self.flush_records == 0:
+                self._file.flush()
+
+    def flush(self):
+        """Writes buffered records to the file."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """Flushes and closes the file."""
+        with self._lock:
+            self._file.close()
+
+
+class CaptureReader(object):
+
+    """
+    Memory-mapped view of a capture file.
+
+    Records are indexed when the file is opened, after which any record can
+    be fetched by position or located by time without reading the rest of
+    the file. Frames are `memoryview` slices of the mapping, nothing is
+    copied until the caller does so; they must be released before `close`.
+
+    A record cut short by a crash mid-write ends the index, everything
+    before it is still readable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(kiss.constants.CAPTURE_MAGIC):
+            self._file.close()
+            raise Exception('%s is not a capture file' % path)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(kiss.constants.CAPTURE_MAGIC)] != kiss.constants.CAPTURE_MAGIC:
+            self._mmap.close()
+            self._file.close()
+            raise Exception('%s is not a capture file' % path)
+        self._view = memoryview(self._mmap)
+        # Parallel arrays rather than tuples, weeks of traffic is a lot of
+        # records to keep objects around for.
+        self.timestamps = array.array('d')
+        self.offsets = array.array('Q')
+        self.__build_index(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __build_index(self, size):
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        buf = self._mmap
+        clock_offset = 0.0
+        position = len(kiss.constants.CAPTURE_MAGIC)
+        while position + header_size <= size:
+            timestamp, _, direction, length = unpack_from(buf, position)
+            end = position + header_size + length
+            if end > size:
+                break
+            if direction == kiss.constants.CAPTURE_CLOCK:
+                wall_time, = CLOCK_PAYLOAD.unpack_from(buf, position + header_size)
+                clock_offset = wall_time - timestamp
+            else:
+                self.timestamps.append(timestamp + clock_offset)
+                self.offsets.append(position)
+            position = end
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        position = self.offsets[index]
+        _, port, direction, length = RECORD_HEADER.unpack_from(self._mmap, position)
+        start = position + RECORD_HEADER.size
+        return Record(self.timestamps[index], port, direction,
+                      self._view[start:start + length])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def seek(self, timestamp):
+        """
+        :param timestamp: Wall clock time, as from `time.time()`.
+        :type timestamp: float
+        :returns: Index of the first record at or after `timestamp`.
+        :rtype: int
+        """
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def between(self, start, end):
+        """
+        Iterates over the records seen in a window of time.
+
+        :param start: Wall clock time of the start of the window, inclusive.
+        :type start: float
+        :param end: Wall clock time of the end of the window, exclusive.
+        :type end: float
+        """
+        for index in range(self.seek(start), len(self)):
+            if self.timestamps[index] >= end:
+                break
+            yield self[index]
+
+    def close(self):
+        """Unmaps and closes the file."""
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
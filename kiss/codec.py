@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""KISS framing codec."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import kiss.constants
+
+
+FEND_BYTES = bytes([kiss.constants.FEND])
+FESC_BYTES = bytes([kiss.constants.FESC])
+FESC_TFEND_BYTES = bytes(kiss.constants.FESC_TFEND)
+FESC_TFESC_BYTES = bytes(kiss.constants.FESC_TFESC)
+
+# FEND followed by the command byte, indexed by the command byte.
+COMMAND_HEADERS = tuple(
+    bytes([kiss.constants.FEND, command_byte]) for command_byte in range(256))
+
+
+def escape_special_codes(raw_code_bytes):
+    """
+    Escape special codes, per KISS spec.
+
+    "If the FEND or FESC codes appear in the data to be transferred, they
+    need to be escaped. The FEND code is then sent as FESC, TFEND and the
+    FESC is then sent as FESC, TFESC."
+    - http://en.wikipedia.org/wiki/KISS_(TNC)#Description
+
+    FESC is substituted first so the FESCs introduced for FEND are not
+    escaped a second time.
+
+    :param raw_code_bytes: Frame contents to escape.
+    :type raw_code_bytes: bytes or list
+    :returns: Escaped frame contents.
+    :rtype: bytes
+    """
+    raw_code_bytes = bytes(raw_code_bytes)
+    if FESC_BYTES in raw_code_bytes:
+        raw_code_bytes = raw_code_bytes.replace(FESC_BYTES, FESC_TFESC_BYTES)
+    if FEND_BYTES in raw_code_bytes:
+        raw_code_bytes = raw_code_bytes.replace(FEND_BYTES, FESC_TFEND_BYTES)
+    return raw_code_bytes
+
+
+def unescape_special_codes(escaped_bytes):
+    """
+    Reverses the KISS escaping of FEND and FESC codes.
+
+    Every FESC in a well formed frame begins a two byte escape sequence, so
+    the FESC TFEND pairs can be replaced first without ever matching half of
+    a FESC TFESC pair.
+
+    :param escaped_bytes: Frame contents as received between two FENDs.
+    :type escaped_bytes: bytes
+    :returns: Frame contents with escape sequences replaced.
+    :rtype: bytes
+    """
+    escaped_bytes = bytes(escaped_bytes)
+    if FESC_BYTES not in escaped_bytes:
+        return escaped_bytes
+    return escaped_bytes.replace(
+        FESC_TFEND_BYTES, FEND_BYTES).replace(FESC_TFESC_BYTES, FESC_BYTES)
+
+
+def encode_frame(frame_bytes, command_byte=kiss.constants.DATA_FRAME):
+    """
+    Builds a complete KISS frame: FEND, command byte, escaped data, FEND.
+
+    :param frame_bytes: Frame contents to send.
+    :type frame_bytes: bytes or list
+    :param command_byte: Combined TNC port and command code.
+    :type command_byte: int
+    :returns: KISS frame ready to be written to the interface.
+    :rtype: bytes
+    """
+    return b''.join((
+        COMMAND_HEADERS[command_byte],
+        escape_special_codes(frame_bytes),
+        FEND_BYTES
+    ))
+
+
+def encode_frame_into(buffer, frame_bytes, command_byte=kiss.constants.DATA_FRAME):
+    """
+    Appends a complete KISS frame to an existing buffer.
+
+    :param buffer: Output buffer to append to.
+    :type buffer: bytearray
+    :param frame_bytes: Frame contents to send.
+    :type frame_bytes: bytes or list
+    :param command_byte: Combined TNC port and command code.
+    :type command_byte: int
+    :returns: Number of bytes appended.
+    :rtype: int
+    """
+    start = len(buffer)
+    buffer += COMMAND_HEADERS[command_byte]
+    buffer += escape_special_codes(frame_bytes)
+    buffer += FEND_BYTES
+    return len(buffer) - start
+
+
+class Encoder(object):
+
+    """
+    KISS encoder writing into a reusable output buffer.
+
+    Any number of frames can be appended and then handed to the interface
+    in a single write, after which the buffer is cleared and its storage
+    reused for the next frames.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def append(self, frame_bytes, command_byte=kiss.constants.DATA_FRAME):
+        """
+        Encodes a frame onto the end of the output buffer.
+
+        :param frame_bytes: Frame contents to send.
+        :type frame_bytes: bytes or list
+        :param command_byte: Combined TNC port and command code.
+        :type command_byte: int
+        :returns: Number of bytes appended.
+        :rtype: int
+        """
+        return encode_frame_into(self.buffer, frame_bytes, command_byte)
+
+    def flush(self, write):
+        """
+        Writes out everything encoded so far and clears the buffer.
+
+        :param write: Callable taking the bytes to write, such as
+            `socket.sendall` or `serial.Serial.write`.
+        :returns: Whatever `write` returned, or None if nothing was pending.
+        """
+        if not self.buffer:
+            return None
+        try:
+            return write(self.buffer)
+        finally:
+            del self.buffer[:]
+
+
+class Deframer(object):
+
+    """
+    Incremental KISS deframer.
+
+    Bytes are fed in as they are read from the interface, in chunks of any
+    size. Partial frames are kept between calls so a frame split across
+    several reads is reassembled, and every completed frame is returned as
+    immutable, un-escaped bytes still carrying its leading command byte.
+    Frames holding nothing but the command byte carry no payload and are
+    dropped.
+    """
+
+    def __init__(self, max_frame_length=kiss.constants.MAX_FRAME_LENGTH):
+        self.max_frame_length = max_frame_length
+        self.oversize_frames = 0
+        self._buffer = bytearray()
+        self._discarding = False
+
+    def reset(self):
+        """Drops any partially received frame."""
+        del self._buffer[:]
+        self._discarding = False
+
+    def feed(self, data):
+        """
+        Consumes newly read bytes.
+
+        :param data: Bytes read from the interface.
+        :type data: bytes, bytearray or memoryview
+        :returns: Frames completed by this chunk, oldest first.
+        :rtype: list
+        """
+        frames = []
+        if not data:
+            return frames
+
+        buffer = self._buffer
+        search_start = len(buffer)
+        buffer += data
+        frame_start = 0
+        fend = buffer.find(FEND_BYTES, search_start)
+        with memoryview(buffer) as view:
+            while fend >= 0:
+                if self._discarding:
+                    self._discarding = False
+                elif fend > frame_start + 1:
+                    frames.append(unescape_special_codes(view[frame_start:fend]))
+                frame_start = fend + 1
+                fend = buffer.find(FEND_BYTES, frame_start)
+        del buffer[:frame_start]
+
+        # A run of noise with no FEND in sight is not going to turn into a
+        # valid frame, don't let it grow without bound.
+        if len(buffer) > self.max_frame_length:
+            del buffer[:]
+            if not self._discarding:
+                self._discarding = True
+                self.oversize_frames += 1
+
+        return frames
@@ -18,6 +18,53 @@ LOG_FORMAT = ('%(asctime)s %(levelname)s %(name)s.%(funcName)s:%(lineno)d'
 SERIAL_TIMEOUT = 0.01
 READ_BYTES = 1000
 
+# Longest run of bytes the deframer will hold while waiting for a FEND, an
+# AX.25 UI frame is well under this even when every byte is escaped.
+MAX_FRAME_LENGTH = 2048
+
+# Receive queue sizing and what to do when a consumer falls behind.
+RX_QUEUE_SIZE = 256
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_DROP_NEWEST = 'drop_newest'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK)
+
+# Transmit priority classes, lower values are sent first.
+TX_PRIORITY_DIGIPEAT = 0
+TX_PRIORITY_BEACON = 1
+TX_PRIORITY_STATUS = 2
+TX_PRIORITIES = (TX_PRIORITY_DIGIPEAT, TX_PRIORITY_BEACON, TX_PRIORITY_STATUS)
+
+TX_QUEUE_SIZE = 256
+# Most frames the writer will coalesce into a single interface write.
+TX_COALESCE_FRAMES = 16
+
+# Seconds between KISS-over-TCP reconnection attempts, doubling from the
+# minimum up to the maximum.
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 60
+
+# Airtime limiter decisions, see kiss.airtime.
+AIRTIME_SEND = 0
+AIRTIME_DEFER = 1
+AIRTIME_DROP = 2
+# Seconds over which a port's duty cycle is measured, a port may burst up
+# to its duty cycle's share of this window.
+AIRTIME_WINDOW = 60
+
+# Seconds to wait for a TNC to acknowledge an ACKMODE frame.
+ACK_TIMEOUT = 30
+
+# Capture file records, see kiss.capture.
+CAPTURE_MAGIC = b'KISSCAP1'
+CAPTURE_RX = 0
+CAPTURE_TX = 1
+# Pairs the monotonic clock with wall clock time, written on every open.
+CAPTURE_CLOCK = 2
+# Records a capture buffers before writing them to the file. A crash loses
+# up to this many less one, so only raise it for replays of heavy traffic.
+CAPTURE_FLUSH_RECORDS = 1
+
 # KISS Special Characters
 # http://en.wikipedia.org/wiki/KISS_(TNC)#Special_Characters
 FEND = 0xC0
@@ -40,6 +87,9 @@ SLOT_TIME = 0x03
 TX_TAIL = 0x04
 FULL_DUPLEX = 0x05
 SET_HARDWARE = 0x06
+# ACKMODE data frame, the TNC echoes the two byte sequence number back
+# once the frame has been sent over the air.
+ACKMODE = 0x0C
 RETURN = 0xFF
 
 DEFAULT_KISS_CONFIG_VALUES = {
@@ -8,13 +8,25 @@ __license__ = 'Apache License, Version 2.0'
 __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
 
+import collections
+import concurrent.futures
 import logging
 import serial
 import socket
+import threading
+import time
+import kiss.airtime
+import kiss.capture
+import kiss.codec
 import kiss.constants
+import kiss.queues
 import kiss.util
 
 
+# Bytes for which chr(x).isspace() holds, as stripped from the frame edges.
+WHITESPACE_BYTES = bytes([x for x in range(256) if chr(x).isspace()])
+
+
 class Kiss(object):
 
     """KISS Object Class."""
@@ -28,9 +40,9 @@ class Kiss(object):
     logger.addHandler(console_handler)
     logger.propagate = False
 
-    frame_buffer = []
-
-    def __init__(self, com_port=None, baud=38400, parity=serial.PARITY_NONE, stop_bits=serial.STOPBITS_ONE, byte_size=serial.EIGHTBITS, host=None, tcp_port=8000, strip_df_start=True):
+    def __init__(self, com_port=None, baud=38400, parity=serial.PARITY_NONE, stop_bits=serial.STOPBITS_ONE, byte_size=serial.EIGHTBITS, host=None, tcp_port=8000, strip_df_start=True,
+                 rx_queue_size=kiss.constants.RX_QUEUE_SIZE, rx_overflow=kiss.constants.OVERFLOW_DROP_OLDEST,
+                 tx_queue_size=kiss.constants.TX_QUEUE_SIZE, ack_timeout=kiss.constants.ACK_TIMEOUT):
         self.com_port = com_port
         self.baud = baud
         self.parity = parity
@@ -42,6 +54,24 @@ class Kiss(object):
         self.interface_mode = None
         self.strip_df_start = strip_df_start
         self.exit_kiss = False
+        self.deframer = kiss.codec.Deframer()
+        self.encoder = kiss.codec.Encoder()
+        self.rx_queue = kiss.queues.ReceiveQueue(rx_queue_size, rx_overflow)
+        self.tx_queue = kiss.queues.TransmitQueue(tx_queue_size)
+        self.writer = None
+        self.write_lock = threading.Lock()
+        self.blocking = True
+        self.transport = None
+        self.capture = None
+        self.ack_timeout = ack_timeout
+        self.acks_queued = {}
+        self.acks_pending = collections.OrderedDict()
+        self.acks_expired = 0
+        self.ack_lock = threading.Lock()
+        self.__ack_sequence = 0
+        self.airtime_limiters = {}
+        self.__airtime_wait = None
+        self.__airtime_dropped = []
 
         if self.com_port is not None:
             self.interface_mode = 'serial'
@@ -62,72 +92,72 @@ class Kiss(object):
             self.interface.close()
 
     def __del__(self):
-        if self.interface and self.interface.isOpen():
+        # interface_mode is still None if the constructor raised.
+        interface_mode = getattr(self, 'interface_mode', None)
+        if interface_mode and 'serial' in interface_mode and self.interface and self.interface.isOpen():
             self.interface.close()
 
-    def __read_interface(self):
+    def __read_interface(self, block=True):
         if 'tcp' in self.interface_mode:
-            return self.interface.recv(kiss.constants.READ_BYTES)
+            try:
+                read_data = self.interface.recv(
+                    kiss.constants.READ_BYTES, 0 if block else socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return b''
+            if not read_data:
+                raise ConnectionResetError('KISS TCP connection closed by peer')
+            return read_data
         elif 'serial' in self.interface_mode:
-            read_data = self.interface.read(kiss.constants.READ_BYTES)
+            if block:
+                read_data = self.interface.read(kiss.constants.READ_BYTES)
+            else:
+                read_data = b''
             waiting_data = self.interface.inWaiting()
             if waiting_data:
                 read_data += self.interface.read(waiting_data)
             return read_data
 
+    def __interface_writer(self):
+        # The event loop clears transport when the connection drops, read it
+        # once so a batch never switches interfaces half way through.
+        transport = self.transport
+        if transport is not None:
+            return transport.write
+        elif self.interface is None:
+            # Supervised and between connections, the link is down.
+            return None
+        elif 'tcp' in self.interface_mode:
+            return self.interface.sendall
+        elif 'serial' in self.interface_mode:
+            return self.interface.write
+
     @staticmethod
     def __strip_df_start(frame):
         """
-        Strips KISS DATA_FRAME start (0x00) and newline from frame.
+        Strips KISS DATA_FRAME command byte, padding and newline from frame.
 
         :param frame: APRS/AX.25 frame.
-        :type frame: str
-        :returns: APRS/AX.25 frame sans DATA_FRAME start (0x00).
-        :rtype: str
-        """
-        while frame[0] is kiss.constants.DATA_FRAME:
-            del frame[0]
-        while chr(frame[0]).isspace():
-            del frame[0]
-        while chr(frame[-1]).isspace():
-            del frame[-1]
-        return frame
-
-    @staticmethod
-    def __escape_special_codes(raw_code_bytes):
+        :type frame: bytes
+        :returns: APRS/AX.25 frame sans DATA_FRAME command byte.
+        :rtype: bytes
         """
-        Escape special codes, per KISS spec.
-
-        "If the FEND or FESC codes appear in the data to be transferred, they
-        need to be escaped. The FEND code is then sent as FESC, TFEND and the
-        FESC is then sent as FESC, TFESC."
-        - http://en.wikipedia.org/wiki/KISS_(TNC)#Description
-        """
-        encoded_bytes = []
-        for raw_code_byte in raw_code_bytes:
-            if raw_code_byte is kiss.constants.FESC:
-                encoded_bytes += kiss.constants.FESC_TFESC
-            elif raw_code_byte is kiss.constants.FEND:
-                encoded_bytes += kiss.constants.FESC_TFEND
-            else:
-                encoded_bytes += [raw_code_byte];
-        return encoded_bytes
+        return frame[1:].lstrip(b'\x00').strip(WHITESPACE_BYTES)
 
     @staticmethod
     def __command_byte_combine(port, command_code):
         """
         Constructs the command byte for the tnc which includes the tnc port and command code.
-        :param port: integer from 0 to 127 indicating the TNC port
+        :param port: integer from 0 to 15 indicating the TNC port
         :type port: int
-        :param command_code: A command code constant, a value from 0 to 127
+        :param command_code: A command code constant, a value from 0 to 15
         :type command_code: int
         :return: An integer combining the two values into a single byte
         """
-        if port > 127 or port < 0:
+        if port > 15 or port < 0:
             raise Exception("port out of range")
-        elif command_code > 127 or command_code < 0:
+        elif command_code > 15 or command_code < 0:
             raise Exception("command_Code out of range")
-        return (port<<4) & command_code
+        return (port<<4) | command_code
 
     def start(self, mode_init=None, **kwargs):
         """
@@ -156,15 +186,148 @@ class Kiss(object):
             for name, value in kwargs.items():
                 self.write_setting(name, value)
 
+        self.start_writer()
+
         # If no settings specified, default to config values similar
         # to those that ship with Xastir.
         #if not kwargs:
         #    kwargs = kiss.constants.DEFAULT_KISS_CONFIG_VALUES
 
     def close(self):
+        self.stop_writer()
+        self.stop_capture()
         if self.exit_kiss is True:
             self.interface.write(kiss.constants.MODE_END)
 
+    def start_capture(self, path):
+        """
+        Starts recording every data frame received or transmitted.
+
+        :param path: Capture file to append to, created if missing.
+        :type path: str
+        :returns: The capture writer.
+        :rtype: kiss.capture.CaptureWriter
+        """
+        self.stop_capture()
+        self.capture = kiss.capture.CaptureWriter(path)
+        return self.capture
+
+    def stop_capture(self):
+        """Stops recording and closes the capture file."""
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    def start_writer(self):
+        """
+        Starts the thread that services the transmit queue, so writes to a
+        slow TNC never hold up the caller.
+        """
+        if self.writer is None:
+            self.tx_queue.open()
+            self.writer = threading.Thread(target=self.__writer_loop, daemon=True)
+            self.writer.start()
+
+    def stop_writer(self):
+        """Stops the writer thread once the frames already queued are sent."""
+        if self.writer is not None:
+            self.tx_queue.close()
+            self.writer.join()
+            self.writer = None
+
+    def __writer_loop(self):
+        tx_queue = self.tx_queue
+        while not tx_queue.closed or (len(tx_queue) and not tx_queue.paused):
+            # Wake up in time to fail the oldest unacknowledged frame.
+            ack_wait = self.__check_acks()
+            if self.flush_tx_queue(timeout=ack_wait) or self.__airtime_wait is None:
+                continue
+            if tx_queue.closed:
+                # Whatever is left is waiting on airtime, don't hold up close.
+                break
+            # Everything queued is over its port's airtime budget, sleep
+            # until the first of it fits unless something new is queued.
+            if ack_wait is not None and ack_wait < self.__airtime_wait:
+                tx_queue.wait(ack_wait)
+            else:
+                tx_queue.wait(self.__airtime_wait)
+
+    def set_airtime_limit(self, port, limiter):
+        """
+        Budgets the airtime of a TNC port, frames over budget are deferred
+        or dropped by the writer according to their priority.
+
+        :param port: TNC port to limit.
+        :type port: int
+        :param limiter: Budget for the port, or None to remove the limit.
+        :type limiter: kiss.airtime.AirtimeLimiter
+        """
+        if limiter is None:
+            self.airtime_limiters.pop(port, None)
+        else:
+            self.airtime_limiters[port] = limiter
+
+    def __admit(self, command_byte, frame_bytes, priority):
+        limiter = self.airtime_limiters.get(command_byte >> 4)
+        if limiter is None:
+            return kiss.constants.AIRTIME_SEND
+        length = len(frame_bytes)
+        if command_byte & 0x0F == kiss.constants.ACKMODE:
+            length -= 2
+        decision = limiter.admit(length, priority)
+        if (decision == kiss.constants.AIRTIME_DROP and
+                command_byte & 0x0F == kiss.constants.ACKMODE):
+            # Failed once get_batch has let go of the queue lock.
+            self.__airtime_dropped.append(frame_bytes)
+        elif decision == kiss.constants.AIRTIME_DEFER:
+            wait = limiter.wait_time(length)
+            if self.__airtime_wait is None or wait < self.__airtime_wait:
+                self.__airtime_wait = wait
+        return decision
+
+    def flush_tx_queue(self, timeout=0):
+        """
+        Writes the next batch of queued frames to the interface in one write.
+
+        :param timeout: Seconds to wait for a frame if none are queued.
+        :type timeout: float
+        :returns: Number of frames written.
+        :rtype: int
+        """
+        self.__airtime_wait = None
+        self.__airtime_dropped = []
+        batch = self.tx_queue.get_batch(
+            timeout=timeout, admit=self.__admit if self.airtime_limiters else None)
+        if self.__airtime_dropped:
+            self.__fail_acks(self.__airtime_dropped, 'dropped, over airtime budget')
+        if not batch:
+            return 0
+        with self.write_lock:
+            write = self.__interface_writer()
+            if write is None:
+                self.logger.warning('Dropped %d frames, link is down', len(batch))
+                self.__fail_acks(Kiss.__ack_frames(batch), 'dropped, link is down')
+                return len(batch)
+            for command_byte, frame_bytes in batch:
+                self.encoder.append(frame_bytes, command_byte)
+            # A fast TNC can acknowledge before the write even returns.
+            ack_frames = Kiss.__ack_frames(batch)
+            if ack_frames:
+                self.__start_acks(ack_frames)
+            try:
+                self.encoder.flush(write)
+            except (OSError, serial.SerialException) as ex:
+                self.logger.error('Dropped %d frames, write failed: %s', len(batch), ex)
+                self.__fail_acks(ack_frames, 'dropped, write failed')
+                return len(batch)
+        capture = self.capture
+        if capture is not None:
+            for command_byte, frame_bytes in batch:
+                if command_byte & 0x0F == kiss.constants.ACKMODE:
+                    frame_bytes = frame_bytes[2:]
+                capture.record(kiss.constants.CAPTURE_TX, command_byte >> 4, frame_bytes)
+        return len(batch)
+
 
     def write_setting(self, name, value):
         """
@@ -179,93 +342,223 @@ class Kiss(object):
 
         # Do the reasonable thing if a user passes an int
         if isinstance(value, int):
-            value = chr(value)
+            value = [value]
 
-        return self.interface.write(
-            kiss.constants.FEND +
-            getattr(kiss.constants, name.upper()) +
-            Kiss.__escape_special_codes(value) +
-            kiss.constants.FEND
-        )
+        with self.write_lock:
+            write = self.__interface_writer()
+            if write is None:
+                self.logger.warning('Not configuring %s, link is down', name)
+                return None
+            self.encoder.append(value, getattr(kiss.constants, name.upper()))
+            return self.encoder.flush(write)
 
-    def fill_buffer(self):
+    def fileno(self):
         """
-        Reads any pending data in the interface and stores it in the frame_buffer
-        """
-
-        new_frames = []
-        read_buffer = []
-        read_data = self.__read_interface()
-        while read_data is not None and len(read_data):
-            split_data = [[]]
-            for read_byte in read_data:
-                if read_byte is kiss.constants.FEND:
-                    #split_data_index += 1
-                    split_data.append([])
-                else:
-                    split_data[-1].append(read_byte)
-            len_fend = len(split_data)
-
-            # No FEND in frame
-            if len_fend == 1:
-                read_buffer += split_data[0]
-            # Single FEND in frame
-            elif len_fend == 2:
-                # Closing FEND found
-                if split_data[0]:
-                    # Partial frame continued, otherwise drop
-                    new_frames.append(read_buffer + split_data[0])
-                    read_buffer = []
-                # Opening FEND found
-                else:
-                    new_frames.append(read_buffer)
-                    read_buffer = split_data[1]
-            # At least one complete frame received
-            elif len_fend >= 3:
-                for i in range(0, len_fend - 1):
-                    read_buffer_tmp = read_buffer + split_data[i]
-                    if len(read_buffer_tmp) is not 0:
-                        new_frames.append(read_buffer_tmp)
-                        read_buffer = []
-                if split_data[len_fend - 1]:
-                    read_buffer = split_data[len_fend - 1]
-            # Get anymore data that is waiting
-            read_data = self.__read_interface()
+        File descriptor of the open interface, so it can be watched with
+        `select`/`selectors` alongside other interfaces.
+        """
+        return self.interface.fileno()
 
-        for new_frame in new_frames:
-            if len(new_frame) and new_frame[0] == 0:
+    def setblocking(self, flag):
+        """
+        Sets whether `fill_buffer` may wait for data to arrive.
+
+        When False, only data already waiting on the interface is consumed,
+        which is what an event loop wants once the descriptor is readable.
+
+        :param flag: True to allow the first read to block.
+        :type flag: bool
+        """
+        self.blocking = flag
+
+    def feed(self, read_data):
+        """
+        Deframes bytes read from the interface and stores any completed
+        data frames in the receive queue, tagged with the TNC port they
+        arrived on.
+
+        :param read_data: Bytes as read from the interface.
+        :type read_data: bytes
+        """
+        capture = self.capture
+        for new_frame in self.deframer.feed(read_data):
+            command_byte = new_frame[0]
+            if command_byte & 0x0F == kiss.constants.DATA_FRAME:
+                if capture is not None:
+                    capture.record(kiss.constants.CAPTURE_RX, command_byte >> 4,
+                                   memoryview(new_frame)[1:])
                 if self.strip_df_start:
                     new_frame = Kiss.__strip_df_start(new_frame)
-                self.frame_buffer.append(new_frame)
+                    if not new_frame:
+                        continue
+                self.rx_queue.put((command_byte >> 4, new_frame))
+            elif command_byte & 0x0F == kiss.constants.ACKMODE:
+                self.__acknowledge(new_frame)
 
-    def read(self):
-        if not len(self.frame_buffer):
+    @staticmethod
+    def __ack_frames(batch):
+        return [frame_bytes for command_byte, frame_bytes in batch
+                if command_byte & 0x0F == kiss.constants.ACKMODE]
+
+    def __start_acks(self, ack_frames):
+        # The timeout runs from the write, however long the frame was queued.
+        now = time.monotonic()
+        with self.ack_lock:
+            for frame_bytes in ack_frames:
+                sequence = (frame_bytes[0] << 8) | frame_bytes[1]
+                future = self.acks_queued.pop(sequence, None)
+                if future is not None:
+                    self.acks_pending[sequence] = (future, now)
+
+    def __fail_acks(self, ack_frames, reason):
+        futures = []
+        with self.ack_lock:
+            for frame_bytes in ack_frames:
+                sequence = (frame_bytes[0] << 8) | frame_bytes[1]
+                future = self.acks_queued.pop(sequence, None)
+                if future is None:
+                    # Started just before the write that failed.
+                    future, _ = self.acks_pending.pop(sequence, (None, None))
+                if future is not None:
+                    futures.append((sequence, future))
+        for sequence, future in futures:
+            future.set_exception(Exception('frame %d %s' % (sequence, reason)))
+
+    def __acknowledge(self, ack_frame):
+        if len(ack_frame) < 3:
+            return
+        sequence = (ack_frame[1] << 8) | ack_frame[2]
+        now = time.monotonic()
+        with self.ack_lock:
+            pending = self.acks_pending.pop(sequence, None)
+        if pending is not None:
+            future, sent_at = pending
+            future.set_result(now - sent_at)
+        self.__check_acks()
+
+    def __check_acks(self):
+        # Fails frames not acknowledged in time, returning the seconds until
+        # the next one times out, or None if none are pending.
+        now = time.monotonic()
+        expired = []
+        with self.ack_lock:
+            # Frames are pending in the order they were written, so the
+            # oldest are always at the front.
+            while self.acks_pending:
+                sequence, (future, sent_at) = next(iter(self.acks_pending.items()))
+                wait = sent_at + self.ack_timeout - now
+                if wait > 0:
+                    break
+                del self.acks_pending[sequence]
+                expired.append((sequence, future))
+            else:
+                wait = None
+            self.acks_expired += len(expired)
+        for sequence, future in expired:
+            future.set_exception(concurrent.futures.TimeoutError(
+                'frame %d was not acknowledged' % sequence))
+        return wait
+
+    def __next_ack_sequence(self):
+        for _ in range(0x10000):
+            sequence = self.__ack_sequence
+            self.__ack_sequence = (sequence + 1) & 0xFFFF
+            if sequence not in self.acks_pending and sequence not in self.acks_queued:
+                return sequence
+        raise Exception('no ACKMODE sequence numbers left')
+
+    def fill_buffer(self):
+        """
+        Reads any pending data in the interface and stores it in the receive
+        queue.
+        """
+        # An event loop owns the interface and pushes data in through feed.
+        if self.transport is not None:
+            return
+
+        # Leave the backlog with the OS until the consumer catches up.
+        if self.rx_queue.throttled():
+            return
+
+        read_data = self.__read_interface(self.blocking)
+        while read_data:
+            self.feed(read_data)
+            if self.rx_queue.throttled():
+                break
+            # Get anymore data that is waiting
+            read_data = self.__read_interface(False)
+
+    def read_tagged(self):
+        """
+        Reads the next frame along with the TNC port it arrived on.
+
+        :returns: `(tnc_port, frame)`, or None if nothing is pending.
+        :rtype: tuple
+        """
+        if not len(self.rx_queue):
             self.fill_buffer()
+        return self.rx_queue.get()
 
-        if len(self.frame_buffer):
-            return_frame = self.frame_buffer[0]
-            del self.frame_buffer[0]
-            return return_frame
-        else:
+    def read_many_tagged(self):
+        """
+        Reads every frame that is pending on the interface in one call,
+        along with the TNC port each arrived on.
+
+        :returns: `(tnc_port, frame)` pairs in the order they were received.
+        :rtype: list
+        """
+        self.fill_buffer()
+        return self.rx_queue.get_many()
+
+    def read(self):
+        tagged_frame = self.read_tagged()
+        if tagged_frame is None:
             return None
+        return tagged_frame[1]
 
-    def write(self, frame_bytes, port=0):
+    def read_many(self):
         """
-        Writes frame to KISS interface.
+        Reads every frame that is pending on the interface in one call.
 
-        :param frame: Frame to write.
+        :returns: Frames in the order they were received, may be empty.
+        :rtype: list
         """
-        interface_handler = None
+        return [frame for _, frame in self.read_many_tagged()]
 
-        if 'tcp' in self.interface_mode:
-            interface_handler = self.interface.send
-        elif 'serial' in self.interface_mode:
-            interface_handler = self.interface.write
-
-        if interface_handler is not None:
-            return interface_handler(
-                [kiss.constants.FEND] +
-                [Kiss.__command_byte_combine(port, kiss.constants.DATA_FRAME)] +
-                Kiss.__escape_special_codes(frame_bytes) +
-                [kiss.constants.FEND]
-            )
\ No newline at end of file
+    def write(self, frame_bytes, port=0, priority=kiss.constants.TX_PRIORITY_DIGIPEAT, ack=False):
+        """
+        Queues frame for the KISS interface, returning immediately.
+
+        With `ack` the frame is sent as an ACKMODE frame, which the TNC
+        acknowledges once it has actually gone out over the air. The TNC must
+        support ACKMODE, other TNCs will drop the frame.
+
+        :param frame: Frame to write.
+        :param port: TNC port to transmit on.
+        :param priority: One of the `TX_PRIORITY_*` classes.
+        :param ack: True to track transmission with ACKMODE.
+        :type ack: bool
+        :returns: True if queued, False if the transmit queue was full. With
+            `ack`, a `concurrent.futures.Future` instead, resolved with the
+            seconds from writing the frame to the acknowledgement. It fails
+            if the frame is dropped or no acknowledgement arrives within
+            `ack_timeout` of it being written.
+        :rtype: bool or concurrent.futures.Future
+        """
+        if not ack:
+            return self.tx_queue.put(
+                frame_bytes,
+                Kiss.__command_byte_combine(port, kiss.constants.DATA_FRAME),
+                priority)
+
+        command_byte = Kiss.__command_byte_combine(port, kiss.constants.ACKMODE)
+        future = concurrent.futures.Future()
+        with self.ack_lock:
+            sequence = self.__next_ack_sequence()
+            self.acks_queued[sequence] = future
+        if not self.tx_queue.put(sequence.to_bytes(2, 'big') + bytes(frame_bytes),
+                                 command_byte, priority):
+            with self.ack_lock:
+                self.acks_queued.pop(sequence, None)
+            future.set_exception(Exception('transmit queue full'))
+        return future
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Frame queues for KISS interfaces."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import collections
+import threading
+import time
+
+import kiss.constants
+
+
+class ReceiveQueue(object):
+
+    """
+    Bounded FIFO of received frames, owned by a single interface.
+
+    What happens when a frame arrives and the queue is already at capacity
+    depends on the overflow policy:
+
+    * `OVERFLOW_DROP_OLDEST` discards the frame at the head of the queue.
+    * `OVERFLOW_DROP_NEWEST` discards the arriving frame.
+    * `OVERFLOW_BLOCK` never discards. Instead the queue reports itself
+      `full()` and the interface stops reading until the consumer catches
+      up, leaving the backlog in the OS and TNC buffers. Frames already
+      read in the same chunk are still queued, so the queue can overshoot
+      its capacity by at most one read.
+    """
+
+    def __init__(self, capacity=kiss.constants.RX_QUEUE_SIZE,
+                 overflow=kiss.constants.OVERFLOW_DROP_OLDEST):
+        if capacity < 1:
+            raise Exception('capacity must be at least 1')
+        if overflow not in kiss.constants.OVERFLOW_POLICIES:
+            raise Exception('unknown overflow policy %s' % overflow)
+        self.capacity = capacity
+        self.overflow = overflow
+        self.received = 0
+        self.dropped = 0
+        self.high_water = 0
+        self._frames = collections.deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def full(self):
+        """
+        :returns: True if the queue holds `capacity` frames or more.
+        :rtype: bool
+        """
+        return len(self._frames) >= self.capacity
+
+    def throttled(self):
+        """
+        :returns: True if the interface should stop reading, which only
+            happens for a full queue under `OVERFLOW_BLOCK`.
+        :rtype: bool
+        """
+        return self.overflow == kiss.constants.OVERFLOW_BLOCK and self.full()
+
+    def put(self, frame):
+        """
+        Appends a received frame, applying the overflow policy if full.
+
+        :param frame: Received frame.
+        :returns: True if the frame was queued, False if it was dropped.
+        :rtype: bool
+        """
+        frames = self._frames
+        with self._lock:
+            self.received += 1
+            if len(frames) >= self.capacity:
+                if self.overflow == kiss.constants.OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                elif self.overflow == kiss.constants.OVERFLOW_DROP_OLDEST:
+                    frames.popleft()
+                    self.dropped += 1
+            frames.append(frame)
+            if len(frames) > self.high_water:
+                self.high_water = len(frames)
+        return True
+
+    def get(self):
+        """
+        :returns: Oldest queued frame, or None if the queue is empty.
+        """
+        with self._lock:
+            if self._frames:
+                return self._frames.popleft()
+        return None
+
+    def get_many(self):
+        """
+        Removes every queued frame.
+
+        :returns: Queued frames, oldest first.
+        :rtype: list
+        """
+        with self._lock:
+            frames = list(self._frames)
+            self._frames.clear()
+        return frames
+
+    def clear(self):
+        """Discards every queued frame, counters are kept."""
+        with self._lock:
+            self._frames.clear()
+
+
+class TransmitQueue(object):
+
+    """
+    Prioritised queue of frames waiting to be written to an interface.
+
+    There is one FIFO per priority class and `get_batch` always empties the
+    more urgent classes first, so a digipeat queued behind a burst of
+    beacons still goes out ahead of them. Enqueueing never blocks: when the
+    queue already holds `capacity` frames the new frame is dropped and
+    counted.
+
+    While the link is down the queue is paused: frames keep being accepted,
+    up to `capacity`, but `get_batch` hands nothing out until `resume`.
+    """
+
+    def __init__(self, capacity=kiss.constants.TX_QUEUE_SIZE,
+                 priorities=len(kiss.constants.TX_PRIORITIES)):
+        self.capacity = capacity
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.high_water = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._queues = tuple(collections.deque() for _ in range(priorities))
+        self._depth = 0
+        self.closed = False
+        self.paused = False
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return self._depth
+
+    def depths(self):
+        """
+        :returns: Number of frames waiting in each priority class.
+        :rtype: list
+        """
+        return [len(queue) for queue in self._queues]
+
+    def put(self, frame, command_byte=kiss.constants.DATA_FRAME,
+            priority=kiss.constants.TX_PRIORITY_DIGIPEAT):
+        """
+        Queues a frame without blocking.
+
+        :param frame: Frame contents to send, unescaped.
+        :type frame: bytes or list
+        :param command_byte: Combined TNC port and command code.
+        :type command_byte: int
+        :param priority: One of the `TX_PRIORITY_*` classes, lower is sent
+            sooner.
+        :type priority: int
+        :returns: True if queued, False if dropped because the queue is full.
+        :rtype: bool
+        """
+        with self._not_empty:
+            if self._depth >= self.capacity:
+                self.dropped += 1
+                return False
+            self._queues[priority].append(
+                (time.monotonic(), command_byte, frame))
+            self._depth += 1
+            self.enqueued += 1
+            if self._depth > self.high_water:
+                self.high_water = self._depth
+            self._not_empty.notify()
+        return True
+
+    def get_batch(self, max_frames=kiss.constants.TX_COALESCE_FRAMES, timeout=None,
+                  admit=None):
+        """
+        Removes up to `max_frames` frames, most urgent first.
+
+        :param max_frames: Largest number of frames to return.
+        :type max_frames: int
+        :param timeout: Seconds to wait for a frame when the queue is empty,
+            None waits until a frame arrives or the queue is closed and 0
+            does not wait at all.
+        :type timeout: float
+        :param admit: Optional `admit(command_byte, frame, priority)`
+            returning one of the `AIRTIME_*` decisions. Deferred frames keep
+            their place in the queue, dropped frames are discarded.
+        :type admit: func
+        :returns: `(command_byte, frame)` pairs in the order to send them,
+            always empty while paused.
+        :rtype: list
+        """
+        batch = []
+        with self._not_empty:
+            if (not self._depth or self.paused) and timeout != 0 and not self.closed:
+                self._not_empty.wait(timeout)
+            if self.paused:
+                return batch
+            now = time.monotonic()
+            removed = 0
+            for priority, queue in enumerate(self._queues):
+                if admit is None:
+                    while queue and len(batch) < max_frames:
+                        self.__take(batch, queue.popleft(), now)
+                    continue
+                # Walk the whole queue once, putting deferred frames back at
+                # the end so their order is kept.
+                count = len(queue)
+                for index in range(count):
+                    if len(batch) >= max_frames:
+                        queue.rotate(index - count)
+                        break
+                    entry = queue.popleft()
+                    decision = admit(entry[1], entry[2], priority)
+                    if decision == kiss.constants.AIRTIME_SEND:
+                        self.__take(batch, entry, now)
+                    elif decision == kiss.constants.AIRTIME_DEFER:
+                        queue.append(entry)
+                    else:
+                        removed += 1
+            self.dropped += removed
+            self._depth -= len(batch) + removed
+            self.sent += len(batch)
+        return batch
+
+    def __take(self, batch, entry, now):
+        queued_at, command_byte, frame = entry
+        wait = now - queued_at
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+        batch.append((command_byte, frame))
+
+    def wait(self, timeout):
+        """
+        Waits for a frame to be queued, the queue to be resumed or closed.
+
+        :param timeout: Longest time to wait, in seconds.
+        :type timeout: float
+        """
+        with self._not_empty:
+            if not self.closed:
+                self._not_empty.wait(timeout)
+
+    def mean_wait(self):
+        """
+        :returns: Average seconds a sent frame spent queued.
+        :rtype: float
+        """
+        return self.wait_total / self.sent if self.sent else 0.0
+
+    def pause(self):
+        """Holds queued frames back, for instance while reconnecting."""
+        with self._not_empty:
+            self.paused = True
+
+    def resume(self):
+        """Lets queued frames flow to the writer again."""
+        with self._not_empty:
+            self.paused = False
+            self._not_empty.notify_all()
+
+    def open(self):
+        """Reopens the queue after `close`."""
+        with self._not_empty:
+            self.closed = False
+
+    def close(self):
+        """Wakes any waiting `get_batch` so a writer can shut down."""
+        with self._not_empty:
+            self.closed = True
+            self._not_empty.notify_all()
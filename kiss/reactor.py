@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Event loop multiplexing many KISS interfaces."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import logging
+import selectors
+import socket
+
+import kiss.constants
+
+
+class Reactor(object):
+
+    """
+    Waits on every registered KISS interface at once and dispatches frames.
+
+    Serial ports and TCP sockets are registered with the platform selector
+    (epoll on Linux), so the reactor sleeps until one of them has bytes
+    waiting and then only reads from the interfaces that are ready.
+    """
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(kiss.constants.LOG_LEVEL)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(kiss.constants.LOG_LEVEL)
+    formatter = logging.Formatter(kiss.constants.LOG_FORMAT)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+    def __init__(self, selector=None):
+        self.selector = selector or selectors.DefaultSelector()
+        self.running = False
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self.selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+
+    def close(self):
+        """Closes the selector, registered interfaces are left open."""
+        self.selector.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+
+    def register(self, interface, callback):
+        """
+        Starts watching a started KISS interface.
+
+        :param interface: Interface to read frames from.
+        :type interface: kiss.Kiss
+        :param callback: Called as `callback(interface, tnc_port, frame)` for
+            every frame read from the interface.
+        :type callback: func
+        """
+        interface.setblocking(False)
+        self.selector.register(interface, selectors.EVENT_READ, callback)
+
+    def unregister(self, interface):
+        """
+        Stops watching an interface.
+
+        :param interface: Previously registered interface.
+        :type interface: kiss.Kiss
+        """
+        self.selector.unregister(interface)
+        interface.setblocking(True)
+
+    def run_once(self, timeout=None):
+        """
+        Waits for at least one interface to become readable and dispatches
+        every frame it produced.
+
+        :param timeout: Seconds to wait, or None to wait indefinitely.
+        :type timeout: float
+        :returns: Number of frames dispatched.
+        :rtype: int
+        """
+        dispatched = 0
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                self.__drain_wakeup()
+                continue
+
+            interface = key.fileobj
+            try:
+                frames = interface.read_many_tagged()
+            except (OSError, EOFError) as ex:
+                self.logger.error('Dropping interface %s: %s', interface, ex)
+                self.unregister(interface)
+                continue
+
+            for tnc_port, frame in frames:
+                dispatched += 1
+                try:
+                    key.data(interface, tnc_port, frame)
+                except Exception:  # pylint: disable=W0703
+                    # One bad frame or handler must not stop the other ports.
+                    self.logger.exception('Error handling frame %s', frame)
+        return dispatched
+
+    def run(self):
+        """Dispatches frames until `stop` is called."""
+        self.running = True
+        while self.running:
+            self.run_once()
+
+    def stop(self):
+        """Makes `run` return, safe to call from any thread."""
+        self.running = False
+        try:
+            self._wakeup_send.send(b'\x00')
+        except BlockingIOError:
+            # Wakeup already pending.
+            pass
+
+    def __drain_wakeup(self):
+        try:
+            while self._wakeup_recv.recv(kiss.constants.READ_BYTES):
+                pass
+        except BlockingIOError:
+            pass
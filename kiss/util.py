@@ -8,8 +8,28 @@ __license__ = 'Apache License, Version 2.0'
 __copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
 
 
+import random
+
 import kiss.constants
 
+
+def backoff_delay(attempt, min_delay, max_delay):
+    """
+    Exponential backoff with jitter, shared by everything that reconnects.
+
+    :param attempt: Failed attempts since the last success, from 0.
+    :type attempt: int
+    :param min_delay: Delay after the first failure, in seconds.
+    :type min_delay: float
+    :param max_delay: Longest delay, in seconds.
+    :type max_delay: float
+    :returns: Seconds to wait, between half and all of the backoff.
+    :rtype: float
+    """
+    delay = min(max_delay, min_delay * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
 def extract_ui(frame):
     """
     Extracts the UI component of an individual frame.
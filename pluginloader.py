@@ -1,7 +1,9 @@
+import asyncio
 import importlib
 import importlib.util
 import importlib.machinery
 import os
+import threading
 
 PluginFolder = "./plugins"
 MainModule = "__init__"
@@ -18,4 +20,28 @@ def getPlugins():
     return plugins
 
 def loadPlugin(plugin):
-    return importlib.import_module("plugins." + plugin)
\ No newline at end of file
+    return importlib.import_module("plugins." + plugin)
+
+def runPlugin(plugin, loop, *args):
+    """
+    Schedules a plugin's start function on the event loop.
+
+    Plugins providing a `start_async` coroutine run as a task on the loop,
+    plugins that only have a blocking `start` run in a daemon thread and
+    are reported back through a future.
+    """
+    if hasattr(plugin, 'start_async'):
+        return asyncio.ensure_future(plugin.start_async(*args), loop=loop)
+
+    future = loop.create_future()
+
+    def run():
+        try:
+            result = plugin.start(*args)
+        except Exception as ex:
+            loop.call_soon_threadsafe(future.set_exception, ex)
+        else:
+            loop.call_soon_threadsafe(future.set_result, result)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
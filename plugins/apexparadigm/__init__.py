@@ -1,5 +1,4 @@
 import aprs.util
-import copy
 import re
 
 plugin = None
@@ -9,6 +8,9 @@ def start(config, port_map, packet_cache, aprsis):
     plugin = ApexParadigmPlugin(config, port_map, packet_cache, aprsis)
     plugin.run()
 
+async def start_async(config, port_map, packet_cache, aprsis):
+    start(config, port_map, packet_cache, aprsis)
+
 def handle_packet(frame, recv_port, recv_port_name):
     global plugin
     plugin.handle_packet(frame, recv_port, recv_port_name)
@@ -25,7 +27,7 @@ class ApexParadigmPlugin(object):
     def __passive_digipeat(self, frame, recv_port, recv_port_name):
         # Can't digipeat anything when you are the source
         for port in self.port_map.values():
-            if frame['source'] == port['identifier']:
+            if frame.source_is(port['identifier']):
                 return
 
         # can't digipeat things we already digipeated.
@@ -62,65 +64,53 @@ class ApexParadigmPlugin(object):
                     if band_path:
                         if band_path_net:
                             if node == port['net']:
-                                frame['path'] = frame['path'][:hop_index] + [recv_port['identifier'] + '*'] + [hop + "*"] + frame['path'][hop_index+1:]
-                                frame_hash = aprs.util.hash_frame(frame)
-                                if not frame_hash in self.packet_cache.values():
-                                    self.packet_cache[str(frame_hash)] = frame_hash
+                                frame = frame.replace_hop(hop_index, recv_port['identifier'] + '*', hop + "*")
+                                if self.packet_cache.add(aprs.util.dedup_key(frame), port['dupe_window']):
                                     port['tnc'].write(frame, port['tnc_port'])
                                     self.aprsis.send(frame)
                                     print(port_name + " >> " + aprs.util.format_aprs_frame(frame))
                                 return
                         else:
                             if port['net'].startswith(node):
-                                frame['path'] = frame['path'][:hop_index] + [recv_port['identifier'] + '*'] + [hop + "*"] + frame['path'][hop_index+1:]
-                                frame_hash = aprs.util.hash_frame(frame)
-                                if not frame_hash in self.packet_cache.values():
-                                    self.packet_cache[str(frame_hash)] = frame_hash
+                                frame = frame.replace_hop(hop_index, recv_port['identifier'] + '*', hop + "*")
+                                if self.packet_cache.add(aprs.util.dedup_key(frame), port['dupe_window']):
                                     port['tnc'].write(frame, port['tnc_port'])
                                     self.aprsis.send(frame)
                                     print(port_name + " >> " + aprs.util.format_aprs_frame(frame))
                                 return
                     if node == port_callsign and ssid == port_ssid:
                         if ssid is 0:
-                            frame['path'][hop_index] = port_callsign + '*'
+                            frame = frame.replace_hop(hop_index, port_callsign + '*')
                         else:
-                            frame['path'][hop_index] = port['identifier'] + '*'
-                        frame_hash = aprs.util.hash_frame(frame)
-                        if not frame_hash in self.packet_cache.values():
-                            self.packet_cache[str(frame_hash)] = frame_hash
+                            frame = frame.replace_hop(hop_index, port['identifier'] + '*')
+                        if self.packet_cache.add(aprs.util.dedup_key(frame), port['dupe_window']):
                             port['tnc'].write(frame, port['tnc_port'])
                             self.aprsis.send(frame)
                             print(port_name + " >> " + aprs.util.format_aprs_frame(frame))
                         return
                     elif node == "GATE" and port['net'].startswith("2M"):
-                        frame['path'] = frame['path'][:hop_index] + [recv_port['identifier'] + '*'] + [node + "*"] + frame['path'][hop_index+1:]
-                        frame_hash = aprs.util.hash_frame(frame)
-                        if not frame_hash in self.packet_cache.values():
-                            self.packet_cache[str(frame_hash)] = frame_hash
+                        frame = frame.replace_hop(hop_index, recv_port['identifier'] + '*', node + "*")
+                        if self.packet_cache.add(aprs.util.dedup_key(frame), port['dupe_window']):
                             port['tnc'].write(frame, port['tnc_port'])
                             self.aprsis.send(frame)
                             print(port_name + " >> " + aprs.util.format_aprs_frame(frame))
                         return
                 if node.startswith('WIDE') and ssid > 1:
-                    frame['path'] = frame['path'][:hop_index] + [recv_port['identifier'] + '*'] + [node + "-" + str(ssid-1)] + frame['path'][hop_index+1:]
-                    frame_hash = aprs.util.hash_frame(frame)
-                    if not frame_hash in self.packet_cache.values():
-                        self.packet_cache[str(frame_hash)] = frame_hash
+                    frame = frame.replace_hop(hop_index, recv_port['identifier'] + '*', node + "-" + str(ssid-1))
+                    if self.packet_cache.add(aprs.util.dedup_key(frame), recv_port['dupe_window']):
                         recv_port['tnc'].write(frame, recv_port['tnc_port'])
                         self.aprsis.send(frame)
                         print(recv_port_name + " >> " + aprs.util.format_aprs_frame(frame))
                     return
                 elif node.startswith('WIDE') and ssid is 1:
-                    frame['path'] = frame['path'][:hop_index] + [recv_port['identifier'] + '*'] + [node + "*"] + frame['path'][hop_index+1:]
-                    frame_hash = aprs.util.hash_frame(frame)
-                    if not frame_hash in self.packet_cache.values():
-                        self.packet_cache[str(frame_hash)] = frame_hash
+                    frame = frame.replace_hop(hop_index, recv_port['identifier'] + '*', node + "*")
+                    if self.packet_cache.add(aprs.util.dedup_key(frame), recv_port['dupe_window']):
                         recv_port['tnc'].write(frame, recv_port['tnc_port'])
                         self.aprsis.send(frame)
                         print(recv_port_name + " >> " + aprs.util.format_aprs_frame(frame))
                     return
                 elif node.startswith('WIDE') and ssid is 0:
-                    frame['path'][hop_index] = node + "*"
+                    frame = frame.replace_hop(hop_index, node + "*")
                     # no return
                 else:
                     #If we didnt digipeat it then we didn't modify the frame, send it to aprsis as-is
@@ -130,7 +120,7 @@ class ApexParadigmPlugin(object):
     def __preemptive_digipeat(self, frame, recv_port, recv_port_name):
         # Can't digipeat anything when you are the source
         for port in self.port_map.values():
-            if frame['source'] == port['identifier']:
+            if frame.source_is(port['identifier']):
                 return
 
         # can't digipeat things we already digipeated.
@@ -243,10 +233,8 @@ class ApexParadigmPlugin(object):
                     new_path += [hop]
             else:
                 new_path += [hop]
-        frame['path'] = new_path
-        frame_hash = aprs.util.hash_frame(frame)
-        if not frame_hash in self.packet_cache.values():
-            self.packet_cache[str(frame_hash)] = frame_hash
+        frame = frame.with_path(new_path)
+        if self.packet_cache.add(aprs.util.dedup_key(frame), selected_hop['port']['dupe_window']):
             selected_hop['port']['tnc'].write(frame, selected_hop['port']['tnc_port'])
             self.aprsis.send(frame)
             print(selected_hop['port_name'] + " >> " + aprs.util.format_aprs_frame(frame))
@@ -256,5 +244,6 @@ class ApexParadigmPlugin(object):
         return
 
     def handle_packet(self, frame, recv_port, recv_port_name):
-        self.__preemptive_digipeat(copy.deepcopy(frame), recv_port, recv_port_name)
-        self.__passive_digipeat(copy.deepcopy(frame), recv_port, recv_port_name)
\ No newline at end of file
+        # Path rewrites build new frames, the one we were handed is shared.
+        self.__preemptive_digipeat(frame, recv_port, recv_port_name)
+        self.__passive_digipeat(frame, recv_port, recv_port_name)
\ No newline at end of file
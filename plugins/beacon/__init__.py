@@ -1,4 +1,6 @@
-import aprs.util
+import aprs.periodic
+import asyncio
+import kiss.constants
 import time
 
 plugin = None
@@ -8,9 +10,18 @@ def start(config, port_map, packet_cache, aprsis):
     plugin = BeaconPlugin(config, port_map, packet_cache, aprsis)
     plugin.run()
 
+async def start_async(config, port_map, packet_cache, aprsis):
+    global plugin
+    plugin = BeaconPlugin(config, port_map, packet_cache, aprsis)
+    await plugin.run_async()
+
 def handle_packet(frame, recv_port, recv_port_name):
     return
 
+def reload(config):
+    if plugin is not None:
+        plugin.load_frames(config)
+
 class BeaconPlugin( object ):
 
     def __init__(self, config, port_map, packet_cache, aprsis):
@@ -18,25 +29,25 @@ class BeaconPlugin( object ):
         self.packet_cache = packet_cache
         self.aprsis = aprsis
 
-        for section in config.sections():
-            if section.startswith("TNC "):
-                tnc_name = section.split(" ")[1]
-                for port_id in range(1, 1+int(config.get(section, 'port_count'))):
-                    port_name = tnc_name + '-' + str(port_id)
-                    port = port_map[port_name]
-                    port_section = 'PORT ' + port_name
-                    port['beacon_text'] = config.get(port_section, 'beacon_text')
-                    port['beacon_path'] = config.get(port_section, 'beacon_path')
+        self.frames = aprs.periodic.PeriodicFrameCache()
+        self.load_frames(config)
+
+    def load_frames(self, config):
+        self.frames.load(config, self.port_map, 'beacon', 'APRS')
+
+    def send_beacons(self):
+        for port_name, beacon in self.frames.items('beacon'):
+            port = self.port_map[port_name]
+            if self.packet_cache.add(beacon.key, port['dupe_window']):
+                port['tnc'].write(beacon, port['tnc_port'], kiss.constants.TX_PRIORITY_BEACON)
+                print(port_name + " >> " + beacon.formatted)
 
     def run(self):
         while 1 :
-            for port_name in self.port_map.keys():
-                port = self.port_map[port_name]
-
-                beacon_frame = {'source':port['identifier'], 'destination': 'APRS', 'path':port['beacon_path'].split(','), 'text': list(port['beacon_text'].encode('ascii'))}
-                frame_hash = aprs.util.hash_frame(beacon_frame)
-                if not frame_hash in self.packet_cache.values():
-                    self.packet_cache[str(frame_hash)] = frame_hash
-                    port['tnc'].write(beacon_frame, port['tnc_port'])
-                    print(port_name + " >> " + aprs.util.format_aprs_frame(beacon_frame))
-            time.sleep(600)
\ No newline at end of file
+            self.send_beacons()
+            time.sleep(600)
+
+    async def run_async(self):
+        while 1 :
+            self.send_beacons()
+            await asyncio.sleep(600)
@@ -1,4 +1,6 @@
-import aprs.util
+import aprs.periodic
+import asyncio
+import kiss.constants
 import time
 
 plugin = None
@@ -8,9 +10,18 @@ def start(config, port_map, packet_cache, aprsis):
     plugin = IdPlugin(config, port_map, packet_cache, aprsis)
     plugin.run()
 
+async def start_async(config, port_map, packet_cache, aprsis):
+    global plugin
+    plugin = IdPlugin(config, port_map, packet_cache, aprsis)
+    await plugin.run_async()
+
 def handle_packet(frame, recv_port, recv_port_name):
     return
 
+def reload(config):
+    if plugin is not None:
+        plugin.load_frames(config)
+
 class IdPlugin(object):
 
     def __init__(self, config, port_map, packet_cache, aprsis):
@@ -18,26 +29,27 @@ class IdPlugin(object):
         self.packet_cache = packet_cache
         self.aprsis = aprsis
 
-        for section in config.sections():
-            if section.startswith("TNC "):
-                tnc_name = section.split(" ")[1]
-                for port_id in range(1, 1+int(config.get(section, 'port_count'))):
-                    port_name = tnc_name + '-' + str(port_id)
-                    port = port_map[port_name]
-                    port_section = 'PORT ' + port_name
-                    port['id_text'] = config.get(port_section, 'id_text')
-                    port['id_path'] = config.get(port_section, 'id_path')
+        self.frames = aprs.periodic.PeriodicFrameCache()
+        self.load_frames(config)
+
+    def load_frames(self, config):
+        self.frames.load(config, self.port_map, 'id', 'ID')
+
+    def send_ids(self):
+        for port_name, id_frame in self.frames.items('id'):
+            port = self.port_map[port_name]
+            if self.packet_cache.add(id_frame.key, port['dupe_window']):
+                port['tnc'].write(id_frame, port['tnc_port'], kiss.constants.TX_PRIORITY_STATUS)
+                print(port_name + " >> " + id_frame.formatted)
 
     def run(self):
         time.sleep(30)
         while 1 :
-            for port_name in self.port_map.keys():
-                port = self.port_map[port_name]
-
-                id_frame = {'source':port['identifier'], 'destination': 'ID', 'path':port['id_path'].split(','), 'text': list(port['id_text'].encode('ascii'))}
-                frame_hash = aprs.util.hash_frame(id_frame)
-                if not frame_hash in self.packet_cache.values():
-                    self.packet_cache[str(frame_hash)] = frame_hash
-                    port['tnc'].write(id_frame, port['tnc_port'])
-                    print(port_name + " >> " + aprs.util.format_aprs_frame(id_frame))
+            self.send_ids()
             time.sleep(600)
+
+    async def run_async(self):
+        await asyncio.sleep(30)
+        while 1 :
+            self.send_ids()
+            await asyncio.sleep(600)
@@ -1,4 +1,6 @@
-import aprs.util
+import aprs.periodic
+import asyncio
+import kiss.constants
 import time
 
 plugin = None
@@ -8,9 +10,18 @@ def start(config, port_map, packet_cache, aprsis):
     plugin = StatusPlugin(config, port_map, packet_cache, aprsis)
     plugin.run()
 
+async def start_async(config, port_map, packet_cache, aprsis):
+    global plugin
+    plugin = StatusPlugin(config, port_map, packet_cache, aprsis)
+    await plugin.run_async()
+
 def handle_packet(frame, recv_port, recv_port_name):
     return
 
+def reload(config):
+    if plugin is not None:
+        plugin.load_frames(config)
+
 class StatusPlugin(object):
 
     def __init__(self, config, port_map, packet_cache, aprsis):
@@ -18,28 +29,27 @@ class StatusPlugin(object):
         self.packet_cache = packet_cache
         self.aprsis = aprsis
 
-        for section in config.sections():
-            if section.startswith("TNC "):
-                tnc_name = section.split(" ")[1]
-                kiss_tnc = None
-                for port_id in range(1, 1+int(config.get(section, 'port_count'))):
-                    port_name = tnc_name + '-' + str(port_id)
-                    port = port_map[port_name]
-                    port_section = 'PORT ' + port_name
-                    port['status_text'] = config.get(port_section, 'status_text')
-                    port['status_path'] = config.get(port_section, 'status_path')
+        self.frames = aprs.periodic.PeriodicFrameCache()
+        self.load_frames(config)
 
+    def load_frames(self, config):
+        self.frames.load(config, self.port_map, 'status', 'APRS')
+
+    def send_statuses(self):
+        for port_name, status in self.frames.items('status'):
+            port = self.port_map[port_name]
+            if self.packet_cache.add(status.key, port['dupe_window']):
+                port['tnc'].write(status, port['tnc_port'], kiss.constants.TX_PRIORITY_STATUS)
+                print(port_name + " >> " + status.formatted)
 
     def run(self):
         time.sleep(60)
         while 1 :
-            for port_name in self.port_map.keys():
-                port = self.port_map[port_name]
-
-                status_frame = {'source':port['identifier'], 'destination': 'APRS', 'path':port['status_path'].split(','), 'text': list(port['status_text'].encode('ascii'))}
-                frame_hash = aprs.util.hash_frame(status_frame)
-                if not frame_hash in self.packet_cache.values():
-                    self.packet_cache[str(frame_hash)] = frame_hash
-                    port['tnc'].write(status_frame, port['tnc_port'])
-                    print(port_name + " >> " + aprs.util.format_aprs_frame(status_frame))
+            self.send_statuses()
             time.sleep(600)
+
+    async def run_async(self):
+        await asyncio.sleep(60)
+        while 1 :
+            self.send_statuses()
+            await asyncio.sleep(600)
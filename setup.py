@@ -53,9 +53,13 @@ setup(
     install_requires=[
         'pynmea2 >= 1.4.2',
         'pyserial >= 2.7',
-        'requests >= 2.7.0',
-        'cachetools >= 1.1.5'
+        'requests >= 2.7.0'
     ],
+    extras_require={
+        # Batch decoding of captures and array coordinate conversion,
+        # aprs.batch and aprs.decimaldegrees_array
+        'numpy': ['numpy >= 1.15']
+    },
     package_dir={'apex': 'apex'},
     zip_safe=False,
     include_package_data=True,
@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for APRS Frame Classes."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import asyncio
+import configparser
+import copy
+import threading
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .context import aprs
+
+import aprs.aio
+import aprs.decimaldegrees
+import aprs.dedup
+import aprs.frame
+import aprs.periodic
+import aprs.position
+import aprs.util
+
+from . import constants
+
+
+class FakeSocket(object):
+
+    """Non-blocking socket stand-in that records what is sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def recv(self, size, flags=0):
+        raise BlockingIOError()
+
+    def sendall(self, data):
+        self.sent.append(bytes(data))
+
+
+class FrameTestCase(unittest.TestCase):
+
+    """Tests for `aprs.Frame`."""
+
+    def setUp(self):
+        """Setup."""
+        self.frame = aprs.Frame(
+            'W2GMD-6', 'APRX24', ['WIDE1-1', 'WIDE2-1'], list(b'>test'))
+
+    def test_fields_normalized(self):
+        self.assertEqual(('WIDE1-1', 'WIDE2-1'), self.frame.path)
+        self.assertEqual(b'>test', self.frame.text)
+        self.assertRaises(AttributeError, setattr, self.frame, 'other', 1)
+
+    def test_dict_view(self):
+        self.assertEqual('W2GMD-6', self.frame['source'])
+        self.assertEqual(self.frame.path, self.frame['path'])
+        self.assertIn('text', self.frame)
+        self.assertRaises(KeyError, self.frame.__getitem__, 'other')
+        self.frame['path'] = ['WIDE2-2']
+        self.assertEqual(('WIDE2-2',), self.frame.path)
+        self.assertEqual(self.frame,
+                         aprs.Frame.from_dict(self.frame.to_dict()))
+        self.assertEqual('W2GMD-6>APRX24,WIDE2-2:>test',
+                         aprs.util.format_aprs_frame(self.frame))
+
+    def test_tnc2(self):
+        tnc2 = self.frame.tnc2
+        self.assertEqual(b'W2GMD-6>APRX24,WIDE1-1,WIDE2-1:>test', tnc2)
+        self.assertIs(tnc2, aprs.util.format_aprs_frame_bytes(self.frame))
+        self.assertEqual(tnc2, aprs.util.format_aprs_frame_bytes(self.frame.to_dict()))
+        self.assertEqual(b'W2GMD-6>APRX24:>test', self.frame.with_path([]).tnc2)
+        self.frame.text = b'>\xb0'
+        self.assertEqual('W2GMD-6>APRX24,WIDE1-1,WIDE2-1:>\xb0',
+                         aprs.util.format_aprs_frame(self.frame))
+
+    def test_from_tnc2(self):
+        line = b'W2GMD-6>APRX24,WIDE1-1,WIDE2-1:>test'
+        frame = aprs.Frame.from_tnc2(line + b'\r\n')
+        self.assertEqual(self.frame, frame)
+        self.assertEqual(line, frame.tnc2)
+        self.assertEqual(frame, aprs.Frame.from_tnc2(line.decode('ascii')))
+        self.assertEqual((), aprs.Frame.from_tnc2(b'W2GMD-6>APRX24::x:y').path)
+        self.assertEqual(b':x:y', aprs.Frame.from_tnc2(b'W2GMD-6>APRX24::x:y').text)
+        self.assertIsNone(aprs.Frame.from_tnc2(b'W2GMD-6 APRX24:>test'))
+        self.assertIsNone(aprs.Frame.from_tnc2(b'W2GMD-6>APRX24'))
+
+    def test_decode_many_tnc2(self):
+        feed = (b'# aprsc 2.1.4\r\n'
+                b'W2GMD-6>APRX24,WIDE1-1,WIDE2-1:>test\r\n'
+                b'\r\n'
+                b'not a frame\r\n'
+                b'WI2ARD>APRS,TCPIP*,qAC,T2TEST:>hi\r\n')
+        frames = list(aprs.util.decode_aprs_ascii_frames(feed))
+        self.assertEqual([self.frame, aprs.Frame('WI2ARD', 'APRS', ['TCPIP*', 'qAC', 'T2TEST'], b'>hi')],
+                         frames)
+        self.assertEqual(frames, list(aprs.util.decode_aprs_ascii_frames(feed.splitlines())))
+
+    def test_dedup_key(self):
+        key = aprs.util.dedup_key(self.frame)
+        self.assertLess(key, 1 << 64)
+        self.assertEqual(key, aprs.util.dedup_key(self.frame.replace_hop(0, 'WI2ARD*', 'WIDE1*')))
+        self.assertEqual(key, aprs.util.dedup_key(self.frame.to_dict()))
+        self.assertEqual(key, aprs.util.dedup_key(
+            aprs.Frame.from_ax25(aprs.frame.encode_frame(self.frame))))
+        # Both collided with the old XOR hash.
+        self.assertNotEqual(aprs.util.dedup_key(aprs.Frame('W2GMD-6', 'APRS', [], b'>test1')),
+                            aprs.util.dedup_key(aprs.Frame('W2GMD-6', 'APRS', [], b'>1estt')))
+        self.assertNotEqual(aprs.util.dedup_key(aprs.Frame('W2GMD-6', 'APRS', [], b'>hi')),
+                            aprs.util.dedup_key(aprs.Frame('D2GMW-6', 'APRS', [], b'>hi')))
+
+    def test_aprsis_send(self):
+        # The frame's cached TNC2 rendering is what goes out to APRS-IS.
+        loop = asyncio.new_event_loop()
+        received = []
+
+        async def handle(reader, writer):
+            await reader.readuntil(b'\n\r')
+            received.append(await reader.readline())
+            writer.close()
+
+        async def send():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            aprsis = aprs.aio.AsyncAprsInternetService('WI2ARD', loop=loop)
+            await aprsis.connect('127.0.0.1', server.sockets[0].getsockname()[1])
+            aprsis.send(self.frame)
+            await aprsis.close()
+            while not received:
+                await asyncio.sleep(0.01)
+            server.close()
+            return aprsis.sent
+
+        try:
+            self.assertEqual(1, loop.run_until_complete(asyncio.wait_for(send(), 5)))
+        finally:
+            loop.close()
+        self.assertEqual([self.frame.tnc2 + b'\r\n'], received)
+
+    def test_replace_hop(self):
+        digipeated = self.frame.replace_hop(0, 'WI2ARD-1*', 'WIDE1*')
+        self.assertEqual(('WI2ARD-1*', 'WIDE1*', 'WIDE2-1'), digipeated.path)
+        self.assertEqual(('WIDE1-1', 'WIDE2-1'), self.frame.path)
+        self.assertIs(self.frame.text, digipeated.text)
+
+    def test_copy_shares_fields(self):
+        copied = copy.deepcopy(self.frame)
+        self.assertEqual(self.frame, copied)
+        self.assertIsNot(self.frame, copied)
+        self.assertIs(self.frame.path, copied.path)
+
+
+class AprsKissFrameTestCase(unittest.TestCase):
+
+    """Tests for encoding and decoding frames through `aprs.AprsKiss`."""
+
+    def setUp(self):
+        """Setup."""
+        self.kiss_tnc = aprs.AprsKiss(host='localhost')
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.setblocking(False)
+
+    def test_decode(self):
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            raw_frame = test_frames.readline().strip()
+        self.kiss_tnc.feed(b'\xc0\x00' + raw_frame + b'\xc0')
+        frame = self.kiss_tnc.read()
+        self.assertIsInstance(frame, aprs.Frame)
+        self.assertEqual('W2GMD-6', frame.source)
+        self.assertEqual('APRX24', frame.destination)
+        self.assertEqual(('WIDE1-1',), frame.path)
+        self.assertTrue(bytes(frame.text).startswith(b'!3745.75N'))
+
+    def test_lazy_decode(self):
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            raw_frame = test_frames.readline().strip()
+        frame = aprs.Frame.from_ax25(raw_frame)
+        self.assertTrue(frame.source_is('W2GMD-6'))
+        self.assertFalse(frame.source_is('W2GMD'))
+        self.assertFalse(frame.source_is('W2GMD-7'))
+        self.assertIsNone(frame._source)
+        self.assertIsInstance(frame.text, memoryview)
+        self.assertEqual(('WIDE1-1',), frame.path)
+        self.assertEqual(('WI2ARD*', 'WIDE1*'),
+                         frame.replace_hop(0, 'WI2ARD*', 'WIDE1*').path)
+        self.assertEqual(('WIDE1-1',), frame.path)
+
+    def test_raw_digipeat(self):
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            raw_frame = test_frames.readline().strip()
+        frame = aprs.Frame.from_ax25(raw_frame)
+        for digipeated, path in [
+                (frame.replace_hop(0, 'WI2ARD-1*', 'WIDE1*'), ('WI2ARD-1*', 'WIDE1*')),
+                (frame.replace_hop(0, 'WIDE1*'), ('WIDE1*',)),
+                (frame.replace_hop(0), ()),
+                (frame.with_path(['WI2ARD*', 'WIDE2-1']), ('WI2ARD*', 'WIDE2-1'))]:
+            self.assertIsNotNone(digipeated.raw)
+            expected = aprs.Frame('W2GMD-6', 'APRX24', path, bytes(frame.text))
+            self.assertEqual(aprs.frame.encode_frame(expected), bytes(digipeated.raw))
+            self.assertEqual(expected, aprs.Frame.from_ax25(bytes(digipeated.raw)))
+        self.assertEqual(raw_frame, frame.raw)
+
+    def test_raw_insert_into_empty_path(self):
+        frame = aprs.Frame.from_ax25(aprs.frame.encode_frame(
+            aprs.Frame('W2GMD-6', 'APRX24', [], b'>test')))
+        digipeated = frame.with_path(('WIDE1-1',))
+        self.assertIsInstance(digipeated.raw, bytearray)
+        self.assertEqual(aprs.Frame('W2GMD-6', 'APRX24', ['WIDE1-1'], b'>test'),
+                         aprs.Frame.from_ax25(digipeated.raw))
+        self.assertRaises(IndexError, frame.replace_hop, 0)
+        self.assertRaises(IndexError, digipeated.replace_hop, -1)
+        self.assertRaises(IndexError, digipeated.replace_hop, 1, 'WIDE1*')
+
+    def test_raw_path_limits(self):
+        hops = ['WIDE%d-1' % hop for hop in range(8)]
+        frame = aprs.Frame.from_ax25(aprs.frame.encode_frame(
+            aprs.Frame('W2GMD-6', 'APRX24', hops, b'>test')))
+        self.assertEqual(70, aprs.frame.find_address_end(frame.raw))
+        self.assertRaises(ValueError, frame.with_path, hops + ['WIDE2-1'])
+        self.assertRaises(ValueError, frame.replace_hop, 0, 'WI2ARD*', 'WIDE1*')
+        self.assertRaises(ValueError, frame.replace_hop, 0, 'LONGCALL*')
+        full = frame.replace_hop(0, 'WI2ARD*')
+        self.assertEqual(full, aprs.Frame.from_ax25(bytes(full.raw)))
+
+    def test_changed_frame_encoded(self):
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            raw_frame = test_frames.readline().strip()
+        frame = aprs.Frame.from_ax25(raw_frame)
+        frame['path'] = ['WIDE2-2']
+        self.assertIsNone(frame.raw)
+        self.assertEqual('W2GMD-6', frame.source)
+        self.assertEqual(aprs.Frame('W2GMD-6', 'APRX24', ['WIDE2-2'], bytes(frame.text)),
+                         aprs.Frame.from_ax25(aprs.frame.encode_frame(frame)))
+
+    def test_address_codec(self):
+        address = aprs.frame.encode_address('W2GMD-1*')
+        self.assertEqual(b'\xaed\x8e\x9a\x88@\xe2', address)
+        self.assertEqual(b'\xaed\x8e\x9a\x88@b', aprs.frame.encode_address('W2GMD-1'))
+        self.assertEqual('W2GMD-1', aprs.frame.decode_address(address))
+        self.assertIs(aprs.frame.decode_address(address),
+                      aprs.frame.decode_address(bytes(address)))
+
+    def test_undecodable_frame(self):
+        self.kiss_tnc.feed(b'\xc0\x00too short\xc0')
+        self.assertIsNone(self.kiss_tnc.read())
+
+    def test_round_trip(self):
+        frame = aprs.Frame('WI2ARD-1', 'APRS', ['WI2ARD*', 'WIDE2-1'], b'>hi')
+        self.kiss_tnc.write(frame)
+        self.kiss_tnc.write(frame.to_dict())
+        self.kiss_tnc.flush_tx_queue()
+        self.kiss_tnc.feed(self.kiss_tnc.interface.sent[0])
+        self.assertEqual([frame, frame], self.kiss_tnc.read_many())
+
+
+class ValidateHeaderTestCase(unittest.TestCase):
+
+    """Tests for `aprs.frame.validate_header`."""
+
+    def setUp(self):
+        """Setup."""
+        self.header = (aprs.frame.encode_address('APRS') +
+                       aprs.frame.encode_address('WI2ARD-1'))
+
+    def check(self, raw_frame, rejection):
+        self.assertEqual((None, rejection), aprs.frame.validate_header(raw_frame))
+
+    def test_accepts(self):
+        raw_frame = self.header[:-1] + b'\x63\x03\xf0>hi'
+        self.assertEqual((14, None), aprs.frame.validate_header(raw_frame))
+
+    def test_rejections(self):
+        self.check(b'\x00' * 16, aprs.frame.Rejection.TOO_SHORT)
+        self.check(b'\xc1' + b'\x00' * 20, aprs.frame.Rejection.BAD_ADDRESS)
+        self.check(self.header[:6] + b'\x61' + self.header[7:] + b'>hi',
+                   aprs.frame.Rejection.BAD_ADDRESS)
+        self.check(self.header * 5 + b'\x03\xf0',
+                   aprs.frame.Rejection.UNTERMINATED_ADDRESS)
+        self.check(self.header[:-1] + b'\x63\x00\xf0>hi', aprs.frame.Rejection.NOT_UI)
+        self.check(self.header[:-1] + b'\x63\x13\xcc>hi', aprs.frame.Rejection.BAD_PID)
+
+    def test_rejections_counted(self):
+        kiss_tnc = aprs.AprsKiss(host='localhost')
+        kiss_tnc.interface = FakeSocket()
+        kiss_tnc.setblocking(False)
+        kiss_tnc.feed(b'\xc0\x00' + b'\xff' * 30 + b'\xc0')
+        self.assertEqual([], kiss_tnc.read_many())
+        self.assertEqual(1, kiss_tnc.rejected[aprs.frame.Rejection.BAD_ADDRESS])
+
+
+class PeriodicFrameCacheTestCase(unittest.TestCase):
+
+    """Tests for `aprs.periodic.PeriodicFrameCache`."""
+
+    def setUp(self):
+        """Setup."""
+        self.config = configparser.ConfigParser()
+        self.config.read_string(
+            '[PORT D710-1]\n'
+            'beacon_text=!/:=i@;N.G& --PHG5790/G/D R-I-R H24 C30\n'
+            'beacon_path=WIDE1-1,WIDE2-2\n'
+            'status_text=>Robust Packet Radio\n'
+            'status_path=WIDE1-1\n')
+        self.port_map = {'D710-1': {'identifier': 'WI2ARD-1'}}
+        self.frames = aprs.periodic.PeriodicFrameCache()
+        self.frames.load(self.config, self.port_map, 'beacon', 'APRS')
+        self.frames.load(self.config, self.port_map, 'status', 'APRS')
+
+    def test_prepared(self):
+        beacon = self.frames.get('D710-1', 'beacon')
+        frame = aprs.Frame('WI2ARD-1', 'APRS', ['WIDE1-1', 'WIDE2-2'],
+                           b'!/:=i@;N.G& --PHG5790/G/D R-I-R H24 C30')
+        self.assertEqual(frame, beacon.frame)
+        self.assertEqual(aprs.frame.encode_frame(frame), beacon.raw)
+        self.assertEqual(aprs.util.dedup_key(frame), beacon.key)
+        self.assertEqual(aprs.util.format_aprs_frame(frame), beacon.formatted)
+        self.assertEqual([('D710-1', beacon)], self.frames.items('beacon'))
+
+    def test_frame_is_a_copy(self):
+        beacon = self.frames.get('D710-1', 'beacon')
+        frame = beacon.frame
+        frame.path = ['WIDE1-1']
+        self.assertEqual(('WIDE1-1', 'WIDE2-2'), beacon.frame.path)
+        self.assertEqual(aprs.frame.encode_frame(beacon.frame), beacon.raw)
+
+    def test_written_as_encoded(self):
+        kiss_tnc = aprs.AprsKiss(host='localhost')
+        kiss_tnc.interface = FakeSocket()
+        status = self.frames.get('D710-1', 'status')
+        kiss_tnc.write(status)
+        kiss_tnc.flush_tx_queue()
+        self.assertEqual(b'\xc0\x00' + status.raw + b'\xc0', kiss_tnc.interface.sent[0])
+
+    def test_reload(self):
+        status = self.frames.get('D710-1', 'status')
+        self.config.set('PORT D710-1', 'beacon_text', '>moved')
+        self.frames.load(self.config, self.port_map, 'beacon', 'APRS')
+        self.assertEqual(b'>moved', self.frames.get('D710-1', 'beacon').frame.text)
+        self.assertIs(status, self.frames.get('D710-1', 'status'))
+        self.frames.invalidate('status')
+        self.assertIsNone(self.frames.get('D710-1', 'status'))
+        self.frames.invalidate()
+        self.assertEqual(0, len(self.frames))
+
+
+class DedupStoreTestCase(unittest.TestCase):
+
+    """Tests for `aprs.dedup.DedupStore`."""
+
+    def setUp(self):
+        """Setup."""
+        self.now = 1000.0
+        self.store = aprs.dedup.DedupStore(max_window=10, stripes=4, clock=lambda: self.now)
+
+    def test_window(self):
+        self.assertTrue(self.store.add(1, 5))
+        self.assertFalse(self.store.add(1, 5))
+        self.assertTrue(self.store.add(2, 2))
+        self.assertEqual(2, len(self.store))
+        self.now += 2
+        self.assertNotIn(2, self.store)
+        self.assertIn(1, self.store)
+        self.now += 3
+        self.assertTrue(self.store.add(1))
+        self.assertEqual(1, len(self.store))
+
+    def test_wheel_wraps(self):
+        for key in range(100):
+            self.assertTrue(self.store.add(key, key % 10 + 1))
+            self.now += 0.5
+        self.now += 11
+        self.assertEqual(0, len(self.store))
+        self.assertTrue(self.store.add(99, 10))
+
+    def test_window_too_long(self):
+        self.assertRaises(Exception, self.store.add, 1, 11)
+
+    def test_concurrent_add(self):
+        added = []
+        barrier = threading.Barrier(8)
+
+        def add():
+            barrier.wait()
+            added.extend(key for key in range(1000) if self.store.add(key))
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(list(range(1000)), sorted(added))
+
+
+class PositionTestCase(unittest.TestCase):
+
+    """Tests for `aprs.position`."""
+
+    def test_uncompressed(self):
+        position = aprs.position.decode_position(
+            b'@092345z4903.50N/07201.75W>088/036/A=001234 comment')
+        self.assertAlmostEqual(49.058333, position.latitude, 6)
+        self.assertAlmostEqual(-72.029167, position.longitude, 6)
+        self.assertEqual(('/', '>'), (position.symbol_table, position.symbol))
+        self.assertEqual((88, 36, 1234), (position.course, position.speed, position.altitude))
+
+    def test_ambiguous(self):
+        position = aprs.position.decode_position('!49  .  S/072  .  E-')
+        self.assertEqual((-49.0, 72.0, None), (position.latitude, position.longitude, position.course))
+
+    def test_compressed(self):
+        position = aprs.position.decode_position(b'=/5L!!<*e7>7P[')
+        self.assertAlmostEqual(49.5, position.latitude, 4)
+        self.assertAlmostEqual(-72.75, position.longitude, 4)
+        self.assertEqual(88, position.course)
+        self.assertAlmostEqual(36.2, position.speed, 1)
+        position = aprs.position.decode_position(b'!/5L!!<*e7OS]S')
+        self.assertAlmostEqual(10004, position.altitude, delta=1)
+        self.assertIsNone(position.course)
+
+    def test_not_positions(self):
+        for text in [b'', b'>status', b'!', b'!4903.50X/07201.75W>', b'!4903.5/N/07201.75W>',
+                     b'!/5L!!<*e', b'!/5L!\x7f<*e7>7P[', b'!4999.99N/07201.75W>',
+                     b'!4903.50N/07260.00W>', b'!4960.00S/07201.75E>']:
+            self.assertIsNone(aprs.position.decode_position(text), text)
+        position = aprs.position.decode_position(b'!4959.99N/07259.99W>')
+        self.assertAlmostEqual(49.999833, position.latitude, 6)
+        self.assertAlmostEqual(-72.999833, position.longitude, 6)
+
+    def test_batch(self):
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            frames = [aprs.Frame.from_ax25(line.strip()) for line in test_frames if line.strip()]
+        positions = aprs.position.decode_positions(frames)
+        self.assertEqual(len(frames), len(positions))
+        self.assertAlmostEqual(37.7625, positions[0].latitude)
+        self.assertEqual([aprs.position.decode_position(frame.text) for frame in frames], positions)
+
+
+class CoordinateTestCase(unittest.TestCase):
+
+    """Tests for float coordinate conversion and formatting."""
+
+    # Five decimal coordinates are common and several of these put the
+    # minutes exactly on a rounding tie.
+    COORDINATES = [37.7418096, -122.38833, 121.135, -121.135, 22.82275,
+                   -8.65725, -86.05325, -0.5, 0.0, 1e-05, 179.99999999]
+
+    def test_matches_decimal(self):
+        for coordinate in self.COORDINATES:
+            degrees, minutes = aprs.decimaldegrees.decimal2dm(coordinate)
+            self.assertEqual((int(degrees), float(minutes)),
+                             aprs.decimaldegrees.float2dm(coordinate))
+            degrees, minutes, seconds = aprs.decimaldegrees.decimal2dms(coordinate)
+            self.assertEqual((int(degrees), int(minutes), float(seconds)),
+                             aprs.decimaldegrees.float2dms(coordinate))
+
+    def test_format(self):
+        self.assertEqual('3744.51N', aprs.util.dec2dm_lat(37.7418096))
+        self.assertEqual('12223.30W', aprs.util.dec2dm_lng(-122.38833))
+        self.assertEqual('2249.37N', aprs.util.dec2dm_lat(22.82275))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_format_array(self):
+        self.assertEqual([aprs.util.dec2dm_lat(x) for x in self.COORDINATES],
+                         list(aprs.util.dec2dm_lat_array(self.COORDINATES)))
+        self.assertEqual([aprs.util.dec2dm_lng(x) for x in self.COORDINATES],
+                         list(aprs.util.dec2dm_lng_array(self.COORDINATES)))
+        self.assertEqual('3730.00N', aprs.util.dec2dm_lat_array(37.5))
+        self.assertEqual((2, 1), aprs.util.dec2dm_lng_array([[1.5], [-2.25]]).shape)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class DecodeBatchTestCase(unittest.TestCase):
+
+    """Tests for `aprs.AprsKiss.decode_batch`."""
+
+    def setUp(self):
+        """Setup."""
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            self.raw_frames = [line.strip() for line in test_frames if line.strip()]
+        digipeated = aprs.Frame('WI2ARD-1', 'APRS', ['WI2ARD*', 'WIDE2-1'], b'>hi')
+        kiss_tnc = aprs.AprsKiss(host='localhost')
+        kiss_tnc.interface = FakeSocket()
+        kiss_tnc.write(digipeated)
+        kiss_tnc.flush_tx_queue()
+        self.raw_frames.append(kiss_tnc.interface.sent[0][2:-1])
+        self.raw_frames.append(b'\x00' * 20)
+
+    def test_matches_frame_decoding(self):
+        batch = aprs.AprsKiss.decode_batch(self.raw_frames)
+        self.assertEqual(len(self.raw_frames), len(batch))
+        for index, raw_frame in enumerate(self.raw_frames):
+            self.assertEqual(aprs.Frame.from_ax25(raw_frame), batch.frame(index))
+        self.assertEqual([batch.frame(index) for index in range(len(batch))],
+                         batch.frames())
+
+    def test_records(self):
+        batch = aprs.AprsKiss.decode_batch(self.raw_frames)
+        record = batch.records[-2]
+        self.assertTrue(record['valid'])
+        self.assertEqual(b'WI2ARD', record['source'])
+        self.assertEqual(1, record['source_ssid'])
+        self.assertEqual(2, record['path_length'])
+        self.assertEqual([True, False], list(record['path_repeated'][:2]))
+        self.assertEqual(b'>hi', bytes(batch.payload(len(batch) - 2)))
+        self.assertFalse(batch.records[-1]['valid'])
+
+    def test_malformed_padding(self):
+        def address(callsign, ssid_byte=0x60):
+            return bytes(ord(x) << 1 for x in callsign) + bytes([ssid_byte])
+        raw_frame = (address('APRS  ') + address(' WI2AR') +
+                     address('WI AR ', 0x61) + b'\x03\xf0>hi')
+        batch = aprs.AprsKiss.decode_batch([raw_frame])
+        self.assertEqual(b'WI2AR', batch.records[0]['source'])
+        self.assertEqual(b'WI AR', batch.records[0]['path'][0])
+        self.assertEqual(aprs.Frame.from_ax25(raw_frame), batch.frame(0))
+
+    def test_empty(self):
+        self.assertEqual(0, len(aprs.AprsKiss.decode_batch([])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the APRS-IS uplink."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from .context import aprs
+
+import aprs.aio
+
+
+class FakeServer(object):
+
+    """Local TCP stand-in for an APRS-IS server, recording each connection."""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.connections = []
+        self.received = []
+        self.lock = threading.Lock()
+
+    def accept(self, count=1):
+        """Accepts connections in the background, reading each until closed."""
+        def serve():
+            for _ in range(count):
+                connection, _ = self.listener.accept()
+                with self.lock:
+                    self.connections.append(connection)
+                    self.received.append(bytearray())
+                    received = self.received[-1]
+                threading.Thread(target=self.read, args=(connection, received), daemon=True).start()
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        return thread
+
+    def read(self, connection, received):
+        while True:
+            try:
+                data = connection.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            with self.lock:
+                received.extend(data)
+
+    def lines(self, connection=0):
+        """The login, then every line received on a connection."""
+        with self.lock:
+            login, _, lines = bytes(self.received[connection]).partition(b'\n\r')
+        return [login] + lines.split(b'\r\n')
+
+    def drop(self, connection=0):
+        """Waits for a connection, then closes it."""
+        for _ in range(100):
+            if len(self.connections) > connection:
+                break
+            time.sleep(0.01)
+        self.connections[connection].shutdown(socket.SHUT_RDWR)
+        self.connections[connection].close()
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        self.listener.close()
+
+
+class AprsInternetServiceTestCase(unittest.TestCase):
+
+    """Tests for `aprs.AprsInternetService` over TCP."""
+
+    def setUp(self):
+        """Setup."""
+        self.server = FakeServer()
+        self.aprsis = aprs.AprsInternetService('WI2ARD', '12345', min_delay=0.01, max_delay=0.05)
+        self.frames = [aprs.Frame('WI2ARD', 'APRS', ['TCPIP*'], ('>%d' % i).encode('ascii'))
+                       for i in range(50)]
+
+    def tearDown(self):
+        """Teardown."""
+        self.aprsis.close(timeout=1)
+        self.server.close()
+
+    def test_send(self):
+        self.server.accept()
+        self.aprsis.connect('127.0.0.1', self.server.port)
+        for frame in self.frames:
+            self.assertTrue(self.aprsis.send(frame))
+        self.assertTrue(self.aprsis.flush(timeout=5))
+        self.aprsis.close()
+        self.assertFalse(self.aprsis.send(self.frames[0]))
+        self.assertEqual(50, self.aprsis.sent)
+        for _ in range(100):
+            lines = self.server.lines()
+            if len(lines) > 51:
+                break
+            time.sleep(0.01)
+        self.assertTrue(lines[0].startswith(b'user WI2ARD pass 12345'))
+        self.assertEqual([frame.tnc2 for frame in self.frames], lines[1:51])
+
+    def test_queue_full(self):
+        aprsis = aprs.AprsInternetService('WI2ARD', queue_size=2)
+        for frame in self.frames[:3]:
+            aprsis.send(frame)
+        self.assertEqual((1, 2), (aprsis.dropped, aprsis.high_water))
+
+    def test_reconnect(self):
+        self.server.accept(2)
+        self.aprsis.connect('127.0.0.1', self.server.port)
+        self.assertTrue(self.aprsis.send(self.frames[0]))
+        self.assertTrue(self.aprsis.flush(timeout=5))
+        # The server drops the connection, later frames go out on a new one
+        # without send() ever waiting.
+        self.server.drop()
+        for frame in self.frames[1:]:
+            self.assertTrue(self.aprsis.send(frame))
+            time.sleep(0.001)
+        self.assertTrue(self.aprsis.flush(timeout=5))
+        self.assertGreaterEqual(self.aprsis.reconnects, 1)
+        self.assertEqual(0, self.aprsis.dropped)
+        for _ in range(100):
+            if len(self.server.received) > 1 and self.server.lines(1)[-1:] == [b''] and \
+                    self.frames[-1].tnc2 in self.server.lines(1):
+                break
+            time.sleep(0.01)
+        self.assertIn(self.frames[-1].tnc2, self.server.lines(1))
+
+    def test_close_while_unreachable(self):
+        self.server.accept()
+        self.aprsis.connect('127.0.0.1', self.server.port)
+        self.server.drop()
+        self.server.listener.close()
+        self.aprsis.min_delay = self.aprsis.max_delay = 10
+        for frame in self.frames:
+            self.aprsis.send(frame)
+        started = time.monotonic()
+        self.aprsis.close()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(50, self.aprsis.sent + self.aprsis.dropped)
+
+
+class AsyncAprsInternetServiceTestCase(unittest.TestCase):
+
+    """Tests for `aprs.aio.AsyncAprsInternetService`."""
+
+    def setUp(self):
+        """Setup."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = FakeServer()
+        self.aprsis = aprs.aio.AsyncAprsInternetService(
+            'WI2ARD', '12345', self.loop, min_delay=0.01, max_delay=0.05)
+        self.frames = [aprs.Frame('WI2ARD', 'APRS', ['TCPIP*'], ('>%d' % i).encode('ascii'))
+                       for i in range(50)]
+
+    def tearDown(self):
+        """Teardown."""
+        self.loop.run_until_complete(self.aprsis.close(timeout=1))
+        self.server.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def wait_for_lines(self, count, connection=0):
+        for _ in range(100):
+            if len(self.server.received) > connection and \
+                    len(self.server.lines(connection)) > count:
+                break
+            time.sleep(0.01)
+        return self.server.lines(connection)
+
+    async def disconnected(self):
+        while self.aprsis.connected.is_set():
+            await asyncio.sleep(0.01)
+
+    def test_send(self):
+        self.server.accept()
+        self.loop.run_until_complete(self.aprsis.connect('127.0.0.1', self.server.port))
+        for frame in self.frames[:25]:
+            self.assertTrue(self.aprsis.send(frame))
+        sender = threading.Thread(
+            target=lambda: [self.aprsis.send(frame) for frame in self.frames[25:]])
+        sender.start()
+        sender.join()
+        self.assertTrue(self.loop.run_until_complete(self.aprsis.flush(timeout=5)))
+        self.assertEqual(50, self.aprsis.sent)
+        self.loop.run_until_complete(self.aprsis.close())
+        self.assertFalse(self.aprsis.send(self.frames[0]))
+        lines = self.wait_for_lines(51)
+        self.assertTrue(lines[0].startswith(b'user WI2ARD pass 12345'))
+        self.assertEqual([frame.tnc2 for frame in self.frames], lines[1:51])
+
+    def test_queue_full(self):
+        aprsis = aprs.aio.AsyncAprsInternetService('WI2ARD', loop=self.loop, queue_size=2)
+        for frame in self.frames[:3]:
+            aprsis.send(frame)
+        self.assertEqual((1, 2), (aprsis.dropped, aprsis.high_water))
+
+    def test_reconnect(self):
+        self.server.accept(2)
+        self.loop.run_until_complete(self.aprsis.connect('127.0.0.1', self.server.port))
+        running = asyncio.ensure_future(self.aprsis.run(), loop=self.loop)
+        self.aprsis.send(self.frames[0])
+        self.assertTrue(self.loop.run_until_complete(self.aprsis.flush(timeout=5)))
+        # Slow enough that the test can queue while the link is down.
+        self.aprsis.min_delay = self.aprsis.max_delay = 0.2
+        self.server.drop()
+        self.loop.run_until_complete(asyncio.wait_for(self.disconnected(), 5))
+        # Frames queue up while the service logs back in.
+        for frame in self.frames[1:]:
+            self.assertTrue(self.aprsis.send(frame))
+        self.assertTrue(self.loop.run_until_complete(self.aprsis.flush(timeout=5)))
+        running.cancel()
+        self.assertEqual(1, self.aprsis.reconnects)
+        self.assertEqual(0, self.aprsis.dropped)
+        self.assertIn(self.frames[-1].tnc2, self.wait_for_lines(50, connection=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
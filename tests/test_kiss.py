@@ -0,0 +1,731 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for KISS Core Classes."""
+
+__author__ = 'Jeffrey Phillips Freeman WI2ARD <freemo@gmail.com>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016, Syncleus, Inc. and contributors'
+
+
+import asyncio
+import concurrent.futures
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from .context import kiss
+
+import kiss.aio
+import kiss.airtime
+import kiss.capture
+
+from . import constants
+
+
+class FakeSocket(object):
+
+    """Stands in for a TCP KISS interface, replaying canned reads."""
+
+    def __init__(self, chunks=None):
+        self.chunks = list(chunks or [])
+        self.sent = []
+
+    def recv(self, size, flags=0):
+        if self.chunks:
+            return self.chunks.pop(0)
+        raise BlockingIOError()
+
+    def send(self, data):
+        self.sent.append(bytes(data))
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def shutdown(self, *args):
+        pass
+
+
+# pylint: disable=R0904,C0103
+class DeframerTestCase(unittest.TestCase):
+
+    """Tests for `kiss.codec.Deframer`."""
+
+    def setUp(self):
+        """Setup."""
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            self.test_frame = test_frames.readline().strip()
+
+    def test_single_frame(self):
+        deframer = kiss.Deframer()
+        frames = deframer.feed(b'\xc0\x00' + self.test_frame + b'\xc0')
+        self.assertEqual([b'\x00' + self.test_frame], frames)
+        self.assertIsInstance(frames[0], bytes)
+
+    def test_frame_split_across_reads(self):
+        deframer = kiss.Deframer()
+        raw = b'\xc0\x00' + self.test_frame + b'\xc0'
+        frames = []
+        for i in range(len(raw)):
+            frames += deframer.feed(memoryview(raw)[i:i + 1])
+        self.assertEqual([b'\x00' + self.test_frame], frames)
+
+    def test_back_to_back_frames(self):
+        deframer = kiss.Deframer()
+        frames = deframer.feed(
+            bytearray(b'\xc0\x00one\xc0\xc0\x00two\xc0\x00three\xc0\xc0'))
+        self.assertEqual([b'\x00one', b'\x00two', b'\x00three'], frames)
+
+    def test_command_byte_only_dropped(self):
+        deframer = kiss.Deframer()
+        self.assertEqual([b'\x00ab'], deframer.feed(b'\xc0\x00\xc0\xc0\x00ab\xc0'))
+
+    def test_unescape(self):
+        deframer = kiss.Deframer()
+        frames = deframer.feed(b'\xc0\x00a\xdb\xdcb\xdb\xddc\xdb\xdd\xdb\xdc\xc0')
+        self.assertEqual([b'\x00a\xc0b\xdbc\xdb\xc0'], frames)
+
+    def test_escape_split_across_reads(self):
+        deframer = kiss.Deframer()
+        self.assertEqual([], deframer.feed(b'\xc0\x00a\xdb'))
+        self.assertEqual([b'\x00a\xc0'], deframer.feed(b'\xdc\xc0'))
+
+    def test_oversize_frame_dropped(self):
+        deframer = kiss.Deframer(max_frame_length=8)
+        self.assertEqual([], deframer.feed(b'\xc0' + b'x' * 20))
+        self.assertEqual([], deframer.feed(b'y' * 4 + b'\xc0'))
+        self.assertEqual([b'\x00ok'], deframer.feed(b'\x00ok\xc0'))
+        self.assertEqual(1, deframer.oversize_frames)
+
+
+class EncoderTestCase(unittest.TestCase):
+
+    """Tests for the `kiss.codec` encode path."""
+
+    def test_escape_special_codes(self):
+        self.assertEqual(
+            b'a\xdb\xdcb\xdb\xddc',
+            kiss.codec.escape_special_codes(b'a\xc0b\xdbc'))
+        self.assertEqual(b'\xdb\xdd\xdb\xdc',
+                         kiss.codec.escape_special_codes([0xdb, 0xc0]))
+
+    def test_encode_frame(self):
+        self.assertEqual(b'\xc0\x00a\xdb\xdc\xc0',
+                         kiss.codec.encode_frame(b'a\xc0'))
+
+    def test_encoder_coalesces_frames(self):
+        encoder = kiss.codec.Encoder()
+        encoder.append(b'one')
+        encoder.append(b'two', 0x10)
+        written = []
+        encoder.flush(lambda data: written.append(bytes(data)))
+        self.assertEqual([b'\xc0\x00one\xc0\xc0\x10two\xc0'], written)
+        self.assertEqual(0, len(encoder))
+        self.assertIsNone(encoder.flush(written.append))
+
+    def test_round_trip(self):
+        payload = bytes(range(256)) * 2
+        deframer = kiss.Deframer()
+        self.assertEqual([b'\x00' + payload],
+                         deframer.feed(kiss.codec.encode_frame(payload)))
+
+
+class ReceiveQueueTestCase(unittest.TestCase):
+
+    """Tests for `kiss.queues.ReceiveQueue`."""
+
+    def fill(self, overflow):
+        queue = kiss.queues.ReceiveQueue(3, overflow)
+        for frame in range(5):
+            queue.put(frame)
+        return queue
+
+    def test_drop_oldest(self):
+        queue = self.fill(kiss.constants.OVERFLOW_DROP_OLDEST)
+        self.assertEqual([2, 3, 4], queue.get_many())
+        self.assertEqual(2, queue.dropped)
+        self.assertEqual(3, queue.high_water)
+
+    def test_drop_newest(self):
+        queue = self.fill(kiss.constants.OVERFLOW_DROP_NEWEST)
+        self.assertEqual(0, queue.get())
+        self.assertEqual([1, 2], queue.get_many())
+        self.assertEqual(2, queue.dropped)
+        self.assertIsNone(queue.get())
+
+    def test_block(self):
+        queue = self.fill(kiss.constants.OVERFLOW_BLOCK)
+        self.assertTrue(queue.throttled())
+        self.assertEqual(0, queue.dropped)
+        self.assertEqual(5, queue.high_water)
+        self.assertEqual([0, 1, 2, 3, 4], queue.get_many())
+        self.assertFalse(queue.throttled())
+
+    def test_block_stops_reading(self):
+        tnc = kiss.Kiss(host='localhost', rx_queue_size=1,
+                        rx_overflow=kiss.constants.OVERFLOW_BLOCK)
+        tnc.interface = FakeSocket([b'\xc0\x00a\xc0\xc0\x00b\xc0', b'\xc0\x00c\xc0'])
+        tnc.fill_buffer()
+        self.assertEqual(2, len(tnc.rx_queue))
+        tnc.fill_buffer()
+        self.assertEqual(2, len(tnc.rx_queue))
+        self.assertEqual([(0, b'a'), (0, b'b')], tnc.rx_queue.get_many())
+        self.assertEqual([b'c'], tnc.read_many())
+
+    def test_queues_not_shared(self):
+        first = kiss.Kiss(host='localhost')
+        second = kiss.Kiss(host='localhost')
+        first.feed(b'\xc0\x00a\xc0')
+        self.assertEqual(0, len(second.rx_queue))
+
+
+class TransmitQueueTestCase(unittest.TestCase):
+
+    """Tests for `kiss.queues.TransmitQueue`."""
+
+    def test_priority_order(self):
+        queue = kiss.queues.TransmitQueue()
+        queue.put(b'status', priority=kiss.constants.TX_PRIORITY_STATUS)
+        queue.put(b'beacon1', priority=kiss.constants.TX_PRIORITY_BEACON)
+        queue.put(b'digi', priority=kiss.constants.TX_PRIORITY_DIGIPEAT)
+        queue.put(b'beacon2', priority=kiss.constants.TX_PRIORITY_BEACON)
+        self.assertEqual([1, 2, 1], queue.depths())
+        self.assertEqual(
+            [b'digi', b'beacon1'],
+            [frame for _, frame in queue.get_batch(max_frames=2, timeout=0)])
+        self.assertEqual(
+            [b'beacon2', b'status'],
+            [frame for _, frame in queue.get_batch(timeout=0)])
+        self.assertEqual([], queue.get_batch(timeout=0))
+        self.assertEqual(4, queue.sent)
+        self.assertGreaterEqual(queue.wait_max, queue.mean_wait())
+
+    def test_full_queue_drops(self):
+        queue = kiss.queues.TransmitQueue(capacity=1)
+        self.assertTrue(queue.put(b'one'))
+        self.assertFalse(queue.put(b'two'))
+        self.assertEqual(1, queue.dropped)
+        self.assertEqual(1, len(queue))
+
+    def test_close_wakes_waiter(self):
+        queue = kiss.queues.TransmitQueue()
+        threading.Timer(0.05, queue.close).start()
+        self.assertEqual([], queue.get_batch(timeout=None))
+
+
+class KissReadTestCase(unittest.TestCase):
+
+    """Tests for reading frames through `kiss.Kiss`."""
+
+    def setUp(self):
+        """Setup."""
+        with open(constants.TEST_FRAMES, 'rb') as test_frames:
+            self.test_frames = [line.strip() for line in test_frames]
+        self.kiss_tnc = kiss.Kiss(host='localhost')
+
+    def test_read_many(self):
+        stream = b''.join(
+            [b'\xc0\x00' + frame + b'\r\n\xc0' for frame in self.test_frames])
+        self.kiss_tnc.interface = FakeSocket(
+            [stream[:50], stream[50:51], stream[51:]])
+        self.assertEqual(self.test_frames, self.kiss_tnc.read_many())
+        self.assertEqual([], self.kiss_tnc.read_many())
+
+    def test_failed_constructor_cleanup(self):
+        self.assertRaises(Exception, kiss.Kiss)
+        # What the garbage collector does with the half built instance.
+        half_built = kiss.Kiss.__new__(kiss.Kiss)
+        half_built.interface = None
+        half_built.interface_mode = None
+        half_built.__del__()
+
+    def test_read_ignores_non_data_frames(self):
+        self.kiss_tnc.interface = FakeSocket([b'\xc0\x06\x01\xc0\xc0\x00ab\xc0'])
+        self.assertEqual(b'ab', self.kiss_tnc.read())
+        self.assertIsNone(self.kiss_tnc.read())
+
+    def test_read_ignores_empty_frames(self):
+        self.kiss_tnc.interface = FakeSocket(
+            [b'\xc0\x00\xc0\xc0\x00\x00\r\n\xc0\xc0\x00ab\xc0'])
+        self.assertEqual([b'ab'], self.kiss_tnc.read_many())
+        self.assertEqual(1, self.kiss_tnc.rx_queue.received)
+
+    def test_read_tagged_with_port(self):
+        self.kiss_tnc.interface = FakeSocket(
+            [b'\xc0\x00zero\xc0\xc0\x30three\xc0\xc0\x36\x01\xc0\xc0\xf0fifteen\xc0'])
+        self.assertEqual(
+            [(0, b'zero'), (3, b'three'), (15, b'fifteen')],
+            self.kiss_tnc.read_many_tagged())
+
+    def test_write_to_port(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.write(b'two', port=2)
+        self.kiss_tnc.flush_tx_queue()
+        self.assertEqual([b'\xc0\x20two\xc0'], self.kiss_tnc.interface.sent)
+        self.assertRaises(Exception, self.kiss_tnc.write, b'x', port=16)
+
+    def test_write(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.assertTrue(self.kiss_tnc.write(b'a\xdbb'))
+        self.assertEqual([], self.kiss_tnc.interface.sent)
+        self.assertEqual(1, self.kiss_tnc.flush_tx_queue())
+        self.assertEqual([b'\xc0\x00a\xdb\xddb\xc0'],
+                         self.kiss_tnc.interface.sent)
+
+    def test_write_while_link_down(self):
+        # A supervised interface between connections has neither.
+        self.kiss_tnc.write(b'lost')
+        self.assertEqual(1, self.kiss_tnc.flush_tx_queue())
+        self.assertEqual(0, len(self.kiss_tnc.tx_queue))
+        self.assertIsNone(self.kiss_tnc.write_setting('TX_DELAY', 10))
+
+    def test_write_ackmode(self):
+        self.kiss_tnc.interface = FakeSocket(
+            [b'\xc0\x2c\x00\x01\xc0\xc0\x2c\x00\x00\xc0'])
+        first = self.kiss_tnc.write(b'one', port=2, ack=True)
+        second = self.kiss_tnc.write(b'two', port=2, ack=True)
+        self.kiss_tnc.flush_tx_queue()
+        self.assertEqual([b'\xc0\x2c\x00\x00one\xc0\xc0\x2c\x00\x01two\xc0'],
+                         self.kiss_tnc.interface.sent)
+        self.assertFalse(first.done())
+
+        self.assertEqual([], self.kiss_tnc.read_many())
+        self.assertGreaterEqual(first.result(0), 0)
+        self.assertGreaterEqual(second.result(0), 0)
+        self.assertEqual({}, self.kiss_tnc.acks_pending)
+
+    def test_ackmode_timeout(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.ack_timeout = 0.1
+        self.kiss_tnc.start_writer()
+        try:
+            lost = self.kiss_tnc.write(b'lost', ack=True)
+            self.assertRaises(concurrent.futures.TimeoutError, lost.result, 2)
+        finally:
+            self.kiss_tnc.stop_writer()
+        self.assertEqual(1, self.kiss_tnc.acks_expired)
+        self.assertEqual({}, self.kiss_tnc.acks_pending)
+
+    def test_ackmode_timeout_starts_on_write(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.ack_timeout = 0.1
+        future = self.kiss_tnc.write(b'slow', ack=True)
+        time.sleep(0.2)
+        self.kiss_tnc.flush_tx_queue()
+        self.kiss_tnc.interface.chunks.append(b'\xc0\x0c\x00\x00\xc0')
+        self.kiss_tnc.read_many()
+        self.assertLess(future.result(0), 0.1)
+
+    def test_ackmode_ack_during_write(self):
+        def sendall(data):
+            # The reader thread sees the TNC's ACK before sendall returns.
+            self.kiss_tnc.feed(b'\xc0\x0c\x00\x00\xc0')
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.interface.sendall = sendall
+        future = self.kiss_tnc.write(b'fast', ack=True)
+        self.kiss_tnc.flush_tx_queue()
+        self.assertGreaterEqual(future.result(0), 0)
+        self.assertEqual({}, self.kiss_tnc.acks_pending)
+
+    def test_ackmode_write_failed(self):
+        def sendall(data):
+            raise BrokenPipeError()
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.interface.sendall = sendall
+        future = self.kiss_tnc.write(b'lost', ack=True)
+        self.kiss_tnc.flush_tx_queue()
+        self.assertRaises(Exception, future.result, 0)
+        self.assertEqual({}, self.kiss_tnc.acks_queued)
+        self.assertEqual({}, self.kiss_tnc.acks_pending)
+
+    def test_writes_coalesced_by_priority(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.write(b'status', priority=kiss.constants.TX_PRIORITY_STATUS)
+        self.kiss_tnc.write(b'beacon', priority=kiss.constants.TX_PRIORITY_BEACON)
+        self.kiss_tnc.write(b'digi')
+        self.assertEqual(3, self.kiss_tnc.flush_tx_queue())
+        self.assertEqual(
+            [b'\xc0\x00digi\xc0\xc0\x00beacon\xc0\xc0\x00status\xc0'],
+            self.kiss_tnc.interface.sent)
+
+    def test_writer_thread(self):
+        self.kiss_tnc.interface = FakeSocket()
+        self.kiss_tnc.start_writer()
+        self.kiss_tnc.write(b'one')
+        self.kiss_tnc.write(b'two')
+        self.kiss_tnc.stop_writer()
+        self.assertEqual(b'\xc0\x00one\xc0\xc0\x00two\xc0',
+                         b''.join(self.kiss_tnc.interface.sent))
+
+
+class AirtimeLimiterTestCase(unittest.TestCase):
+
+    """Tests for `kiss.airtime.AirtimeLimiter`."""
+
+    def setUp(self):
+        """Setup."""
+        # 1200 baud, 10% of a 10 second window: a one second burst.
+        self.limiter = kiss.airtime.AirtimeLimiter(
+            1200, tx_delay=0.3, duty_cycle=0.1, window=10)
+
+    def test_airtime(self):
+        self.assertAlmostEqual(0.3 + 0.8, self.limiter.airtime(116))
+
+    def test_budget_by_priority(self):
+        self.assertEqual(kiss.constants.AIRTIME_SEND,
+                         self.limiter.admit(56, kiss.constants.TX_PRIORITY_BEACON))
+        self.assertEqual(kiss.constants.AIRTIME_DEFER,
+                         self.limiter.admit(56, kiss.constants.TX_PRIORITY_BEACON))
+        self.assertEqual(kiss.constants.AIRTIME_DROP,
+                         self.limiter.admit(56, kiss.constants.TX_PRIORITY_STATUS))
+        # Digipeats overdraw the budget rather than wait.
+        self.assertEqual(kiss.constants.AIRTIME_SEND, self.limiter.admit(56))
+        self.assertLess(self.limiter.tokens, 0)
+        self.assertGreater(self.limiter.wait_time(56), 5)
+        self.assertAlmostEqual(0.14, self.limiter.utilization(), 2)
+
+    def test_frame_longer_than_burst(self):
+        # 1.3 seconds on air, more than the whole one second bucket.
+        self.assertEqual(kiss.constants.AIRTIME_SEND,
+                         self.limiter.admit(146, kiss.constants.TX_PRIORITY_BEACON))
+        self.assertAlmostEqual(-0.3, self.limiter.tokens, 2)
+        self.assertEqual(kiss.constants.AIRTIME_DEFER,
+                         self.limiter.admit(146, kiss.constants.TX_PRIORITY_BEACON))
+        # Until the bucket is full again, not until it holds 1.3 seconds.
+        self.assertAlmostEqual(13, self.limiter.wait_time(146), 1)
+
+
+class KissAirtimeTestCase(unittest.TestCase):
+
+    """Tests for airtime limited writes through `kiss.Kiss`."""
+
+    def setUp(self):
+        """Setup."""
+        self.kiss_tnc = kiss.Kiss(host='localhost')
+        self.kiss_tnc.interface = FakeSocket()
+        self.limiter = kiss.airtime.AirtimeLimiter(
+            1200, duty_cycle=0.1, window=1)
+        self.kiss_tnc.set_airtime_limit(1, self.limiter)
+
+    def test_over_budget_frames_deferred(self):
+        for name in (b'beacon1', b'beacon2'):
+            self.kiss_tnc.write(name, port=1,
+                                priority=kiss.constants.TX_PRIORITY_BEACON)
+        self.kiss_tnc.write(b'status', port=1,
+                            priority=kiss.constants.TX_PRIORITY_STATUS)
+        self.kiss_tnc.write(b'unlimited', port=0,
+                            priority=kiss.constants.TX_PRIORITY_STATUS)
+        self.assertEqual(2, self.kiss_tnc.flush_tx_queue())
+        self.assertEqual(
+            [b'\xc0\x10beacon1\xc0\xc0\x00unlimited\xc0'],
+            self.kiss_tnc.interface.sent)
+        self.assertEqual(1, len(self.kiss_tnc.tx_queue))
+        self.assertEqual(1, self.kiss_tnc.tx_queue.dropped)
+
+    def test_dropped_ackmode_frame_fails(self):
+        self.kiss_tnc.write(b'beacon', port=1,
+                            priority=kiss.constants.TX_PRIORITY_BEACON)
+        future = self.kiss_tnc.write(b'status', port=1, ack=True,
+                                     priority=kiss.constants.TX_PRIORITY_STATUS)
+        self.assertEqual(1, self.kiss_tnc.flush_tx_queue())
+        self.assertRaises(Exception, future.result, 0)
+        self.assertEqual({}, self.kiss_tnc.acks_queued)
+
+    def test_writer_sends_deferred_frames(self):
+        self.kiss_tnc.start_writer()
+        for name in (b'one', b'two'):
+            self.kiss_tnc.write(b'x' * 5 + name, port=1,
+                                priority=kiss.constants.TX_PRIORITY_BEACON)
+        deadline = time.monotonic() + 5
+        while len(self.kiss_tnc.interface.sent) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.kiss_tnc.stop_writer()
+        self.assertEqual(
+            [b'\xc0\x10xxxxxone\xc0', b'\xc0\x10xxxxxtwo\xc0'],
+            self.kiss_tnc.interface.sent)
+
+
+class ReactorTestCase(unittest.TestCase):
+
+    """Tests for `kiss.Reactor`."""
+
+    def setUp(self):
+        """Setup."""
+        self.reactor = kiss.Reactor()
+        self.tncs = []
+        self.remotes = []
+        for _ in range(3):
+            local, remote = socket.socketpair()
+            tnc = kiss.Kiss(host='localhost')
+            tnc.interface = local
+            self.tncs.append(tnc)
+            self.remotes.append(remote)
+
+    def tearDown(self):
+        """Teardown."""
+        self.reactor.close()
+        for tnc in self.tncs:
+            tnc.interface.close()
+        for remote in self.remotes:
+            remote.close()
+
+    def test_dispatch_only_ready_interfaces(self):
+        received = []
+        for tnc in self.tncs:
+            self.reactor.register(
+                tnc, lambda tnc, tnc_port, frame: received.append((tnc, frame)))
+        self.remotes[1].sendall(b'\xc0\x00one\xc0\xc0\x00two\xc0')
+        self.assertEqual(2, self.reactor.run_once(1))
+        self.assertEqual(
+            [(self.tncs[1], b'one'), (self.tncs[1], b'two')], received)
+        self.assertEqual(0, self.reactor.run_once(0))
+
+    def test_closed_interface_is_unregistered(self):
+        self.reactor.register(self.tncs[0], lambda tnc, tnc_port, frame: None)
+        self.remotes[0].close()
+        self.reactor.run_once(1)
+        registered = [
+            key.fileobj for key in self.reactor.selector.get_map().values()]
+        self.assertNotIn(self.tncs[0], registered)
+
+    def test_stop_from_other_thread(self):
+        timer = threading.Timer(0.05, self.reactor.stop)
+        timer.start()
+        self.reactor.run()
+        timer.join()
+        self.assertFalse(self.reactor.running)
+
+
+class KissProtocolTestCase(unittest.TestCase):
+
+    """Tests for `kiss.aio`."""
+
+    def setUp(self):
+        """Setup."""
+        self.loop = asyncio.new_event_loop()
+        local, self.remote = socket.socketpair()
+        self.tnc = kiss.Kiss(host='localhost')
+        self.tnc.interface = local
+        self.received = []
+        self.protocol = self.loop.run_until_complete(kiss.aio.connect(
+            self.tnc, lambda tnc, tnc_port, frame: self.received.append(frame), self.loop))
+        self.tnc.start_writer()
+
+    def tearDown(self):
+        """Teardown."""
+        self.tnc.stop_writer()
+        self.protocol.close()
+        self.loop.run_until_complete(self.protocol.closed)
+        self.loop.close()
+        self.remote.close()
+
+    def test_frames_dispatched(self):
+        self.remote.sendall(b'\xc0\x00one\xc0\xc0\x00tw')
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual([b'one'], self.received)
+        self.remote.sendall(b'o\xc0')
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual([b'one', b'two'], self.received)
+
+    def test_write_from_other_thread(self):
+        writer = threading.Thread(target=self.tnc.write, args=(b'hi',))
+        writer.start()
+        writer.join()
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(b'\xc0\x00hi\xc0', self.remote.recv(100))
+
+
+class FakeKissServer(object):
+
+    """Local KISS TCP server that can drop its clients on command."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.writers = []
+        self.received = b''
+        self.server = loop.run_until_complete(
+            asyncio.start_server(self.handle, '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.writers.append(writer)
+        while True:
+            data = await reader.read(1000)
+            if not data:
+                break
+            self.received += data
+
+    def send(self, data):
+        for writer in self.writers:
+            writer.write(data)
+
+    def drop_connections(self):
+        for writer in self.writers:
+            writer.transport.abort()
+        self.writers = []
+
+    def close(self):
+        self.drop_connections()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+
+
+class TcpSupervisorTestCase(unittest.TestCase):
+
+    """Tests for `kiss.aio.TcpSupervisor`."""
+
+    def setUp(self):
+        """Setup."""
+        self.loop = asyncio.new_event_loop()
+        self.server = FakeKissServer(self.loop)
+        self.tnc = kiss.Kiss(host='127.0.0.1', tcp_port=self.server.port)
+        self.received = []
+        self.supervisor = kiss.aio.TcpSupervisor(
+            self.tnc, lambda tnc, tnc_port, frame: self.received.append(frame),
+            self.loop, min_delay=0.01, max_delay=0.02)
+
+    def tearDown(self):
+        """Teardown."""
+        self.supervisor.stop()
+        self.tnc.stop_writer()
+        self.server.close()
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.loop.close()
+
+    def run_until(self, condition, timeout=2):
+        async def wait():
+            while not condition():
+                await asyncio.sleep(0.01)
+        self.loop.run_until_complete(asyncio.wait_for(wait(), timeout))
+
+    def test_reconnects_after_drop(self):
+        # Slow enough that the test can see the link while it is down.
+        self.supervisor.min_delay = 0.2
+        self.supervisor.max_delay = 0.4
+        self.supervisor.start()
+        self.run_until(lambda: self.supervisor.connected)
+
+        self.server.drop_connections()
+        self.run_until(lambda: not self.supervisor.connected)
+        self.tnc.write(b'queued')
+        self.assertEqual(1, len(self.tnc.tx_queue))
+
+        self.run_until(lambda: self.supervisor.connects == 2)
+        self.run_until(lambda: self.server.received)
+        self.assertEqual(b'\xc0\x00queued\xc0', self.server.received)
+
+        self.server.send(b'\xc0\x00back\xc0')
+        self.run_until(lambda: self.received)
+        self.assertEqual([b'back'], self.received)
+
+    def test_retries_while_server_down(self):
+        self.server.close()
+        self.supervisor.start()
+        self.run_until(lambda: self.supervisor.failures >= 2)
+        self.assertFalse(self.supervisor.connected)
+
+    def test_backoff_grows_with_jitter(self):
+        supervisor = kiss.aio.TcpSupervisor(
+            self.tnc, None, self.loop, min_delay=1, max_delay=8)
+        delays = [supervisor.backoff() for _ in range(6)]
+        for delay, ceiling in zip(delays, [1, 2, 4, 8, 8, 8]):
+            self.assertTrue(ceiling / 2 <= delay <= ceiling)
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    """Tests for `kiss.capture`."""
+
+    def setUp(self):
+        """Setup."""
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        os.unlink(self.path)
+
+    def tearDown(self):
+        """Teardown."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def test_kiss_records_both_directions(self):
+        tnc = kiss.Kiss(host='localhost')
+        tnc.interface = FakeSocket([b'\xc0\x10in\xdb\xdc\xc0\xc0\x06\x01\xc0'])
+        tnc.start_capture(self.path)
+        tnc.read_many()
+        tnc.write(b'out', port=2)
+        tnc.flush_tx_queue()
+        tnc.stop_capture()
+
+        with kiss.capture.CaptureReader(self.path) as reader:
+            records = [(record.port, record.direction, bytes(record.frame))
+                       for record in reader]
+        self.assertEqual(
+            [(1, kiss.constants.CAPTURE_RX, b'in\xc0'),
+             (2, kiss.constants.CAPTURE_TX, b'out')], records)
+
+    def test_frames_are_views(self):
+        with kiss.capture.CaptureWriter(self.path) as writer:
+            writer.record(kiss.constants.CAPTURE_RX, 0, [0x61, 0x62])
+        reader = kiss.capture.CaptureReader(self.path)
+        frame = reader[0].frame
+        self.assertIsInstance(frame, memoryview)
+        self.assertEqual(b'ab', frame.tobytes())
+        frame.release()
+        reader.close()
+
+    def test_time_range(self):
+        with kiss.capture.CaptureWriter(self.path) as writer:
+            writer.record(kiss.constants.CAPTURE_RX, 0, b'early')
+            time.sleep(0.02)
+            middle = time.time()
+            writer.record(kiss.constants.CAPTURE_RX, 0, b'late')
+        # Appending after a restart keeps the wall clock ordering.
+        with kiss.capture.CaptureWriter(self.path) as writer:
+            writer.record(kiss.constants.CAPTURE_TX, 0, b'later')
+
+        with kiss.capture.CaptureReader(self.path) as reader:
+            self.assertEqual(3, len(reader))
+            self.assertEqual(1, reader.seek(middle))
+            self.assertEqual(
+                [b'late'],
+                [bytes(record.frame) for record in reader.between(middle, reader[2].timestamp)])
+            self.assertEqual(3, reader.seek(time.time() + 1))
+
+    def test_records_written_before_close(self):
+        # What a reader finds if the digipeater is killed right now.
+        writer = kiss.capture.CaptureWriter(self.path)
+        writer.record(kiss.constants.CAPTURE_RX, 0, b'kept')
+        with kiss.capture.CaptureReader(self.path) as reader:
+            self.assertEqual([b'kept'], [bytes(record.frame) for record in reader])
+        writer.close()
+
+        writer = kiss.capture.CaptureWriter(self.path, flush_records=2)
+        writer.record(kiss.constants.CAPTURE_RX, 0, b'buffered')
+        with kiss.capture.CaptureReader(self.path) as reader:
+            self.assertEqual(1, len(reader))
+        writer.record(kiss.constants.CAPTURE_RX, 0, b'pair')
+        with kiss.capture.CaptureReader(self.path) as reader:
+            self.assertEqual(3, len(reader))
+        writer.close()
+
+    def test_truncated_record_ignored(self):
+        with kiss.capture.CaptureWriter(self.path) as writer:
+            writer.record(kiss.constants.CAPTURE_RX, 0, b'whole')
+            writer.record(kiss.constants.CAPTURE_RX, 0, b'partial')
+        with open(self.path, 'r+b') as capture_file:
+            capture_file.truncate(os.path.getsize(self.path) - 3)
+        with kiss.capture.CaptureReader(self.path) as reader:
+            self.assertEqual(1, len(reader))
+
+    def test_not_a_capture_file(self):
+        with open(self.path, 'wb') as capture_file:
+            capture_file.write(b'\xc0\x00frame\xc0')
+        self.assertRaises(Exception, kiss.capture.CaptureReader, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()